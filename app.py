@@ -1,11 +1,61 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import altair as alt
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from datetime import datetime
+import copy
+import functools
+import json
+from concurrent.futures import wait
+from datetime import date, datetime
+
+from suivi_ca.analysis import ca_compliance, notes_compliance
+from suivi_ca.alerts import (
+    COLUMNS as ALERT_COLUMNS,
+    OK_PCT,
+    RULES as ALERT_RULES,
+    STATUSES as ALERT_STATUSES,
+    ca_alerts,
+    notes_alerts,
+    summary as alerts_summary,
+    traffic_light,
+    window_start,
+)
+from suivi_ca.config import DATA_PATH, DB_PATH, PARTITIONS_DIR
+from suivi_ca.correlation import AS_OF_DAYS, NOTES as CORRELATION_NOTES
+from suivi_ca.correlation import RatingsRevenueFacts, lag_correlations
+from suivi_ca.cube import build_ca_cube, build_notes_cube, update_ca_cube, update_notes_cube
+from suivi_ca.export import EXPORT_FORMATS
+from suivi_ca.forecast import (
+    HISTORY_DAYS as FORECAST_HISTORY_DAYS,
+    fit_forecasts,
+    suggest_objectives,
+)
+from suivi_ca.importer import TARGETS, excel_sheets, import_file, preview, suggest_mapping
+from suivi_ca.index import DateVilleIndex
+from suivi_ca.jobs import JobRunner
+from suivi_ca.loader import SHEET_CA
+from suivi_ca.resample import (
+    MAX_POINTS_PER_CHART,
+    RESOLUTIONS,
+    cap_points,
+    choose_resolution,
+    resample,
+    top_series,
+)
+from suivi_ca.objectives import CA_CLOSE, NOTE_MIN, ObjectivesStore
+from suivi_ca.partitions import partition_paths, source_stamp
+from suivi_ca.profiling import CacheStats, RunProfiler
+from suivi_ca.queries import CubeSelection
+from suivi_ca.refresh import DataRefresher
+from suivi_ca.report import build_pdf_report
+from suivi_ca.schema import CA_SCHEMA, CATEGORY, NOTES_SCHEMA, SchemaError, widen
+from suivi_ca.shared import SharedDataStore
+from suivi_ca.snapshot import build_snapshot as load_snapshot, row_index, sql_table
+from suivi_ca.sql import SqlSelection, ca_table as sql_ca_table
+from suivi_ca.sql import available as sql_available, notes_table as sql_notes_table
+from suivi_ca.store import AppendStore
+from suivi_ca.table import last_rows, page
+from suivi_ca.trends import Trends
+from suivi_ca.warmup import warmed_refresher
 
 # -------------------- CONFIG GLOBALE --------------------
 
@@ -15,259 +65,697 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# Fichier de données lu au lancement
-DATA_PATH = "suivi_ca_etoile_v2.xlsx"  # doit être à côté de app.py
+# Requêtes du mode Analyse : "pandas" (cubes journaliers en mémoire) ou
+# "duckdb" (base colonnaire embarquée, si le paquet duckdb est installé)
+ANALYSE_BACKEND = "pandas"
+SQL_ANALYSE = ANALYSE_BACKEND == "duckdb" and sql_available()
 
 
 # -------------------- OBJECTIFS (avec valeurs par défaut) --------------------
 
 
-def init_objectifs():
-    if "objectifs" not in st.session_state:
-        st.session_state["objectifs"] = {
-            "CA_close": {
-                "Amiens": 350.0,
-                "Beauvais": 200.0,
-            },
-            "note_min": 4.5,
-        }
+@st.cache_resource
+def get_objectives_store() -> ObjectivesStore:
+    # objectifs persistés dans la base locale, valeurs par défaut si elle est vide
+    return ObjectivesStore(DB_PATH)
 
 
-init_objectifs()
+objectives = get_objectives_store()
 
 
 # -------------------- FONCTIONS --------------------
 
 
-@st.cache_data
-def load_data_from_excel(path: str):
-    try:
-        xls = pd.ExcelFile(path)
-    except FileNotFoundError:
-        st.error(f"❌ Fichier de données introuvable : {path}")
-        st.info(
-            "Vérifie que le fichier est présent dans le même dossier que app.py "
-            "et bien poussé sur GitHub / Streamlit Cloud."
+@st.cache_resource
+def get_cache_stats() -> CacheStats:
+    return CacheStats()
+
+
+cache_stats = get_cache_stats()
+
+
+def cache_data_counted(**kwargs):
+    """`st.cache_data` qui compte appels et recalculs (hits = appels - recalculs)."""
+
+    def decorator(fn):
+        name = fn.__name__
+
+        # `wraps` : Streamlit dérive la clé de cache du code de `fn`
+        @functools.wraps(fn)
+        def compute(*args, **kw):
+            cache_stats.miss(name)
+            return fn(*args, **kw)
+
+        cached = st.cache_data(**kwargs)(compute)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            cache_stats.call(name)
+            return cached(*args, **kw)
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorator
+
+
+@cache_data_counted(show_spinner=False)
+def cached_ca_cube(stamp, _df_ca: pd.DataFrame) -> pd.DataFrame:
+    # clé = version du classeur : `_df_ca` doit être la table telle que chargée
+    return build_ca_cube(_df_ca)
+
+
+@cache_data_counted(show_spinner=False)
+def cached_notes_cube(stamp, _df_notes: pd.DataFrame) -> pd.DataFrame:
+    return build_notes_cube(_df_notes)
+
+
+def table_alerts(store: AppendStore, cached_build, update, build) -> pd.DataFrame:
+    """Alertes d'une table au dernier jour connu : une fois par version des données / objectifs."""
+
+    def compute():
+        cube = table_cube(store, cached_build, update)
+        as_of = cube["Date"].max()
+        if pd.isna(as_of):
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+        debut = window_start(as_of)
+        return build(
+            row_index(store).slice(debut, as_of),
+            cube_index(store, cached_build, update).slice(debut, as_of),
+            objectives,
+            as_of,
         )
-        st.stop()
 
-    df_ca = pd.read_excel(xls, "CA_Close")
-    df_notes = pd.read_excel(xls, "Évolution_Notes")
+    return store.memo(("alerts", objectives.version), compute)
 
-    df_ca["Date"] = pd.to_datetime(df_ca["Date"])
-    df_notes["Date"] = pd.to_datetime(df_notes["Date"])
-    return df_ca, df_notes
 
+TREND_CURVES = ["Moy. 7 j", "Moy. 28 j", "EWMA"]
+TRENDS_CA = {
+    "CA par close (€)": "Chiffre d’affaires (€)",
+    "CA horaire (€ / h)": "CA horaire (€ / h)",
+}
+TRENDS_NOTES = {"Uber Eats": "Note Uber Eats", "Deliveroo": "Note Deliveroo"}
 
-def compute_duration_hours(period_str: str) -> float:
-    """Calcule la durée en heures à partir d'une chaîne du type '23:00 - 00:00'."""
-    try:
-        start_str, end_str = [s.strip() for s in period_str.split("-")]
-    except Exception:
-        return np.nan
-    start = pd.to_datetime(start_str, format="%H:%M")
-    end = pd.to_datetime(end_str, format="%H:%M")
-    delta = (end - start).total_seconds() / 3600.0
-    if delta <= 0:
-        delta += 24.0
-    return delta
-
-
-def add_ca_horaire(df_ca: pd.DataFrame) -> pd.DataFrame:
-    df = df_ca.copy()
-    df["Duree (h)"] = df["Période de close"].apply(compute_duration_hours)
-    df["CA horaire (€ / h)"] = df["Chiffre d’affaires (€)"] / df["Duree (h)"]
-    df["Cmd horaires"] = df["Nombre commandes"] / df["Duree (h)"]
-    return df
-
-
-def build_excel_bytes(df_ca: pd.DataFrame, df_notes: pd.DataFrame) -> bytes:
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        df_ca.to_excel(writer, sheet_name="CA_Close", index=False)
-        df_notes.to_excel(writer, sheet_name="Évolution_Notes", index=False)
-    buffer.seek(0)
-    return buffer.read()
-
-
-def build_pdf_report(df_ca_f, df_notes_f, ville_sel, date_deb, date_fin):
+
+def table_cube(store: AppendStore, cached_build, update) -> pd.DataFrame:
+    """Cube journalier d'une table, mis à jour avec les lignes ajoutées."""
+    return store.memo_incremental(
+        "cube", lambda base: cached_build(shared.stamp, base), update
+    )
+
+
+def cube_index(store: AppendStore, cached_build, update) -> DateVilleIndex:
+    """Index Date/Ville du cube d'une table."""
+    cube = table_cube(store, cached_build, update)
+    return store.memo("cube_index", lambda: DateVilleIndex(cube))
+
+
+def cube_trends(store: AppendStore, cached_build, update, keys, measures) -> Trends:
+    """Tendances sur tout l'historique, par série `keys` : une fois par version des données."""
+    cube = table_cube(store, cached_build, update)
+    return store.memo(
+        ("trends", tuple(keys)), lambda: Trends(cube, keys, measures)
+    )
+
+
+def table_facts() -> pd.DataFrame:
     """
-    Génère un PDF simple de synthèse (KPI & objectifs).
+    Faits CA × notes par Date × Ville : à chaque ajout, seules les villes et
+    dates des lignes ajoutées (CA ou notes) sont recalculées.
     """
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    y = height - 50
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(40, y, "Synthèse Closes Amiens & Beauvais")
-    y -= 25
-    c.setFont("Helvetica", 10)
-    c.drawString(
-        40,
-        y,
-        f"Période : {date_deb.strftime('%d/%m/%Y')} - {date_fin.strftime('%d/%m/%Y')}   |   Filtre ville : {ville_sel}",
+    faits = store_ca.memo_incremental(
+        "faits", lambda _base: RatingsRevenueFacts(), lambda faits, rows: faits.touch(rows)
+    )
+    # le même objet est prévenu des lignes de notes ajoutées
+    store_notes.memo_incremental(
+        ("faits", store_ca.token), lambda _base: faits, lambda faits, rows: faits.touch(rows)
+    )
+    return faits.frame(
+        table_cube(store_ca, cached_ca_cube, update_ca_cube),
+        table_cube(store_notes, cached_notes_cube, update_notes_cube),
+    )
+
+
+def table_correlations(ville) -> pd.DataFrame:
+    """Corrélations notes / CA par décalage, sur tout l'historique : une fois par version."""
+    faits = table_facts()
+    return store_ca.memo(
+        ("correlations", store_notes.version, ville),
+        lambda: lag_correlations(faits, ville),
+    )
+
+
+def table_values(store: AppendStore, col: str) -> list:
+    """Valeurs distinctes triées d'une colonne (listes des filtres), complétées avec les lignes ajoutées."""
+
+    def distinct(frame):
+        return set(frame[col].dropna().unique().tolist())
+
+    return store.memo_incremental(
+        ("valeurs", col),
+        lambda base: sorted(distinct(base)),
+        lambda valeurs, rows: sorted(distinct(rows).union(valeurs)),
+    )
+
+
+def table_bounds(store: AppendStore) -> tuple:
+    """Première et dernière date d'une table, complétées avec les lignes ajoutées."""
+
+    def bounds(dates: pd.Series) -> tuple:
+        return dates.min(), dates.max()
+
+    return store.memo_incremental(
+        "bornes_dates",
+        lambda base: bounds(base["Date"]),
+        lambda bornes, rows: bounds(pd.Series([*bornes, *bounds(rows["Date"])])),
+    )
+
+
+def table_periods(store: AppendStore) -> dict:
+    """Périodes de close de chaque ville, complétées avec les lignes ajoutées."""
+
+    def periods(frame):
+        return {
+            ville: set(periodes.dropna().unique().tolist())
+            for ville, periodes in frame.groupby("Ville", observed=True)["Période de close"]
+        }
+
+    def update(par_ville, rows):
+        merged = {ville: set(periodes) for ville, periodes in par_ville.items()}
+        for ville, periodes in periods(rows).items():
+            merged.setdefault(ville, set()).update(periodes)
+        return {ville: sorted(periodes) for ville, periodes in merged.items()}
+
+    return store.memo_incremental(
+        "periodes_par_ville", lambda base: update({}, base), update
+    )
+
+
+def table_tail(store: AppendStore, n: int = 10) -> pd.DataFrame:
+    """Dernières lignes par date : celles d'avant et les lignes ajoutées suffisent."""
+    return store.memo_incremental(
+        ("dernieres", n),
+        lambda base: last_rows(base, "Date", n),
+        lambda tail, rows: last_rows(pd.concat([tail, rows]), "Date", n),
     )
-    y -= 30
-
-    # Objectifs
-    obj = st.session_state["objectifs"]
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, y, "Objectifs")
-    y -= 18
-    c.setFont("Helvetica", 10)
-    c.drawString(
-        50,
-        y,
-        f"CA close Amiens ≥ {obj['CA_close']['Amiens']} €  |  CA close Beauvais ≥ {obj['CA_close']['Beauvais']} €",
+
+
+def trend_chart(courbes: pd.DataFrame, title: str, domain=None):
+    """Moyennes 7 / 28 jours et EWMA d'une série (points plafonnés par courbe)."""
+    # import différé, comme dans le mode Analyse (déjà chargé à ce stade)
+    import altair as alt
+
+    long = courbes.melt(
+        id_vars=["Date", "Mesure"],
+        value_vars=TREND_CURVES,
+        var_name="Courbe",
+        value_name="Valeur",
+    )
+    long = cap_points(
+        long.dropna(subset=["Valeur"]).reset_index(drop=True), ["Mesure", "Courbe"], "Valeur"
     )
-    y -= 15
-    c.drawString(50, y, f"Notes (Uber & Deliveroo) ≥ {obj['note_min']}")
-    y -= 30
-
-    # KPI CA
-    if not df_ca_f.empty:
-        total_ca = df_ca_f["Chiffre d’affaires (€)"].sum()
-        total_cmd = df_ca_f["Nombre commandes"].sum()
-        panier_moy = total_ca / total_cmd if total_cmd > 0 else np.nan
-
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(40, y, "KPI CA & commandes")
-        y -= 18
-        c.setFont("Helvetica", 10)
-        c.drawString(50, y, f"CA total : {total_ca:.0f} €")
-        y -= 15
-        c.drawString(50, y, f"Nombre de commandes : {int(total_cmd)}")
-        y -= 15
-        c.drawString(
-            50,
-            y,
-            f"Panier moyen : {panier_moy:.2f} €" if not np.isnan(panier_moy) else "Panier moyen : NA",
+    scale = alt.Scale(domain=domain) if domain else alt.Undefined
+    return (
+        alt.Chart(long)
+        .mark_line()
+        .encode(
+            x="Date:T",
+            y=alt.Y("Valeur:Q", title=title, scale=scale),
+            color="Mesure:N",
+            strokeDash="Courbe:N",
+            tooltip=["Date:T", "Mesure:N", "Courbe:N", alt.Tooltip("Valeur:Q", format=".2f")],
         )
-        y -= 25
-
-    # KPI notes
-    if not df_notes_f.empty:
-        moy_uber = df_notes_f["Note Uber Eats"].mean()
-        moy_deliv = df_notes_f["Note Deliveroo"].mean()
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(40, y, "KPI Notes")
-        y -= 18
-        c.setFont("Helvetica", 10)
-        c.drawString(50, y, f"Note moyenne Uber Eats : {moy_uber:.2f}")
-        y -= 15
-        c.drawString(50, y, f"Note moyenne Deliveroo : {moy_deliv:.2f}")
-        y -= 25
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer.getvalue()
+        .properties(height=300)
+    )
 
 
-# -------------------- CHARGEMENT DES DONNÉES --------------------
+def build_snapshot(source, stamp) -> SharedDataStore:
+    """
+    Données partagées prêtes à servir (appelé hors du chemin des requêtes) :
+    `source` = chemin du classeur, ou tuple des partitions de villes.
+    """
+    return load_snapshot(source, stamp, DB_PATH, sql=SQL_ANALYSE)
 
 
-st.sidebar.title("⚙️ Paramètres")
-st.sidebar.markdown("📡 Source des données : **fichier Excel du projet**")
-st.sidebar.code(DATA_PATH, language="text")
+@st.cache_resource(max_entries=2, on_release=lambda refresher: refresher.stop())
+def get_refresher(source) -> DataRefresher:
+    """
+    Une seule copie des données par source pour tout le serveur ; un thread
+    recharge le classeur (ou les partitions) quand il change et publie le
+    nouveau snapshot.
+    """
+    # serveur lancé par `python -m suivi_ca.warmup --serve` : données déjà chargées
+    refresher = warmed_refresher(source)
+    if refresher is not None:
+        return refresher
+    return DataRefresher(source, build_snapshot, stamp=source_stamp)
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    # partagé par toutes les sessions : les PDF / exports déjà produits sont réutilisés
+    return JobRunner(max_workers=2)
+
+
+def show_job_download(job, label: str, file_name: str, mime: str, what: str):
+    """Bouton de téléchargement d'un job, ou état d'avancement s'il tourne encore."""
+    wait([job], timeout=2.0)
+    if not job.done():
+        st.info(f"⏳ Génération {what} en cours…")
+        st.button("🔄 Actualiser", key=f"refresh_{what}")
+    elif job.exception() is not None:
+        st.error(f"❌ Échec de la génération {what} : {job.exception()}")
+    else:
+        st.download_button(label=label, data=job.result(), file_name=file_name, mime=mime)
 
-if "df_ca" not in st.session_state or "df_notes" not in st.session_state:
-    df_ca_raw, df_notes_raw = load_data_from_excel(DATA_PATH)
-    st.session_state["df_ca"] = add_ca_horaire(df_ca_raw)
-    st.session_state["df_notes"] = df_notes_raw.copy()
 
-df_ca = st.session_state["df_ca"]
-df_notes = st.session_state["df_notes"]
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+@st.fragment
+def paged_table(df: pd.DataFrame, key: str, default_sort: list, schema: dict, decorate=None):
+    """
+    Table paginée côté serveur : seule la page visible est triée, décorée
+    (`decorate(page)` ajoute les colonnes de statut) et envoyée au navigateur.
+    Fragment : recherche, tri et changement de page ne relancent que la table.
+    """
+    col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
+    recherche = col1.text_input("🔎 Rechercher", key=f"{key}_search")
+    tri = col2.selectbox("Trier par", list(df.columns), key=f"{key}_sort")
+    decroissant = col3.toggle("Décroissant", key=f"{key}_desc")
+    taille = col4.selectbox("Lignes / page", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    # clé choisie, puis l'ordre par défaut pour départager
+    cles = [tri] + [c for c in default_sort if c != tri]
+    numero = st.session_state.get(f"{key}_page", 1)
+    lignes, total = page(df, cles, not decroissant, numero - 1, taille, query=recherche)
+    n_pages = max(1, -(-total // taille))
+    if numero > n_pages:
+        # moins de lignes qu'avant (recherche, filtres) : dernière page
+        numero = n_pages
+        lignes, total = page(df, cles, not decroissant, numero - 1, taille, query=recherche)
+    st.session_state[f"{key}_page"] = numero
+
+    if decorate is not None:
+        lignes = decorate(lignes)
+    # valeurs saisies (et non leur approximation float32) à l'affichage
+    st.dataframe(widen(lignes, schema), use_container_width=True)
+
+    col1, col2 = st.columns([1, 3])
+    col1.number_input(
+        f"Page (sur {n_pages})", min_value=1, max_value=n_pages, step=1, key=f"{key}_page"
+    )
+    debut = (numero - 1) * taille
+    col2.caption(f"Lignes {min(debut + 1, total)}–{debut + len(lignes)} sur {total}")
+
+
+def render_profiling():
+    """Section debug de la barre latérale : étapes, mémoire, caches, exports."""
+    if not prof.enabled:
+        return
+    with st.sidebar.expander("🛠️ Profilage de l'exécution", expanded=True):
+        st.metric("Durée du script (ms)", f"{prof.total_ms():.0f}")
+        st.dataframe(prof.spans(), hide_index=True, use_container_width=True)
+        st.caption("Mémoire des tables de la session")
+        st.dataframe(prof.memory(), hide_index=True, use_container_width=True)
+        st.caption("Caches `st.cache_data` (depuis le démarrage du serveur)")
+        st.dataframe(cache_stats.table(), hide_index=True, use_container_width=True)
+        horodatage = datetime.now().strftime("%Y%m%d_%H%M%S")
+        st.download_button(
+            "📥 Profil (JSON)",
+            data=prof.to_json(cache_stats.snapshot()),
+            file_name=f"profil_{horodatage}.json",
+            mime="application/json",
+        )
+        st.download_button(
+            "📥 Trace (chrome://tracing)",
+            data=prof.to_trace(),
+            file_name=f"trace_{horodatage}.json",
+            mime="application/json",
+        )
 
-# -------------------- FILTRES GLOBAUX --------------------
 
-mode = st.sidebar.selectbox(
+def stop_run():
+    # le panneau de profilage est rendu même quand le script s'arrête tôt
+    render_profiling()
+    st.stop()
+
+
+def data_changed(message: str):
+    """
+    Après un ajout de données : rerun complet (toutes les sections en
+    dépendent), `message` affiché par `show_data_changed` au rerun suivant.
+    """
+    st.session_state["data_version"] = shared.version
+    st.session_state["message_donnees"] = message
+    st.rerun()
+
+
+def show_data_changed():
+    message = st.session_state.pop("message_donnees", None)
+    if message is not None:
+        st.success(message)
+
+
+def data_version() -> tuple:
+    """Identifie le contenu des données partagées (classeur + saisies)."""
+    return (
+        shared.stamp,
+        store_ca.token,
+        store_ca.version,
+        store_notes.token,
+        store_notes.version,
+    )
+
+
+def forecasts_job(timeout: float = 0.5):
+    """
+    Prévisions de la semaine suivante, ajustées par le pool de tâches une
+    fois par version de CA_Close ; None tant que le calcul n'est pas fini.
+    """
+    cube = table_cube(store_ca, cached_ca_cube, update_ca_cube)
+    as_of = cube["Date"].max()
+    if pd.isna(as_of):
+        return None
+    historique = cube_index(store_ca, cached_ca_cube, update_ca_cube).slice(
+        as_of - pd.Timedelta(days=FORECAST_HISTORY_DAYS - 1), as_of
+    )
+    job = get_job_runner().submit(
+        ("forecast", shared.stamp, store_ca.token, store_ca.version),
+        fit_forecasts,
+        historique,
+        as_of,
+    )
+    wait([job], timeout=timeout)
+    if not job.done() or job.exception() is not None:
+        return None
+    return job.result()
+
+
+# -------------------- CHARGEMENT DES DONNÉES --------------------
+
+
+# partitions par ville si le dossier existe, sinon le classeur unique
+partitions = partition_paths(PARTITIONS_DIR)
+
+st.sidebar.title("⚙️ Paramètres")
+if partitions:
+    st.sidebar.markdown(
+        f"📡 Source des données : **un classeur par ville** ({len(partitions)} villes)"
+    )
+    st.sidebar.code(PARTITIONS_DIR, language="text")
+else:
+    st.sidebar.markdown("📡 Source des données : **fichier Excel du projet**")
+    st.sidebar.code(DATA_PATH, language="text")
+
+# instrumentation opt-in (case à cocher ou `?debug=1` dans l'URL)
+prof = RunProfiler(
+    enabled=st.sidebar.toggle(
+        "🛠️ Profilage (debug)",
+        value=st.query_params.get("debug") == "1",
+        help="Chronomètre chaque étape du script et affiche les compteurs de cache.",
+    )
+)
+
+filtres = st.sidebar.container()
+mode = filtres.selectbox(
     "Mode",
     ["Analyse", "Objectifs", "Saisie des données"],
     help="Analyse = dashboard, Objectifs = configuration, Saisie = ajout de données.",
 )
+# toutes les partitions chargées ensemble : une seule copie partagée des
+# données, la ville choisie n'est qu'un filtre
+source = tuple(partitions.values()) if partitions else DATA_PATH
+
+with prof.span("chargement"):
+    try:
+        refresher = get_refresher(source)
+    except FileNotFoundError as err:
+        st.error(f"❌ Fichier de données introuvable : {err}")
+        st.info(
+            "Vérifie que le fichier est présent dans le même dossier que app.py "
+            "et bien poussé sur GitHub / Streamlit Cloud."
+        )
+        stop_run()
+    except SchemaError as err:
+        st.error(f"❌ Fichier de données non conforme : {err}")
+        stop_run()
+    # snapshot lu une fois : tout le rerun travaille sur les mêmes données
+    generation, shared = refresher.snapshot()
+    # lignes saisies depuis par un autre processus du serveur
+    shared.sync()
+store_ca = shared.ca
+store_notes = shared.notes
+
+st.sidebar.caption(
+    f"Données chargées à {datetime.fromtimestamp(refresher.loaded_at):%H:%M:%S} "
+    "(rechargées automatiquement si le fichier change)"
+)
+if refresher.error is not None:
+    st.sidebar.warning(
+        f"⚠️ Rechargement impossible, données précédentes conservées : {refresher.error}"
+    )
 
-villes = ["Toutes"] + sorted(df_ca["Ville"].dropna().unique().tolist())
-ville_sel = st.sidebar.selectbox("Ville", villes)
+# comparaison d'entiers : la session voit si le classeur ou les saisies ont
+# changé (numéros propres à chaque source : rien à signaler si elle a changé)
+meme_source = st.session_state.get("data_source", source) == source
+if meme_source and st.session_state.get("data_generation", generation) != generation:
+    st.toast("🔄 Nouvelle version du fichier de données chargée.")
+elif meme_source and st.session_state.get("data_version", shared.version) != shared.version:
+    st.toast("🔄 Données mises à jour par un autre utilisateur.")
+st.session_state["data_source"] = source
+st.session_state["data_generation"] = generation
+st.session_state["data_version"] = shared.version
+
+if prof.enabled:
+    # table entière : seulement en profilage (fusionne les lignes ajoutées)
+    prof.record_memory("CA_Close", store_ca.frame)
+    prof.record_memory("Évolution_Notes", store_notes.frame)
+
+# -------------------- FILTRES GLOBAUX --------------------
 
-min_date = min(df_ca["Date"].min(), df_notes["Date"].min())
-max_date = max(df_ca["Date"].max(), df_notes["Date"].max())
-date_deb, date_fin = st.sidebar.date_input(
+# listes et bornes des filtres mémoïsées, complétées avec les lignes
+# ajoutées : pas recalculées sur toutes les lignes à chaque rerun
+# avec des partitions : une ville par classeur, même sans ligne encore
+villes = ["Toutes"] + (list(partitions) if partitions else table_values(store_ca, "Ville"))
+ville_sel = filtres.selectbox("Ville", villes)
+
+bornes = [table_bounds(store) for store in (store_ca, store_notes)]
+min_date = min(debut for debut, _ in bornes)
+max_date = max(fin for _, fin in bornes)
+date_deb, date_fin = filtres.date_input(
     "Période d'analyse",
     value=(min_date.date(), max_date.date()),
     min_value=min_date.date(),
     max_value=max_date.date(),
 )
 
-objectifs = st.session_state["objectifs"]
+# objectifs en vigueur aujourd'hui (affichage, PDF)
+objectifs = objectives.as_dict(villes[1:])
 
 # -------------------- MODE OBJECTIFS --------------------
 
 if mode == "Objectifs":
     st.title("🎯 Paramétrage des objectifs")
 
-    st.markdown("## Objectifs CA close par ville")
+    # chaque bloc est un fragment : saisir une valeur ne relance que son bloc
+    @st.fragment
+    def section_objectifs(villes_obj):
+        # relus ici : un enregistrement dans le fragment ne relance pas le script
+        objectifs_courants = objectives.as_dict(villes_obj)
 
-    col1, col2 = st.columns(2)
-    with col1:
-        obj_amiens = st.number_input(
-            "Objectif CA close Amiens (€)",
-            min_value=0.0,
-            step=10.0,
-            value=float(objectifs["CA_close"]["Amiens"]),
-        )
-    with col2:
-        obj_beauvais = st.number_input(
-            "Objectif CA close Beauvais (€)",
+        st.markdown("## Objectifs CA close par ville")
+
+        valeurs_ca = {}
+        cols = st.columns(2)
+        for i, ville in enumerate(villes_obj):
+            with cols[i % 2]:
+                valeurs_ca[ville] = st.number_input(
+                    f"Objectif CA close {ville} (€)",
+                    min_value=0.0,
+                    step=10.0,
+                    value=float(objectifs_courants["CA_close"].get(ville, 0.0)),
+                )
+
+        section_suggestions(objectifs_courants["CA_close"])
+
+        st.markdown("## Objectif notes (étoiles)")
+
+        obj_note = st.number_input(
+            "Objectif note minimale (Uber & Deliveroo)",
             min_value=0.0,
-            step=10.0,
-            value=float(objectifs["CA_close"]["Beauvais"]),
+            max_value=5.0,
+            step=0.1,
+            value=float(objectifs_courants["note_min"] or 0.0),
         )
 
-    st.markdown("## Objectif notes (étoiles)")
-
-    obj_note = st.number_input(
-        "Objectif note minimale (Uber & Deliveroo)",
-        min_value=0.0,
-        max_value=5.0,
-        step=0.1,
-        value=float(objectifs["note_min"]),
+        tout_historique = st.checkbox(
+            "Appliquer à tout l'historique",
+            value=True,
+            help="Remplace aussi les objectifs datés de la même ville (ou de la note minimale globale).",
+        )
+        valid_from = None
+        if not tout_historique:
+            valid_from = st.date_input("Applicable à partir du", value=date.today())
+
+        if st.button("💾 Enregistrer les objectifs"):
+            for ville, valeur in valeurs_ca.items():
+                if valeur != objectifs_courants["CA_close"].get(ville, 0.0):
+                    objectives.set_target(CA_CLOSE, valeur, ville=ville, valid_from=valid_from)
+            if obj_note != objectifs_courants["note_min"]:
+                objectives.set_target(NOTE_MIN, obj_note, valid_from=valid_from)
+            st.success("✅ Objectifs enregistrés (partagés par tous les utilisateurs).")
+
+    @st.fragment
+    def section_suggestions(objectifs_ca: dict):
+        st.markdown("### 💡 Objectifs suggérés (prévision de la semaine suivante)")
+        with prof.span("objectifs suggérés"):
+            previsions = forecasts_job(timeout=2.0)
+        if previsions is None:
+            st.info("⏳ Prévision en cours de calcul…")
+            st.button("🔄 Actualiser", key="refresh_suggestions")
+        elif previsions.empty:
+            st.caption("Historique insuffisant pour proposer des objectifs.")
+        else:
+            debut_prevision = previsions["Date"].min()
+            suggestions = suggest_objectives(previsions)
+            suggestions["Objectif actuel (€)"] = suggestions["Ville"].map(objectifs_ca)
+            st.caption(
+                f"CA par close atteint sur ~{OK_PCT} % des closes prévues du "
+                f"{debut_prevision:%d/%m} au {previsions['Date'].max():%d/%m} "
+                "(tendance + effet du jour de la semaine, 26 dernières semaines)."
+            )
+            st.dataframe(suggestions, hide_index=True, use_container_width=True)
+            with st.expander("Par période de close"):
+                st.dataframe(
+                    suggest_objectives(previsions, ["Ville", "Période de close"]),
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            if st.button(f"✅ Appliquer ces objectifs à partir du {debut_prevision:%d/%m/%Y}"):
+                for ville, valeur in zip(suggestions["Ville"], suggestions["Objectif suggéré (€)"]):
+                    objectives.set_target(CA_CLOSE, valeur, ville=ville, valid_from=debut_prevision)
+                st.success("✅ Objectifs suggérés enregistrés.")
+                # champs de saisie au-dessus à mettre à jour : tout le script
+                st.rerun()
+
+    @st.fragment
+    def section_objectifs_detailles(villes_obj, periodes, marques_obj):
+        with st.expander("🎯 Objectifs détaillés (par période de close / marque, datés)"):
+            type_obj = st.radio(
+                "Type d'objectif",
+                ["CA par close (€)", "Note minimale"],
+                horizontal=True,
+            )
+            col1, col2 = st.columns(2)
+            ville_obj = col1.selectbox("Ville", villes_obj, key="ville_obj")
+            if type_obj == "CA par close (€)":
+                periode_obj = col2.selectbox(
+                    "Période de close", ["Toutes"] + periodes, key="periode_obj"
+                )
+                marque_obj = "Toutes"
+            else:
+                periode_obj = "Toutes"
+                marque_obj = col2.selectbox("Marque", ["Toutes"] + marques_obj, key="marque_obj")
+            col3, col4 = st.columns(2)
+            valeur_obj = col3.number_input("Valeur", min_value=0.0, step=0.5, key="valeur_obj")
+            debut_obj = col4.date_input("Applicable à partir du", value=None, key="debut_obj")
+
+            if st.button("➕ Ajouter cet objectif"):
+                objectives.set_target(
+                    CA_CLOSE if type_obj == "CA par close (€)" else NOTE_MIN,
+                    valeur_obj,
+                    ville=None if ville_obj == "Toutes" else ville_obj,
+                    periode_close=None if periode_obj == "Toutes" else periode_obj,
+                    marque=None if marque_obj == "Toutes" else marque_obj,
+                    valid_from=debut_obj,
+                )
+                st.success("✅ Objectif ajouté.")
+
+            cibles = objectives.targets()
+            st.dataframe(
+                cibles.fillna({"ville": "Toutes", "periode_close": "Toutes", "marque": "Toutes"}),
+                hide_index=True,
+                use_container_width=True,
+            )
+            if not cibles.empty:
+                id_suppr = st.selectbox("Objectif à supprimer (id)", cibles["id"].tolist())
+                if st.button("🗑️ Supprimer"):
+                    try:
+                        objectives.delete_target(id_suppr)
+                    except ValueError as err:
+                        st.error(f"❌ {err}")
+                    else:
+                        st.rerun(scope="fragment")
+
+    section_objectifs(villes[1:])
+    section_objectifs_detailles(
+        villes,
+        table_values(store_ca, "Période de close"),
+        table_values(store_notes, "Marque"),
     )
 
-    if st.button("💾 Enregistrer les objectifs pour cette session"):
-        st.session_state["objectifs"]["CA_close"]["Amiens"] = obj_amiens
-        st.session_state["objectifs"]["CA_close"]["Beauvais"] = obj_beauvais
-        st.session_state["objectifs"]["note_min"] = obj_note
-        st.success("✅ Objectifs mis à jour pour cette session.")
-
     st.info(
-        "Ces objectifs sont mémorisés tant que ta session Streamlit reste ouverte. "
-        "Pour une persistance plus longue, on pourra plus tard les stocker dans un Google Sheets ou une base."
+        "Les objectifs sont enregistrés dans la base locale et partagés par tous les utilisateurs. "
+        "Pour une ligne donnée, l'objectif le plus précis (ville + période / marque) "
+        "en vigueur à sa date s'applique."
     )
 
 # -------------------- MODE ANALYSE --------------------
 
 elif mode == "Analyse":
+    # chargé au premier affichage d'un graphique (ou au démarrage, serveur préchauffé)
+    import altair as alt
+
     section = st.sidebar.radio(
         "Section",
-        ["CA & commandes closes", "Évolution des notes (étoiles)"],
+        ["CA & commandes closes", "Évolution des notes (étoiles)", "🔗 Notes × CA", "🚨 Alertes"],
     )
 
-    # filtres de base
-    mask_dates_ca = (df_ca["Date"] >= pd.to_datetime(date_deb)) & (
-        df_ca["Date"] <= pd.to_datetime(date_fin)
-    )
-    mask_dates_notes = (df_notes["Date"] >= pd.to_datetime(date_deb)) & (
-        df_notes["Date"] <= pd.to_datetime(date_fin)
+    # alertes précalculées (toutes villes), relues telles quelles à chaque rerun
+    with prof.span("alertes"):
+        alertes = pd.concat(
+            [
+                table_alerts(store_ca, cached_ca_cube, update_ca_cube, ca_alerts),
+                table_alerts(store_notes, cached_notes_cube, update_notes_cube, notes_alerts),
+            ],
+            ignore_index=True,
+        )
+    nb_alertes = alerts_summary(alertes)
+    st.sidebar.caption(
+        f"🚨 Alertes : {nb_alertes['🔴']} 🔴 · {nb_alertes['🟡']} 🟡 (section « Alertes »)"
     )
 
-    df_ca_f = df_ca[mask_dates_ca].copy()
-    df_notes_f = df_notes[mask_dates_notes].copy()
+    # filtres de base : tranches (vues) sur les index triés par date / ville,
+    # reconstruits seulement quand des lignes sont ajoutées
+    with prof.span("filtres"):
+        ville_filtre = None if ville_sel == "Toutes" else ville_sel
+        # mêmes requêtes sur les cubes pandas ou sur la base DuckDB (ANALYSE_BACKEND)
+        if SQL_ANALYSE:
+            selection = SqlSelection(
+                sql_table(store_ca, sql_ca_table),
+                sql_table(store_notes, sql_notes_table),
+                store_ca,
+                store_notes,
+                date_deb,
+                date_fin,
+                ville_filtre,
+            )
+        else:
+            selection = CubeSelection(
+                row_index(store_ca),
+                row_index(store_notes),
+                cube_index(store_ca, cached_ca_cube, update_ca_cube),
+                cube_index(store_notes, cached_notes_cube, update_notes_cube),
+                date_deb,
+                date_fin,
+                ville_filtre,
+            )
 
-    if ville_sel != "Toutes":
-        df_ca_f = df_ca_f[df_ca_f["Ville"] == ville_sel]
-        df_notes_f = df_notes_f[df_notes_f["Ville"] == ville_sel]
+        df_ca_f = selection.ca_rows()
+        df_notes_f = selection.notes_rows()
+    prof.record_memory("CA_Close filtré", df_ca_f)
+    prof.record_memory("Évolution_Notes filtré", df_notes_f)
 
     # --------- PAGE CA / COMMANDES ---------
     if section == "CA & commandes closes":
@@ -275,26 +763,24 @@ elif mode == "Analyse":
 
         if df_ca_f.empty:
             st.warning("Aucune donnée pour les filtres sélectionnés.")
-            st.stop()
-
-        total_ca = df_ca_f["Chiffre d’affaires (€)"].sum()
-        total_cmd = df_ca_f["Nombre commandes"].sum()
-        panier_moy = total_ca / total_cmd if total_cmd > 0 else np.nan
-        ca_horaire_moy = df_ca_f["CA horaire (€ / h)"].mean()
-
-        # Objectif CA pour la ville sélectionnée
-        objectif_ca = None
-        if ville_sel in objectifs["CA_close"]:
-            objectif_ca = objectifs["CA_close"][ville_sel]
-
-        # Statut objectif par ligne + % OK
-        if objectif_ca is not None:
-            df_ca_f["OK_objectif_CA"] = df_ca_f["Chiffre d’affaires (€)"] >= objectif_ca
-            nb_ok = int(df_ca_f["OK_objectif_CA"].sum())
-            nb_total = len(df_ca_f)
-            pct_ok = 100 * nb_ok / nb_total if nb_total > 0 else 0
-        else:
-            nb_ok = nb_total = pct_ok = None
+            stop_run()
+
+        with prof.span("KPI CA"):
+            # KPI et agrégats lus dans le cube journalier (ou la base) plutôt que sur le détail
+            kpis_ca = selection.ca_kpis()
+            total_ca = kpis_ca["total_ca"]
+            total_cmd = kpis_ca["total_cmd"]
+            panier_moy = kpis_ca["panier_moy"]
+            ca_horaire_moy = kpis_ca["ca_horaire_moy"]
+
+            # Objectif applicable à chaque close (toutes villes, jointure sur les objectifs)
+            # Statut objectif par ligne + % OK (mêmes calculs que les rapports en lot)
+            conformite_ca = ca_compliance(df_ca_f, objectives.evaluate_ca(df_ca_f))
+            objectif_ligne, ok_ca = conformite_ca.objectif, conformite_ca.ok
+            if conformite_ca.nb_total > 0:
+                nb_ok, nb_total, pct_ok = conformite_ca.nb_ok, conformite_ca.nb_total, conformite_ca.pct
+            else:
+                nb_ok = nb_total = pct_ok = None
 
         col1, col2 = st.columns(2)
         col3, col4 = st.columns(2)
@@ -310,215 +796,528 @@ elif mode == "Analyse":
             f"{ca_horaire_moy:.2f}" if not np.isnan(ca_horaire_moy) else "NA",
         )
 
-        if objectif_ca is not None:
-            emoji = "🟢" if pct_ok >= 80 else "🟡" if pct_ok >= 50 else "🔴"
+        if nb_total is not None:
+            emoji = traffic_light(pct_ok)
+            objectif_ca = objectifs["CA_close"].get(ville_sel)
+            titre = (
+                f"Objectif CA close {ville_sel} : {objectif_ca} € par close"
+                if objectif_ca is not None
+                else "Objectifs CA close par ville"
+            )
             st.markdown(
-                f"**Objectif CA close {ville_sel} : {objectif_ca} € par close**  "
+                f"**{titre}**  "
                 f"→ Closes ≥ objectif : **{nb_ok} / {nb_total}** ({pct_ok:.1f} %) {emoji}"
             )
 
         st.markdown("### 🏆 Top périodes de close (par CA horaire)")
-        top_periods = (
-            df_ca_f.groupby(
-                ["Ville", "Période de close"], as_index=False
-            )[["CA horaire (€ / h)", "Chiffre d’affaires (€)", "Nombre commandes"]]
-            .mean(numeric_only=True)
-            .sort_values("CA horaire (€ / h)", ascending=False)
-        )
-        st.dataframe(top_periods.head(10), use_container_width=True)
+        with prof.span("table top périodes"):
+            top_periods = selection.top_periods()
+            st.dataframe(top_periods.head(10), use_container_width=True)
 
         st.markdown("### 📆 Évolution du CA par période de close")
-        pivot_ca = (
-            df_ca_f.groupby(
-                ["Date", "Ville", "Période de close"], as_index=False
-            )[
-                [
-                    "Chiffre d’affaires (€)",
-                    "Nombre commandes",
-                    "CA horaire (€ / h)",
-                    "Cmd horaires",
-                ]
-            ]
-            .sum()
-        )
+        with prof.span("courbes CA"):
+            pivot_ca = selection.pivot_ca()
 
-        ca_chart = (
-            alt.Chart(pivot_ca)
-            .mark_line(point=True)
-            .encode(
-                x="Date:T",
-                y=alt.Y("Chiffre d’affaires (€):Q", title="CA (€)"),
-                color="Période de close:N",
-                tooltip=[
-                    "Date:T",
-                    "Ville:N",
-                    "Période de close:N",
-                    "Chiffre d’affaires (€):Q",
-                    "Nombre commandes:Q",
-                ],
+            # résolution choisie selon la période sélectionnée, points plafonnés
+            series_ca = ["Ville", "Période de close"]
+            freq = choose_resolution(
+                date_deb, date_fin, len(pivot_ca[series_ca].drop_duplicates())
             )
-            .properties(height=350)
-        )
-        st.altair_chart(ca_chart, use_container_width=True)
+            courbes_ca = resample(
+                pivot_ca, freq, series_ca, ["Chiffre d’affaires (€)", "Nombre commandes"]
+            )
+
+        # sections avec leurs propres widgets : des fragments, relancés seuls
+        # quand on les touche, avec leurs entrées passées explicitement
+        @st.fragment
+        def section_graphique_ca(courbes_ca, freq, ville_filtre):
+            with prof.span("graphique CA"):
+                st.caption(f"Résolution : par {RESOLUTIONS[freq]}")
+                ca_chart = (
+                    alt.Chart(cap_points(courbes_ca, series_ca, "Chiffre d’affaires (€)"))
+                    .mark_line(point=True)
+                    .encode(
+                        x="Date:T",
+                        y=alt.Y("Chiffre d’affaires (€):Q", title="CA (€)"),
+                        color="Période de close:N",
+                        tooltip=[
+                            "Date:T",
+                            "Ville:N",
+                            "Période de close:N",
+                            "Chiffre d’affaires (€):Q",
+                            "Nombre commandes:Q",
+                        ],
+                    )
+                    .properties(height=350)
+                )
+                # prévision ajustée en arrière-plan : bande à 80 % sur les 7 jours suivants
+                previsions = None
+                if st.toggle("🔮 Prévision de la semaine suivante", value=True, key="prevision_ca"):
+                    previsions = forecasts_job()
+                    if previsions is None:
+                        st.caption("⏳ Prévision en cours de calcul…")
+                    elif freq != "D":
+                        st.caption("Prévision affichée à la résolution journalière (période plus courte).")
+                    else:
+                        prevision_ca = previsions[previsions["Mesure"] == "CA par close (€)"]
+                        if ville_filtre is not None:
+                            prevision_ca = prevision_ca[prevision_ca["Ville"] == ville_filtre]
+                        bande = alt.Chart(prevision_ca).encode(
+                            x="Date:T", color="Période de close:N", detail="Ville:N"
+                        )
+                        ca_chart = (
+                            ca_chart
+                            + bande.mark_area(opacity=0.2).encode(y="Bas:Q", y2="Haut:Q")
+                            + bande.mark_line(strokeDash=[4, 4]).encode(
+                                y="Prévision:Q",
+                                tooltip=[
+                                    "Date:T",
+                                    "Ville:N",
+                                    "Période de close:N",
+                                    alt.Tooltip("Prévision:Q", format=".2f"),
+                                    alt.Tooltip("Bas:Q", format=".2f"),
+                                    alt.Tooltip("Haut:Q", format=".2f"),
+                                ],
+                            )
+                        )
+                st.altair_chart(ca_chart, use_container_width=True)
+                if previsions is not None and not previsions.empty:
+                    with st.expander("🔮 Prévision par période de close (moyenne de la semaine suivante)"):
+                        detail_prevision = previsions
+                        if ville_filtre is not None:
+                            detail_prevision = detail_prevision[detail_prevision["Ville"] == ville_filtre]
+                        st.dataframe(
+                            detail_prevision.pivot_table(
+                                index=["Ville", "Période de close"],
+                                columns="Mesure",
+                                values=["Prévision", "Bas", "Haut"],
+                                observed=True,
+                            )
+                            .swaplevel(axis=1)
+                            .sort_index(axis=1)
+                            .round(2),
+                            use_container_width=True,
+                        )
+
+        section_graphique_ca(courbes_ca, freq, ville_filtre)
 
         st.markdown("### 📦 Évolution du nombre de commandes par période de close")
-        cmd_chart = (
-            alt.Chart(pivot_ca)
-            .mark_line(point=True)
-            .encode(
-                x="Date:T",
-                y=alt.Y("Nombre commandes:Q", title="Nombre de commandes"),
-                color="Période de close:N",
-                tooltip=[
-                    "Date:T",
-                    "Ville:N",
-                    "Période de close:N",
-                    "Nombre commandes:Q",
-                ],
+        with prof.span("graphique commandes"):
+            cmd_chart = (
+                alt.Chart(cap_points(courbes_ca, series_ca, "Nombre commandes"))
+                .mark_line(point=True)
+                .encode(
+                    x="Date:T",
+                    y=alt.Y("Nombre commandes:Q", title="Nombre de commandes"),
+                    color="Période de close:N",
+                    tooltip=[
+                        "Date:T",
+                        "Ville:N",
+                        "Période de close:N",
+                        "Nombre commandes:Q",
+                    ],
+                )
+                .properties(height=350)
             )
-            .properties(height=350)
-        )
-        st.altair_chart(cmd_chart, use_container_width=True)
+            st.altair_chart(cmd_chart, use_container_width=True)
 
         st.markdown("### 🔥 Heatmap CA horaire (Date × Période de close)")
-        heat = df_ca_f.copy()
-        heat["Date_str"] = heat["Date"].dt.strftime("%Y-%m-%d")
-
-        heat_chart = (
-            alt.Chart(heat)
-            .mark_rect()
-            .encode(
-                x=alt.X("Période de close:N", title="Période de close"),
-                y=alt.Y("Date_str:O", title="Date"),
-                color=alt.Color("CA horaire (€ / h):Q", title="CA horaire (€ / h)"),
-                tooltip=[
-                    "Date:T",
-                    "Ville:N",
-                    "Période de close:N",
-                    "CA horaire (€ / h):Q",
-                    "Chiffre d’affaires (€):Q",
-                    "Nombre commandes:Q",
-                ],
+        with prof.span("heatmap CA horaire"):
+            heat_series = ["Ville", "Période de close"]
+            heat = selection.ca_heatmap(freq)
+            heat_total = len(heat[heat_series].drop_duplicates())
+            # une case par intervalle × série : plafond atteint même au mois
+            heat = top_series(heat, heat_series, "Chiffre d’affaires (€)")
+            heat_kept = len(heat[heat_series].drop_duplicates())
+            if heat_kept < heat_total:
+                st.caption(
+                    f"{heat_kept} séries Ville × Période de close sur {heat_total} "
+                    "affichées (plus gros CA de la période)."
+                )
+            heat["Date_str"] = heat["Date"].dt.strftime("%Y-%m-%d")
+
+            heat_chart = (
+                alt.Chart(heat)
+                .mark_rect()
+                .encode(
+                    x=alt.X("Période de close:N", title="Période de close"),
+                    y=alt.Y("Date_str:O", title="Date"),
+                    color=alt.Color("CA horaire (€ / h):Q", title="CA horaire (€ / h)"),
+                    tooltip=[
+                        "Date:T",
+                        "Ville:N",
+                        "Période de close:N",
+                        "CA horaire (€ / h):Q",
+                        "Chiffre d’affaires (€):Q",
+                        "Nombre commandes:Q",
+                    ],
+                )
+                .properties(height=350)
             )
-            .properties(height=350)
-        )
-        st.altair_chart(heat_chart, use_container_width=True)
+            st.altair_chart(heat_chart, use_container_width=True)
+
+        @st.fragment
+        def section_tendances_ca(date_deb, date_fin, ville_filtre):
+            st.markdown("### 📈 Tendances (moyennes glissantes 7 / 28 jours, EWMA)")
+            with prof.span("tendances CA"):
+                # calculées sur tout l'historique : fenêtres complètes dès le début de la période
+                tendances_ca = cube_trends(
+                    store_ca,
+                    cached_ca_cube,
+                    update_ca_cube,
+                    ["Ville"] if ville_filtre is not None else [],
+                    TRENDS_CA,
+                )
+                mesure_tendance = st.radio(
+                    "Mesure", list(TRENDS_CA), horizontal=True, key="mesure_tendance_ca"
+                )
+                courbes_tendance = tendances_ca.frame(date_deb, date_fin, Ville=ville_filtre)
+                st.altair_chart(
+                    trend_chart(
+                        courbes_tendance[courbes_tendance["Mesure"] == mesure_tendance],
+                        mesure_tendance,
+                    ),
+                    use_container_width=True,
+                )
+                st.caption(
+                    f"Au {date_fin:%d/%m/%Y} : Δ S-1 = moyenne 7 j vs semaine précédente, "
+                    "Δ A-1 = moyenne 28 j vs même fenêtre 52 semaines plus tôt."
+                )
+                resume_ca = cube_trends(
+                    store_ca, cached_ca_cube, update_ca_cube, ["Ville"], TRENDS_CA
+                ).latest(date_fin, Ville=ville_filtre)
+                st.dataframe(resume_ca.round(2), hide_index=True, use_container_width=True)
+
+        section_tendances_ca(date_deb, date_fin, ville_filtre)
 
         st.markdown("### 📊 Détail des données (avec CA horaire & statut objectif)")
 
-        if objectif_ca is not None:
-            df_ca_show = df_ca_f.copy()
-            df_ca_show["Statut objectif CA"] = np.where(
-                df_ca_show["OK_objectif_CA"], "🟢 OK", "🔴 Sous objectif"
+        def statut_ca(lignes: pd.DataFrame) -> pd.DataFrame:
+            # colonnes de statut calculées pour la page affichée seulement
+            ok = ok_ca.loc[lignes.index]
+            objectif = objectif_ligne.loc[lignes.index]
+            return lignes.assign(
+                OK_objectif_CA=ok,
+                **{
+                    "Objectif CA (€)": objectif.astype("float64").round(2),
+                    "Statut objectif CA": np.select(
+                        [objectif.isna(), ok],
+                        ["⚪ Sans objectif", "🟢 OK"],
+                        "🔴 Sous objectif",
+                    ),
+                },
             )
-        else:
-            df_ca_show = df_ca_f.copy()
-
-        st.dataframe(
-            df_ca_show.sort_values(["Date", "Ville", "Période de close"]),
-            use_container_width=True,
-        )
 
-        # PDF report
-        st.markdown("### 🧾 Export PDF synthèse")
-        if st.button("Générer un PDF de synthèse"):
-            pdf_bytes = build_pdf_report(
-                df_ca_f, df_notes_f, ville_sel, pd.to_datetime(date_deb), pd.to_datetime(date_fin)
-            )
-            st.download_button(
-                label="📥 Télécharger le PDF",
-                data=pdf_bytes,
-                file_name=f"rapport_closes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                mime="application/pdf",
+        with prof.span("table détail CA"):
+            paged_table(
+                df_ca_f,
+                "detail_ca",
+                ["Date", "Ville", "Période de close"],
+                CA_SCHEMA,
+                decorate=statut_ca if nb_total is not None else None,
             )
 
+        # PDF report : généré en arrière-plan, mémoïsé par filtres / objectifs / données
+        @st.fragment
+        def section_pdf(df_ca_f, df_notes_f, ville_sel, date_deb, date_fin, objectifs):
+            st.markdown("### 🧾 Export PDF synthèse")
+            with prof.span("export PDF"):
+                pdf_key = (
+                    "pdf",
+                    ville_sel,
+                    str(date_deb),
+                    str(date_fin),
+                    json.dumps(objectifs, sort_keys=True),
+                    objectives.version,
+                    data_version(),
+                )
+                jobs = get_job_runner()
+                if st.button("Générer un PDF de synthèse"):
+                    # objectif de chaque ligne : mêmes chiffres que le dashboard et le XLSX
+                    jobs.submit(
+                        pdf_key,
+                        build_pdf_report,
+                        df_ca_f,
+                        df_notes_f,
+                        ville_sel,
+                        pd.to_datetime(date_deb),
+                        pd.to_datetime(date_fin),
+                        copy.deepcopy(objectifs),
+                        objectives.evaluate_ca(df_ca_f),
+                        objectives.evaluate_notes(df_notes_f),
+                    )
+                    st.session_state["pdf_key"] = pdf_key
+
+                pdf_job = jobs.get(pdf_key) if st.session_state.get("pdf_key") == pdf_key else None
+                if pdf_job is not None:
+                    show_job_download(
+                        pdf_job,
+                        label="📥 Télécharger le PDF",
+                        file_name=f"rapport_closes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf",
+                        what="du PDF",
+                    )
+
+        section_pdf(df_ca_f, df_notes_f, ville_sel, date_deb, date_fin, objectifs)
+
     # --------- PAGE NOTES / MARQUES ---------
-    else:
+    elif section == "Évolution des notes (étoiles)":
         st.title("⭐ Évolution des notes – par marque & plateforme")
 
         if df_notes_f.empty:
             st.warning("Aucune donnée pour les filtres sélectionnés.")
-            st.stop()
-
-        marques = ["Toutes"] + sorted(df_notes_f["Marque"].dropna().unique().tolist())
-        marque_sel = st.selectbox("Marque", marques)
-
-        df_notes_m = df_notes_f.copy()
-        if marque_sel != "Toutes":
-            df_notes_m = df_notes_m[df_notes_m["Marque"] == marque_sel]
-
-        moy_uber = df_notes_m["Note Uber Eats"].mean()
-        moy_deliv = df_notes_m["Note Deliveroo"].mean()
+            stop_run()
+
+        # la marque ne concerne que cette page : un fragment, le choix d'une
+        # marque ne relance ni le chargement, ni les alertes, ni les filtres
+        @st.fragment
+        def page_notes(selection, df_notes_f, date_deb, date_fin, ville_filtre):
+            marques = ["Toutes"] + sorted(df_notes_f["Marque"].dropna().unique().tolist())
+            marque_sel = st.selectbox("Marque", marques)
+            marque_filtre = None if marque_sel == "Toutes" else marque_sel
+
+            df_notes_m = df_notes_f
+            if marque_filtre is not None:
+                df_notes_m = df_notes_m[df_notes_m["Marque"] == marque_filtre]
+
+            with prof.span("KPI notes"):
+                kpis_notes = selection.notes_kpis(marque_filtre)
+                moy_uber = kpis_notes["moy_uber"]
+                moy_deliv = kpis_notes["moy_deliv"]
+
+                # Objectif étoiles
+                note_min = objectifs["note_min"]
+                objectif_note, ok_note, nb_ok_note, nb_total_note, pct_ok_note = notes_compliance(
+                    df_notes_m, objectives.evaluate_notes(df_notes_m)
+                )
 
-        col1, col2 = st.columns(2)
-        col1.metric("Note moyenne Uber Eats", f"{moy_uber:.2f}")
-        col2.metric("Note moyenne Deliveroo", f"{moy_deliv:.2f}")
-
-        # Objectif étoiles
-        note_min = objectifs["note_min"]
-        df_notes_m["OK_objectif_note"] = (
-            (df_notes_m["Note Uber Eats"] >= note_min)
-            & (df_notes_m["Note Deliveroo"] >= note_min)
-        )
-        nb_ok_note = int(df_notes_m["OK_objectif_note"].sum())
-        nb_total_note = len(df_notes_m)
-        pct_ok_note = 100 * nb_ok_note / nb_total_note if nb_total_note > 0 else 0
-
-        emoji_note = "🟢" if pct_ok_note >= 80 else "🟡" if pct_ok_note >= 50 else "🔴"
-        st.markdown(
-            f"**Objectif étoiles : {note_min} minimum (Uber & Deliveroo)**  "
-            f"→ Lignes ≥ objectif : **{nb_ok_note} / {nb_total_note}** ({pct_ok_note:.1f} %) {emoji_note}"
-        )
-
-        st.markdown("### 🏅 Performance par marque (moyenne sur la période)")
-        perf_marques = (
-            df_notes_f.groupby(["Ville", "Marque"], as_index=False)[
-                ["Note Uber Eats", "Note Deliveroo"]
-            ]
-            .mean(numeric_only=True)
-            .sort_values(["Ville", "Marque"])
-        )
-        st.dataframe(perf_marques, use_container_width=True)
-
-        st.markdown("### 📈 Évolution des notes par marque et plateforme")
-
-        notes_long = df_notes_m.melt(
-            id_vars=["Date", "Ville", "Marque"],
-            value_vars=["Note Uber Eats", "Note Deliveroo"],
-            var_name="Plateforme",
-            value_name="Note",
-        )
+            col1, col2 = st.columns(2)
+            col1.metric("Note moyenne Uber Eats", f"{moy_uber:.2f}")
+            col2.metric("Note moyenne Deliveroo", f"{moy_deliv:.2f}")
 
-        notes_chart = (
-            alt.Chart(notes_long)
-            .mark_line(point=True)
-            .encode(
-                x="Date:T",
-                y=alt.Y("Note:Q", scale=alt.Scale(domain=[0, 5])),
-                color="Plateforme:N",
-                tooltip=[
-                    "Date:T",
-                    "Ville:N",
-                    "Marque:N",
-                    "Plateforme:N",
-                    "Note:Q",
-                ],
+            emoji_note = traffic_light(pct_ok_note)
+            st.markdown(
+                f"**Objectif étoiles : {note_min if note_min is not None else 'aucun'} minimum (Uber & Deliveroo)**  "
+                f"→ Lignes ≥ objectif : **{nb_ok_note} / {nb_total_note}** ({pct_ok_note:.1f} %) {emoji_note}"
             )
-            .properties(height=350)
-        )
-
-        st.altair_chart(notes_chart, use_container_width=True)
 
-        st.markdown("### 📊 Détail des données (avec statut objectif)")
-        df_notes_show = df_notes_m.copy()
-        df_notes_show["Statut objectif notes"] = np.where(
-            df_notes_show["OK_objectif_note"], "🟢 OK", "🔴 Sous objectif"
-        )
-        st.dataframe(
-            df_notes_show.sort_values(["Date", "Ville", "Marque"]),
-            use_container_width=True,
+            st.markdown("### 🏅 Performance par marque (moyenne sur la période)")
+            with prof.span("table performance marques"):
+                perf_marques = selection.perf_marques()
+                st.dataframe(perf_marques, use_container_width=True)
+
+            st.markdown("### 📈 Évolution des notes par marque et plateforme")
+
+            with prof.span("graphique notes"):
+                freq_notes = choose_resolution(
+                    date_deb, date_fin, 2 * selection.notes_series(marque_filtre)
+                )
+                notes_long = cap_points(
+                    selection.notes_long(freq_notes, marque_filtre),
+                    ["Ville", "Marque", "Plateforme"],
+                    "Note",
+                )
+                st.caption(f"Résolution : par {RESOLUTIONS[freq_notes]}")
+
+                notes_chart = (
+                    alt.Chart(notes_long)
+                    .mark_line(point=True)
+                    .encode(
+                        x="Date:T",
+                        y=alt.Y("Note:Q", scale=alt.Scale(domain=[0, 5])),
+                        color="Plateforme:N",
+                        tooltip=[
+                            "Date:T",
+                            "Ville:N",
+                            "Marque:N",
+                            "Plateforme:N",
+                            "Note:Q",
+                        ],
+                    )
+                    .properties(height=350)
+                )
+
+                st.altair_chart(notes_chart, use_container_width=True)
+
+            st.markdown("### 📈 Tendances des notes (moyennes glissantes 7 / 28 jours, EWMA)")
+            with prof.span("tendances notes"):
+                filtres_notes = {"Ville": ville_filtre, "Marque": marque_filtre}
+                tendances_notes = cube_trends(
+                    store_notes,
+                    cached_notes_cube,
+                    update_notes_cube,
+                    [key for key, value in filtres_notes.items() if value is not None],
+                    TRENDS_NOTES,
+                )
+                st.altair_chart(
+                    trend_chart(
+                        tendances_notes.frame(date_deb, date_fin, **filtres_notes),
+                        "Note",
+                        domain=[0, 5],
+                    ),
+                    use_container_width=True,
+                )
+                resume_notes = cube_trends(
+                    store_notes, cached_notes_cube, update_notes_cube, ["Ville", "Marque"], TRENDS_NOTES
+                ).latest(date_fin, **filtres_notes)
+                st.caption(
+                    f"Au {date_fin:%d/%m/%Y} : Δ S-1 = moyenne 7 j vs semaine précédente, "
+                    "Δ A-1 = moyenne 28 j vs même fenêtre 52 semaines plus tôt."
+                )
+                st.dataframe(resume_notes.round(2), hide_index=True, use_container_width=True)
+
+            st.markdown("### 📊 Détail des données (avec statut objectif)")
+
+            def statut_notes(lignes: pd.DataFrame) -> pd.DataFrame:
+                ok = ok_note.loc[lignes.index]
+                objectif = objectif_note.loc[lignes.index]
+                return lignes.assign(
+                    OK_objectif_note=ok,
+                    **{
+                        "Objectif note": objectif.astype("float64").round(2),
+                        "Statut objectif notes": np.select(
+                            [objectif.isna(), ok],
+                            ["⚪ Sans objectif", "🟢 OK"],
+                            "🔴 Sous objectif",
+                        ),
+                    },
+                )
+
+            with prof.span("table détail notes"):
+                paged_table(
+                    df_notes_m,
+                    "detail_notes",
+                    ["Date", "Ville", "Marque"],
+                    NOTES_SCHEMA,
+                    decorate=statut_notes,
+                )
+
+        page_notes(selection, df_notes_f, date_deb, date_fin, ville_filtre)
+
+    # --------- PAGE NOTES × CA ---------
+    elif section == "🔗 Notes × CA":
+        st.title("🔗 Notes × CA – les variations de note précèdent-elles le CA ?")
+        st.caption(
+            "Chaque jour de closes d'une ville est associé au dernier relevé de notes "
+            f"de cette ville (au plus {AS_OF_DAYS} jours plus tôt), toutes marques confondues."
         )
 
+        @st.fragment
+        def page_notes_ca(ville_filtre, date_deb, date_fin):
+            with prof.span("faits notes × CA"):
+                faits = table_facts()
+                vue = faits[
+                    (faits["Date"] >= pd.Timestamp(date_deb))
+                    & (faits["Date"] <= pd.Timestamp(date_fin))
+                ]
+                if ville_filtre is not None:
+                    vue = vue[vue["Ville"] == ville_filtre]
+            if vue.empty:
+                st.warning("Aucune donnée pour les filtres sélectionnés.")
+                return
+
+            note_sel = st.radio("Note", CORRELATION_NOTES, horizontal=True, key="note_correlation")
+
+            st.markdown("### 📉 Corrélation note / CA par close selon le décalage (tout l'historique)")
+            with prof.span("corrélations par décalage"):
+                correlations = table_correlations(ville_filtre)
+                valides = correlations.dropna(subset=[note_sel])
+                if valides.empty:
+                    st.info("Pas assez de jours avec notes et closes pour mesurer une corrélation.")
+                else:
+                    pic = valides.loc[valides[note_sel].abs().idxmax()]
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Décalage le plus marqué", f"{int(pic['Décalage (j)']):+d} j")
+                    col2.metric("Corrélation", f"{pic[note_sel]:.2f}")
+                    col3.metric("Jours comparés", int(pic["Paires"]))
+                    st.caption(
+                        "Décalage k : note du jour comparée au CA par close k jours plus tard "
+                        "(écarts à la moyenne de la ville, et du jour de la semaine pour le CA). "
+                        "Une corrélation positive pour k > 0 : les baisses de note tendent à "
+                        "précéder les baisses de CA."
+                    )
+                    lag_chart = (
+                        alt.Chart(correlations)
+                        .mark_bar()
+                        .encode(
+                            x="Décalage (j):O",
+                            y=alt.Y(f"{note_sel}:Q", title="Corrélation"),
+                            color=alt.condition(
+                                alt.datum["Décalage (j)"] > 0,
+                                alt.value("#1f77b4"),
+                                alt.value("#bbbbbb"),
+                            ),
+                            tooltip=[
+                                "Décalage (j):O",
+                                alt.Tooltip(f"{note_sel}:Q", format=".3f"),
+                                "Paires:Q",
+                            ],
+                        )
+                        .properties(height=300)
+                    )
+                    st.altair_chart(lag_chart, use_container_width=True)
+
+            st.markdown("### 🔎 Note et CA par close, jour par jour (période choisie)")
+            with prof.span("nuage notes × CA"):
+                points = vue.dropna(subset=[note_sel, "CA par close (€)"])
+                if len(points) > MAX_POINTS_PER_CHART:
+                    points = points.sample(MAX_POINTS_PER_CHART, random_state=0)
+                scatter = (
+                    alt.Chart(points)
+                    .mark_circle(opacity=0.5)
+                    .encode(
+                        x=alt.X(f"{note_sel}:Q", scale=alt.Scale(zero=False)),
+                        y=alt.Y("CA par close (€):Q"),
+                        color="Ville:N",
+                        tooltip=[
+                            "Date:T",
+                            "Ville:N",
+                            alt.Tooltip(f"{note_sel}:Q", format=".2f"),
+                            alt.Tooltip("CA par close (€):Q", format=".2f"),
+                            "Date note:T",
+                        ],
+                    )
+                    .properties(height=350)
+                )
+                st.altair_chart(scatter, use_container_width=True)
+
+            with prof.span("table faits notes × CA"):
+                paged_table(vue, "faits_notes_ca", ["Ville", "Date"], {})
+
+        page_notes_ca(ville_filtre, date_deb, date_fin)
+
+    # --------- PAGE ALERTES ---------
+    else:
+        st.title("🚨 Alertes – toutes villes, périodes et marques")
+        st.caption(f"{ALERT_RULES} Au dernier jour de données, indépendamment de la période choisie.")
+
+        @st.fragment
+        def page_alertes(alertes, ville_filtre):
+            with prof.span("table alertes"):
+                vue = alertes
+                if ville_filtre is not None:
+                    vue = vue[vue["Ville"] == ville_filtre]
+
+                col1, col2, col3 = st.columns(3)
+                for col, statut in zip((col1, col2, col3), ALERT_STATUSES):
+                    col.metric(statut, int((vue["Statut"] == statut).sum()))
+
+                statuts = st.multiselect(
+                    "Statuts", ALERT_STATUSES, default=["🔴", "🟡"], key="statuts_alertes"
+                )
+                types = st.multiselect(
+                    "Alertes", sorted(vue["Alerte"].unique()), key="types_alertes"
+                )
+                vue = vue[vue["Statut"].isin(statuts)]
+                if types:
+                    vue = vue[vue["Alerte"].isin(types)]
+                if vue.empty:
+                    st.success("✅ Aucune alerte pour ces filtres.")
+                else:
+                    st.dataframe(vue, hide_index=True, use_container_width=True)
+
+        page_alertes(alertes, ville_filtre)
+
 # -------------------- MODE SAISIE DES DONNÉES --------------------
 
 else:
@@ -531,24 +1330,32 @@ else:
         """
     )
 
-    tab1, tab2 = st.tabs(
-        ["Ajouter une ligne CA_Close", "Ajouter une ligne Évolution_Notes"]
+    tab1, tab2, tab3, tab4 = st.tabs(
+        [
+            "Ajouter une ligne CA_Close",
+            "Ajouter une ligne Évolution_Notes",
+            "Saisie en lot (semaine de closes)",
+            "Import en masse (CSV / XLSX)",
+        ]
     )
 
+    show_data_changed()
+
+    # un fragment par onglet : les widgets d'un onglet ne relancent que lui ;
+    # un ajout de données relance tout le script (`data_changed`)
+    villes_saisie = table_values(store_ca, "Ville")
+    periodes_saisie = table_values(store_ca, "Période de close")
+
     # --- Formulaire CA_Close ---
-    with tab1:
+    @st.fragment
+    def form_ca(villes_ca, periodes):
         st.subheader("Ajouter une ligne de close (CA & commandes)")
 
         with st.form("form_ca"):
             col1, col2 = st.columns(2)
             date_new = col1.date_input("Date")
-            ville_new = col2.selectbox(
-                "Ville", sorted(df_ca["Ville"].dropna().unique().tolist())
-            )
-            periode_new = st.selectbox(
-                "Période de close",
-                sorted(df_ca["Période de close"].dropna().unique().tolist()),
-            )
+            ville_new = col2.selectbox("Ville", villes_ca)
+            periode_new = st.selectbox("Période de close", periodes)
             col3, col4 = st.columns(2)
             cmd_new = col3.number_input(
                 "Nombre de commandes", min_value=0, step=1
@@ -567,27 +1374,26 @@ else:
                 "Chiffre d’affaires (€)": float(ca_new),
                 "Période de close": periode_new,
             }
-            df_ca_new = pd.concat([df_ca, pd.DataFrame([new_row])], ignore_index=True)
-            df_ca_new = add_ca_horaire(df_ca_new)
-            st.session_state["df_ca"] = df_ca_new
-            df_ca = df_ca_new
-            st.success("✅ Ligne CA_Close ajoutée (mémoire session).")
+            try:
+                shared.append_ca([new_row])
+            except SchemaError as err:
+                st.error(f"❌ {err}")
+            else:
+                data_changed("✅ Ligne CA_Close ajoutée (visible par tous les utilisateurs).")
+
+    with tab1:
+        form_ca(villes_saisie, periodes_saisie)
 
     # --- Formulaire Évolution_Notes ---
-    with tab2:
+    @st.fragment
+    def form_notes(villes_notes, marques_notes):
         st.subheader("Ajouter une ligne de notes (étoiles)")
 
         with st.form("form_notes"):
             col1, col2 = st.columns(2)
             date_n = col1.date_input("Date", key="date_notes")
-            ville_n = col2.selectbox(
-                "Ville",
-                sorted(df_notes["Ville"].dropna().unique().tolist()),
-                key="ville_notes",
-            )
-            marque_n = st.selectbox(
-                "Marque", sorted(df_notes["Marque"].dropna().unique().tolist())
-            )
+            ville_n = col2.selectbox("Ville", villes_notes, key="ville_notes")
+            marque_n = st.selectbox("Marque", marques_notes)
             col3, col4 = st.columns(2)
             note_uber_n = col3.number_input(
                 "Note Uber Eats", min_value=0.0, max_value=5.0, step=0.1
@@ -606,29 +1412,216 @@ else:
                 "Note Uber Eats": float(note_uber_n),
                 "Note Deliveroo": float(note_deliv_n),
             }
-            df_notes_new = pd.concat(
-                [df_notes, pd.DataFrame([new_row_n])], ignore_index=True
+            try:
+                shared.append_notes([new_row_n])
+            except SchemaError as err:
+                st.error(f"❌ {err}")
+            else:
+                data_changed(
+                    "✅ Ligne Évolution_Notes ajoutée (visible par tous les utilisateurs)."
+                )
+
+    with tab2:
+        form_notes(table_values(store_notes, "Ville"), table_values(store_notes, "Marque"))
+
+    # --- Saisie en lot : une semaine de closes d'une ville ---
+    @st.fragment
+    def saisie_lot(villes_ca, periodes_par_ville):
+        st.subheader("Ajouter une semaine de closes")
+
+        col1, col2 = st.columns(2)
+        ville_lot = col1.selectbox("Ville", villes_ca, key="ville_lot")
+        debut_lot = col2.date_input("Premier jour", key="debut_lot")
+        periodes_lot = periodes_par_ville.get(ville_lot, [])
+        grille = pd.DataFrame(
+            [
+                {
+                    "Date": pd.Timestamp(debut_lot) + pd.Timedelta(days=jour),
+                    "Période de close": periode,
+                    "Nombre commandes": None,
+                    "Chiffre d’affaires (€)": None,
+                }
+                for jour in range(7)
+                for periode in periodes_lot
+            ]
+        )
+
+        with st.form("form_lot"):
+            grille_saisie = st.data_editor(
+                grille,
+                hide_index=True,
+                use_container_width=True,
+                disabled=["Date", "Période de close"],
+                column_config={
+                    "Date": st.column_config.DateColumn("Date", format="DD/MM/YYYY"),
+                    "Nombre commandes": st.column_config.NumberColumn(
+                        "Nombre commandes", min_value=0, step=1
+                    ),
+                    "Chiffre d’affaires (€)": st.column_config.NumberColumn(
+                        "Chiffre d’affaires (€)", min_value=0.0, format="%.2f"
+                    ),
+                },
+                key="grille_lot",
             )
-            st.session_state["df_notes"] = df_notes_new
-            df_notes = df_notes_new
-            st.success("✅ Ligne Évolution_Notes ajoutée (mémoire session).")
-
-    st.markdown("### 💾 Télécharger les données mises à jour")
-    updated_bytes = build_excel_bytes(df_ca, df_notes)
-    st.download_button(
-        label="📥 Télécharger l'Excel mis à jour",
-        data=updated_bytes,
-        file_name="suivi_close_amiens_beauvais_updated.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+            submitted_lot = st.form_submit_button("Ajouter les lignes remplies")
+
+        if submitted_lot:
+            lignes = grille_saisie.dropna(
+                subset=["Nombre commandes", "Chiffre d’affaires (€)"]
+            )
+            if lignes.empty:
+                st.warning("Aucune ligne complète à ajouter.")
+            else:
+                # types et bornes vérifiés par le schéma à l'ajout
+                try:
+                    shared.append_ca(
+                        pd.DataFrame(
+                            {
+                                "Date": lignes["Date"],
+                                "Ville": ville_lot,
+                                "Nombre commandes": lignes["Nombre commandes"],
+                                "Chiffre d’affaires (€)": lignes["Chiffre d’affaires (€)"],
+                                "Période de close": lignes["Période de close"],
+                            }
+                        )
+                    )
+                except SchemaError as err:
+                    st.error(f"❌ {err}")
+                else:
+                    data_changed(
+                        f"✅ {len(lignes)} lignes CA_Close ajoutées (visibles par tous les utilisateurs)."
+                    )
+
+    with tab3:
+        # périodes de chaque ville, mémoïsées : pas de filtre sur toutes les lignes
+        saisie_lot(villes_saisie, table_periods(store_ca))
+
+    # --- Import en masse : exports des plateformes ---
+    @st.fragment
+    def import_masse():
+        st.subheader("Importer un export CSV / XLSX")
+        st.caption(
+            "Le fichier est lu par blocs : lignes non conformes écartées, "
+            "lignes déjà présentes ignorées."
+        )
+
+        fichier = st.file_uploader("Fichier", type=["csv", "txt", "xlsx"], key="import_fichier")
+        if fichier is None:
+            return
+        col1, col2 = st.columns(2)
+        table_import = col1.selectbox("Table cible", list(TARGETS), key="import_table")
+        feuille = None
+        if fichier.name.lower().endswith(".xlsx"):
+            feuille = col2.selectbox("Feuille", excel_sheets(fichier), key="import_feuille")
+
+        apercu = preview(fichier, fichier.name, feuille)
+        st.dataframe(apercu, use_container_width=True)
+
+        st.markdown("**Correspondance des colonnes**")
+        proposee = suggest_mapping(apercu.columns, table_import)
+        choix = ["—", *map(str, apercu.columns)]
+        mapping, constantes = {}, {}
+        cols = st.columns(len(proposee))
+        for col, (cible, source_col) in zip(cols, proposee.items()):
+            retenue = col.selectbox(
+                cible,
+                choix,
+                index=choix.index(str(source_col)) if source_col is not None else 0,
+                key=f"import_map_{table_import}_{cible}",
+            )
+            if retenue != "—":
+                mapping[cible] = retenue
+            elif TARGETS[table_import].schema[cible].dtype == CATEGORY:
+                # colonne absente de l'export : valeur fixe (ex. ville du fichier)
+                constantes[cible] = col.text_input(
+                    "Valeur fixe", key=f"import_const_{table_import}_{cible}"
+                )
+
+        if st.button("Importer", type="primary"):
+            is_ca = table_import == SHEET_CA
+            barre = st.progress(0.0, text="Import en cours…")
+
+            # bilan du dernier bloc traité, pour un import interrompu
+            suivi = {}
+
+            def avancement(fraction, stats):
+                suivi["stats"] = stats
+                barre.progress(fraction, text=f"{stats.lues} lignes lues…")
+
+            try:
+                with prof.span("import en masse"):
+                    stats = import_file(
+                        fichier,
+                        fichier.name,
+                        table_import,
+                        mapping,
+                        append=shared.append_ca if is_ca else shared.append_notes,
+                        existing=(store_ca if is_ca else store_notes).frame,
+                        constants=constantes,
+                        sheet=feuille,
+                        progress=avancement,
+                        villes=shared.villes,
+                    )
+            except SchemaError as err:
+                barre.empty()
+                # les blocs précédents sont déjà journalisés
+                ajoutees = suivi["stats"].ajoutees if "stats" in suivi else 0
+                st.error(f"❌ Import interrompu : {err} ({ajoutees} lignes déjà ajoutées.)")
+                if ajoutees:
+                    # ajout de cette session : pas d'avis « autre utilisateur » ensuite
+                    st.session_state["data_version"] = shared.version
+                return
+            barre.empty()
+            data_changed(
+                f"✅ {stats.ajoutees} lignes ajoutées à {table_import} "
+                f"({stats.lues} lues, {stats.doublons} doublons ignorés, "
+                f"{stats.invalides} lignes non conformes écartées)."
+            )
+
+    with tab4:
+        import_masse()
+
+    @st.fragment
+    def section_export(store_ca, store_notes):
+        st.markdown("### 💾 Télécharger les données mises à jour")
+        # fichier construit seulement à la demande, mémoïsé par version des données
+        format_export = st.selectbox(
+            "Format",
+            list(EXPORT_FORMATS),
+            help="CSV / Parquet : bien plus rapides pour les gros historiques.",
+        )
+        export = EXPORT_FORMATS[format_export]
+        with prof.span("export données"):
+            export_key = ("export", format_export, data_version())
+            jobs = get_job_runner()
+            if st.button("Préparer le fichier"):
+                # tables entières lues seulement pour l'export demandé
+                jobs.submit(export_key, export.build, store_ca.frame, store_notes.frame)
+                st.session_state["export_key"] = export_key
+
+            if st.session_state.get("export_key") == export_key:
+                show_job_download(
+                    jobs.get(export_key),
+                    label="📥 Télécharger les données mises à jour",
+                    file_name=export.file_name,
+                    mime=export.mime,
+                    what="de l'export",
+                )
+
+    section_export(store_ca, store_notes)
 
     st.markdown("### 👀 Aperçu rapide des dernières lignes")
-    col1, col2 = st.columns(2)
-    col1.write("Dernières lignes CA_Close")
-    col1.dataframe(
-        df_ca.sort_values("Date").tail(10), use_container_width=True
-    )
-    col2.write("Dernières lignes Évolution_Notes")
-    col2.dataframe(
-        df_notes.sort_values("Date").tail(10), use_container_width=True
-    )
+    with prof.span("aperçu dernières lignes"):
+        col1, col2 = st.columns(2)
+        col1.write("Dernières lignes CA_Close")
+        col1.dataframe(
+            widen(table_tail(store_ca, 10), CA_SCHEMA), use_container_width=True
+        )
+        col2.write("Dernières lignes Évolution_Notes")
+        col2.dataframe(
+            widen(table_tail(store_notes, 10), NOTES_SCHEMA), use_container_width=True
+        )
+
+# -------------------- PROFILAGE (DEBUG) --------------------
+
+render_profiling()
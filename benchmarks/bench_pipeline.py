@@ -0,0 +1,297 @@
+"""
+Benchmark sans navigateur du pipeline de données du dashboard.
+
+Pour chaque taille, génère un jeu synthétique puis chronomètre chaque étape
+(chargement du classeur, colonnes dérivées, filtres, agrégats, objectifs,
+exports, PDF). Les résultats sont émis en JSON pour suivre les régressions
+de latence d'une version à l'autre.
+
+    python -m benchmarks.bench_pipeline --sizes 10000 100000 --output bench.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from suivi_ca.alerts import ca_alerts, window_start
+from suivi_ca.correlation import RatingsRevenueFacts, build_facts, lag_correlations
+from suivi_ca.cube import (
+    build_ca_cube,
+    build_notes_cube,
+    ca_kpis,
+    perf_marques,
+    pivot_ca,
+    top_periods,
+)
+from suivi_ca.derived import add_ca_horaire
+from suivi_ca.export import build_csv_zip_bytes, build_excel_bytes, build_parquet_zip_bytes
+from suivi_ca.forecast import fit_forecasts
+from suivi_ca.index import DateVilleIndex
+from suivi_ca.loader import load_workbook, read_workbook
+from suivi_ca.objectives import ObjectivesStore
+from suivi_ca.partitions import load_partitions, split_workbook
+from suivi_ca.report import build_pdf_report
+from suivi_ca.schema import CA_SCHEMA, NOTES_SCHEMA, apply_schema
+from suivi_ca.sql import SqlSelection, ca_table, notes_table
+from suivi_ca.sql import available as sql_available
+from suivi_ca.trends import Trends
+
+from .synthetic import generate
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+# Limite de lignes d'une feuille Excel
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def timed(fn, repeat: int):
+    """Exécute `fn` `repeat` fois ; renvoie (dernier résultat, durées en s)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+class Recorder:
+    def __init__(self, size: int, repeat: int):
+        self.size = size
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, stage: str, fn, repeat: int = None, **extra):
+        result, durations = timed(fn, repeat or self.repeat)
+        self.results.append(
+            {
+                "size": self.size,
+                "stage": stage,
+                "seconds_min": min(durations),
+                "seconds_median": statistics.median(durations),
+                "repeat": len(durations),
+                **extra,
+            }
+        )
+        print(f"  {stage:<28} {min(durations) * 1000:10.2f} ms", file=sys.stderr)
+        return result
+
+    def skip(self, stage: str, reason: str):
+        self.results.append({"size": self.size, "stage": stage, "skipped": reason})
+        print(f"  {stage:<28} ignoré ({reason})", file=sys.stderr)
+
+
+def bench_size(size: int, args, workdir: Path) -> list:
+    rec = Recorder(size, args.repeat)
+    print(f"[{size} lignes CA_Close]", file=sys.stderr)
+    df_ca_raw, df_notes = rec.run(
+        "generate",
+        lambda: generate(size, n_villes=args.villes, n_periodes=args.periodes, n_marques=args.marques),
+        repeat=1,
+    )
+
+    # -- schéma compact (comme au chargement dans l'application)
+    wide_bytes = int(df_ca_raw.memory_usage(deep=True).sum())
+    df_ca_raw = rec.run(
+        "apply_schema",
+        lambda: apply_schema(df_ca_raw, CA_SCHEMA),
+        repeat=1,
+        memory_bytes_before=wide_bytes,
+    )
+    rec.results[-1]["memory_bytes_after"] = int(df_ca_raw.memory_usage(deep=True).sum())
+    df_notes = apply_schema(df_notes, NOTES_SCHEMA)
+
+    # -- chargement du classeur
+    if size <= min(args.xlsx_max_rows, EXCEL_MAX_ROWS):
+        path = workdir / f"synthetic_{size}.xlsx"
+        path.write_bytes(build_excel_bytes(df_ca_raw, df_notes))
+        cache_dir = workdir / f"cache_{size}"
+        rec.run("load_excel_parse", lambda: read_workbook(path), repeat=1)
+        rec.run("load_cache_build", lambda: load_workbook(path, cache_dir), repeat=1)
+        rec.run("load_cache_hit", lambda: load_workbook(path, cache_dir))
+
+        # -- partitions par ville : une ville seule, ou toutes en parallèle
+        parts = list(split_workbook(path, workdir / f"partitions_{size}", cache_dir).values())
+        rec.run("partitions_load_cold", lambda: load_partitions(parts, cache_dir=cache_dir), repeat=1)
+        rec.run("partitions_load_all", lambda: load_partitions(parts, cache_dir=cache_dir))
+        rec.run("partition_load_one", lambda: load_partitions(parts[:1], cache_dir=cache_dir))
+    else:
+        for stage in (
+            "load_excel_parse",
+            "load_cache_build",
+            "load_cache_hit",
+            "partitions_load_cold",
+            "partitions_load_all",
+            "partition_load_one",
+        ):
+            rec.skip(stage, f"> {min(args.xlsx_max_rows, EXCEL_MAX_ROWS)} lignes pour un XLSX")
+
+    # -- colonnes dérivées
+    df_ca = rec.run("add_ca_horaire", lambda: add_ca_horaire(df_ca_raw))
+
+    # -- filtres Analyse : un mois, une ville
+    villes = sorted(df_ca["Ville"].unique())
+    date_fin = df_ca["Date"].max()
+    date_deb = date_fin - pd.Timedelta(days=30)
+    index_ca = rec.run("index_build", lambda: DateVilleIndex(df_ca), repeat=1)
+    rec.run(
+        "filter_index_slice",
+        lambda: index_ca.slice(date_deb, date_fin, villes[0]),
+        repeat=max(args.repeat, 20),
+    )
+    rec.run(
+        "filter_boolean_mask",
+        lambda: df_ca[
+            (df_ca["Date"] >= date_deb) & (df_ca["Date"] <= date_fin) & (df_ca["Ville"] == villes[0])
+        ],
+    )
+
+    # -- agrégats
+    cube_ca = rec.run("cube_ca_build", lambda: build_ca_cube(df_ca), repeat=1)
+    cube_notes = rec.run("cube_notes_build", lambda: build_notes_cube(df_notes), repeat=1)
+    cube_index = DateVilleIndex(cube_ca)
+
+    def kpis_from_cube():
+        cube_f = cube_index.slice(df_ca["Date"].min(), date_fin)
+        return ca_kpis(cube_f), top_periods(cube_f), pivot_ca(cube_f)
+
+    rec.run("kpis_from_cube", kpis_from_cube)
+    rec.run(
+        "groupby_detail",
+        lambda: df_ca.groupby(["Ville", "Période de close"], as_index=False)[
+            ["CA horaire (€ / h)", "Chiffre d’affaires (€)", "Nombre commandes"]
+        ].mean(),
+    )
+    rec.run("perf_marques", lambda: perf_marques(cube_notes))
+
+    # -- mêmes requêtes sur le backend DuckDB (ANALYSE_BACKEND = "duckdb")
+    if sql_available():
+        sql_ca = rec.run("sql_ca_build", lambda: ca_table(df_ca), repeat=1)
+        sql_notes = rec.run("sql_notes_build", lambda: notes_table(df_notes), repeat=1)
+
+        def kpis_from_sql():
+            selection = SqlSelection(sql_ca, sql_notes, df_ca, df_notes, df_ca["Date"].min(), date_fin)
+            return selection.ca_kpis(), selection.top_periods(), selection.pivot_ca()
+
+        rec.run("kpis_from_sql", kpis_from_sql)
+        rec.run(
+            "filter_sql",
+            lambda: SqlSelection(sql_ca, sql_notes, df_ca, df_notes, date_deb, date_fin, villes[0]).ca_rows(),
+        )
+    else:
+        for stage in ("sql_ca_build", "sql_notes_build", "kpis_from_sql", "filter_sql"):
+            rec.skip(stage, "duckdb non installé")
+
+    # -- croisement notes × CA : table de faits, mise à jour après une saisie, décalages
+    facts = rec.run("facts_build", lambda: build_facts(cube_ca, cube_notes), repeat=1)
+    saisie = df_ca.iloc[[-1]]
+
+    rec.run(
+        "facts_refresh_one_row",
+        lambda: RatingsRevenueFacts(facts=facts).touch(saisie).frame(cube_ca, cube_notes),
+    )
+    rec.run("lag_correlations", lambda: lag_correlations(facts), repeat=1)
+
+    # -- tendances (une fois par version des données, puis tranches affichées)
+    trend_measures = {
+        "CA par close (€)": "Chiffre d’affaires (€)",
+        "CA horaire (€ / h)": "CA horaire (€ / h)",
+    }
+    trends_ca = rec.run("trends_ca_build", lambda: Trends(cube_ca, ["Ville"], trend_measures), repeat=1)
+    rec.run("trends_ca_frame", lambda: trends_ca.frame(date_deb, date_fin, Ville=villes[0]))
+
+    # -- prévision de la semaine suivante (Ville × Période de close)
+    rec.run("forecast_fit", lambda: fit_forecasts(cube_ca, date_fin), repeat=1)
+
+    # -- objectifs
+    objectives = ObjectivesStore(workdir / f"objectifs_{size}.db")
+    rec.run("objectives_evaluate_ca", lambda: objectives.evaluate_ca(df_ca))
+
+    # -- alertes (fenêtres des dernières semaines seulement)
+    alerts_from = window_start(date_fin)
+    rec.run(
+        "alerts_ca",
+        lambda: ca_alerts(
+            index_ca.slice(alerts_from, date_fin),
+            cube_index.slice(alerts_from, date_fin),
+            objectives,
+            date_fin,
+        ),
+    )
+
+    # -- exports
+    if size <= min(args.xlsx_max_rows, EXCEL_MAX_ROWS):
+        rec.run("export_xlsx", lambda: build_excel_bytes(df_ca, df_notes), repeat=1)
+    else:
+        rec.skip("export_xlsx", f"> {min(args.xlsx_max_rows, EXCEL_MAX_ROWS)} lignes pour un XLSX")
+    rec.run("export_csv", lambda: build_csv_zip_bytes(df_ca, df_notes), repeat=1)
+    rec.run("export_parquet", lambda: build_parquet_zip_bytes(df_ca, df_notes), repeat=1)
+
+    # -- PDF mensuel (une ville)
+    objectifs = objectives.as_dict(villes)
+    notes_index = DateVilleIndex(df_notes)
+    pdf_ca = index_ca.slice(date_deb, date_fin, villes[0])
+    pdf_notes = notes_index.slice(date_deb, date_fin, villes[0])
+    rec.run(
+        "pdf_report_month",
+        lambda: build_pdf_report(
+            pdf_ca,
+            pdf_notes,
+            villes[0],
+            date_deb,
+            date_fin,
+            objectifs,
+            objectives.evaluate_ca(pdf_ca),
+            objectives.evaluate_notes(pdf_notes),
+        ),
+        repeat=1,
+    )
+    return rec.results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="nombres de lignes CA_Close à générer (jusqu'à 5 000 000)")
+    parser.add_argument("--villes", type=int, default=20)
+    parser.add_argument("--periodes", type=int, default=4)
+    parser.add_argument("--marques", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3, help="répétitions par étape (min / médiane)")
+    parser.add_argument("--xlsx-max-rows", type=int, default=200_000,
+                        help="au-delà, les étapes XLSX (lentes) sont ignorées")
+    parser.add_argument("--output", help="fichier JSON de sortie (stdout par défaut)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_suivi_ca_") as tmp:
+        for size in args.sizes:
+            results.extend(bench_size(size, args, Path(tmp)))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark du temps jusqu'au premier affichage (time-to-first-render).
+
+Chaque mesure tourne dans un processus neuf, comme un serveur qui vient de
+démarrer, dans un dossier contenant un classeur synthétique : le script de
+l'application est exécuté sans navigateur (`streamlit.testing`) et
+chronométré sur sa première exécution (page par défaut, mode Analyse), puis
+sur un rerun. Scénarios :
+
+- `froid` : ni cache Arrow ni préchauffage (premier visiteur après un déploiement) ;
+- `cache_disque` : après `python -m suivi_ca.warmup` (caches Arrow écrits) ;
+- `serveur_prechauffe` : `warmup.warm` exécuté au démarrage du processus,
+  comme `python -m suivi_ca.warmup --serve` (durée dans `boot_seconds`).
+
+    python -m benchmarks.bench_startup --sizes 10000 100000 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from suivi_ca.config import DATA_PATH, DB_PATH
+from suivi_ca.export import build_excel_bytes
+from suivi_ca.loader import clear_cache
+from suivi_ca.schema import CA_SCHEMA, NOTES_SCHEMA, apply_schema
+from suivi_ca.warmup import APP_PATH
+
+from .synthetic import generate
+
+DEFAULT_SIZES = [10_000, 100_000]
+SCENARIOS = ["froid", "cache_disque", "serveur_prechauffe"]
+REPO_DIR = APP_PATH.parent
+
+
+def run_probe(scenario: str, workdir: Path, timeout: float) -> dict:
+    """Un démarrage (`startup_probe`) dans un nouveau processus, journal des saisies vidé."""
+    for db in workdir.glob(f"{DB_PATH}*"):
+        db.unlink()
+    env = dict(os.environ, PYTHONPATH=str(REPO_DIR))
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_probe", scenario, str(timeout)],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def warm_disk(workdir: Path):
+    env = dict(os.environ, PYTHONPATH=str(REPO_DIR))
+    subprocess.run(
+        [sys.executable, "-m", "suivi_ca.warmup"], cwd=workdir, env=env, capture_output=True, check=True
+    )
+
+
+def bench_size(size: int, args, workdir: Path) -> list:
+    print(f"[{size} lignes CA_Close]", file=sys.stderr)
+    df_ca, df_notes = generate(size, n_villes=args.villes)
+    workdir.mkdir(parents=True)
+    path = workdir / DATA_PATH
+    path.write_bytes(
+        build_excel_bytes(apply_schema(df_ca, CA_SCHEMA), apply_schema(df_notes, NOTES_SCHEMA))
+    )
+
+    results = []
+    for scenario in SCENARIOS:
+        runs = []
+        for _ in range(args.repeat):
+            if scenario == "froid":
+                clear_cache(path)
+            else:
+                warm_disk(workdir)
+            runs.append(run_probe(scenario, workdir, args.timeout))
+        first = [r["first_render_seconds"] for r in runs]
+        results.append(
+            {
+                "size": size,
+                "scenario": scenario,
+                "first_render_seconds_min": min(first),
+                "first_render_seconds_median": statistics.median(first),
+                "boot_seconds_median": statistics.median(r["boot_seconds"] for r in runs),
+                "rerun_seconds_median": statistics.median(r["rerun_seconds"] for r in runs),
+                "repeat": len(runs),
+                "exceptions": max(r["exceptions"] for r in runs),
+                "modules_loaded": runs[-1]["modules_loaded"],
+            }
+        )
+        print(
+            f"  {scenario:<20} premier affichage {statistics.median(first):6.2f} s",
+            file=sys.stderr,
+        )
+    clear_cache(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="nombres de lignes CA_Close du classeur généré")
+    parser.add_argument("--villes", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="démarrages par scénario (min / médiane)")
+    parser.add_argument("--timeout", type=float, default=600, help="limite d'une exécution du script (s)")
+    parser.add_argument("--output", help="fichier JSON de sortie (stdout par défaut)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp:
+        for size in args.sizes:
+            results.extend(bench_size(size, args, Path(tmp) / str(size)))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Un démarrage mesuré par `bench_startup`, dans un processus neuf dont le
+dossier courant contient les données. N'importe rien de lourd avant la
+mesure : pandas, pyarrow & co. sont chargés par le script lui-même, comme
+à la première requête d'un serveur.
+
+    python -m benchmarks.startup_probe froid 600
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+# dépendances lourdes : lesquelles sont chargées après le premier affichage
+HEAVY_MODULES = ["altair", "duckdb", "openpyxl", "pyarrow", "reportlab", "xlsxwriter"]
+
+
+def probe(scenario: str, timeout: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    if scenario == "serveur_prechauffe":
+        # comme `python -m suivi_ca.warmup --serve`, avant la première requête
+        from suivi_ca import warmup
+
+        warmup.preload()
+        warmup.warm(warmup.data_source())
+    boot = time.perf_counter() - start
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    at.run()
+    rerun = time.perf_counter() - start
+    return {
+        "boot_seconds": boot,
+        "first_render_seconds": first,
+        "rerun_seconds": rerun,
+        "exceptions": len(at.exception),
+        "modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(probe(sys.argv[1], float(sys.argv[2]))))
@@ -0,0 +1,78 @@
+"""
+Générateur de données synthétiques au format du classeur (CA_Close /
+Évolution_Notes), pour mesurer le passage à l'échelle du pipeline.
+"""
+
+import numpy as np
+import pandas as pd
+
+BASE_DATE = pd.Timestamp("2020-01-01")
+
+
+def make_periodes(n: int) -> list:
+    """Périodes de close réalistes, dont une partie à cheval sur minuit."""
+    periodes = []
+    for i in range(n):
+        start = (21 * 60 + 30 * i) % (24 * 60)
+        end = (start + 60 + 30 * (i % 6)) % (24 * 60)
+        periodes.append(f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}")
+    return periodes
+
+
+def generate(n_ca: int, n_notes: int = None, n_villes: int = 20, n_periodes: int = 4,
+             n_marques: int = 3, seed: int = 0):
+    """
+    Renvoie (df_ca, df_notes) : une close par Date × Ville × Période (dates
+    consécutives depuis 2020), et des notes par Date × Ville × Marque.
+    """
+    rng = np.random.default_rng(seed)
+    n_notes = n_ca // 4 if n_notes is None else n_notes
+    villes = np.array([f"Ville {i:03d}" for i in range(n_villes)], dtype=object)
+    periodes = np.array(make_periodes(n_periodes), dtype=object)
+    marques = np.array([f"Marque {i:02d}" for i in range(n_marques)], dtype=object)
+
+    per_day = n_villes * n_periodes
+    idx = np.arange(n_ca)
+    commandes = rng.poisson(12, n_ca)
+    df_ca = pd.DataFrame(
+        {
+            "Date": BASE_DATE + pd.to_timedelta(idx // per_day, unit="D"),
+            "Ville": villes[(idx // n_periodes) % n_villes],
+            "Nombre commandes": commandes,
+            "Chiffre d’affaires (€)": np.round(commandes * rng.normal(18, 4, n_ca).clip(5), 1),
+            "Période de close": periodes[idx % n_periodes],
+        }
+    )
+
+    per_day = n_villes * n_marques
+    idx = np.arange(n_notes)
+    df_notes = pd.DataFrame(
+        {
+            "Date": BASE_DATE + pd.to_timedelta(idx // per_day, unit="D"),
+            "Ville": villes[(idx // n_marques) % n_villes],
+            "Marque": marques[idx % n_marques],
+            "Note Uber Eats": np.round(rng.normal(4.3, 0.3, n_notes).clip(1, 5), 1),
+            "Note Deliveroo": np.round(rng.normal(4.2, 0.3, n_notes).clip(1, 5), 1),
+        }
+    )
+    return df_ca, df_notes
+
+
+def main(argv=None):
+    import argparse
+
+    from suivi_ca.export import build_excel_bytes
+
+    parser = argparse.ArgumentParser(description="Génère un classeur synthétique.")
+    parser.add_argument("rows", type=int, help="nombre de lignes CA_Close")
+    parser.add_argument("output", help="chemin du .xlsx à écrire")
+    parser.add_argument("--villes", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    df_ca, df_notes = generate(args.rows, n_villes=args.villes)
+    with open(args.output, "wb") as fh:
+        fh.write(build_excel_bytes(df_ca, df_notes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Couche données du dashboard des closes (sans dépendance à Streamlit).
+
+`app.py` ne garde que l'interface ; le chargement et les calculs vivent ici
+pour pouvoir être réutilisés hors navigateur.
+"""
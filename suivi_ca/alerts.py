@@ -0,0 +1,226 @@
+"""
+Alertes 🟢 / 🟡 / 🔴 précalculées pour toutes les villes, périodes et marques.
+
+Deux familles, évaluées en un seul passage vectorisé (un groupby par table)
+sur les dernières semaines de données, jusqu'au dernier jour connu :
+
+- respect des objectifs : part des closes (ou des lignes de notes) au
+  niveau de l'objectif sur `OBJECTIVE_DAYS` jours, par Ville × Période de
+  close et par Ville × Marque ;
+- anomalies : baisse de la moyenne des `RECENT_DAYS` derniers jours par
+  rapport aux `BASELINE_DAYS` jours précédents (CA par close par Ville ×
+  Période, note par Ville × Marque × Plateforme), mesurée en erreurs types
+  (z-score) de la référence.
+
+Seules ces fenêtres sont lues : rafraîchir la table après un ajout ne coûte
+pas plus sur plusieurs années d'historique que sur quelques mois.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .cube import count_col
+
+OBJECTIVE_DAYS = 28
+RECENT_DAYS = 7
+BASELINE_DAYS = 28
+# seuils du % de lignes au niveau de l'objectif (comme les pages Analyse)
+OK_PCT = 80
+WARN_PCT = 50
+# baisse anormale : z-score <= -Z_WARN (🟡), <= -Z_ALERT (🔴)
+Z_WARN = 2.0
+Z_ALERT = 3.0
+# nombre minimal de jours de référence pour juger une baisse
+MIN_BASELINE = 5
+
+STATUSES = ["🔴", "🟡", "🟢"]
+# règles affichées avec la table
+RULES = (
+    f"Objectifs : part des lignes au niveau de l'objectif sur les {OBJECTIVE_DAYS} "
+    f"derniers jours (🟢 ≥ {OK_PCT} %, 🟡 ≥ {WARN_PCT} %). Baisses : moyenne des "
+    f"{RECENT_DAYS} derniers jours vs les {BASELINE_DAYS} précédents, en erreurs types "
+    f"(🟡 ≤ -{Z_WARN:g} σ, 🔴 ≤ -{Z_ALERT:g} σ)."
+)
+COLUMNS = [
+    "Statut",
+    "Alerte",
+    "Ville",
+    "Période / marque",
+    "Plateforme",
+    "Valeur",
+    "Référence",
+    "Écart (σ)",
+    "Détail",
+]
+
+
+def traffic_light(pct: float) -> str:
+    """Statut d'un % de lignes au niveau de l'objectif."""
+    return "🟢" if pct >= OK_PCT else "🟡" if pct >= WARN_PCT else "🔴"
+
+
+def _days_before(as_of, days: int) -> pd.Timestamp:
+    """Premier jour d'une fenêtre de `days` jours finissant au `as_of`."""
+    return pd.Timestamp(as_of).normalize() - pd.Timedelta(days=days - 1)
+
+
+def window_start(as_of) -> pd.Timestamp:
+    """Premier jour lu pour des alertes au `as_of`."""
+    return _days_before(as_of, max(OBJECTIVE_DAYS, RECENT_DAYS + BASELINE_DAYS))
+
+
+def _compliance(
+    rows: pd.DataFrame, ok: pd.Series, objectif: pd.Series, keys, label: str, unit: str
+) -> pd.DataFrame:
+    """Part des lignes au niveau de l'objectif par `keys`."""
+    has_obj = objectif.notna()
+    grouped = pd.DataFrame(
+        {
+            **{k: rows[k] for k in keys},
+            "ok": (ok & has_obj).to_numpy(),
+            "n": has_obj.to_numpy(),
+            "objectif": objectif.astype("float64").to_numpy(),
+        }
+    ).groupby(keys, observed=True, sort=True)
+    stats = grouped.agg(ok=("ok", "sum"), n=("n", "sum"), objectif=("objectif", "mean"))
+    stats = stats[stats["n"] > 0].reset_index()
+    pct = 100 * stats["ok"] / stats["n"]
+    return pd.DataFrame(
+        {
+            "Statut": np.select([pct >= OK_PCT, pct >= WARN_PCT], ["🟢", "🟡"], "🔴"),
+            "Alerte": label,
+            "Ville": stats[keys[0]],
+            "Période / marque": stats[keys[1]],
+            "Plateforme": "",
+            "Valeur": pct.round(1),
+            "Référence": stats["objectif"].round(2),
+            "Écart (σ)": np.nan,
+            "Détail": [
+                f"{ok} / {n} {unit} ≥ objectif sur {OBJECTIVE_DAYS} j"
+                for ok, n in zip(stats["ok"], stats["n"])
+            ],
+        }
+    )
+
+
+def _drops(cube: pd.DataFrame, keys, measures: dict, as_of, label: str) -> pd.DataFrame:
+    """
+    Baisse de la moyenne récente par rapport à la référence, pour chaque
+    série `keys` × mesure ({plateforme ou "": colonne du cube}).
+    """
+    recent_start = _days_before(as_of, RECENT_DAYS)
+    base_start = recent_start - pd.Timedelta(days=BASELINE_DAYS)
+    cube = cube[(cube["Date"] >= base_start) & (cube["Date"] <= as_of)]
+    recent = (cube["Date"] >= recent_start).to_numpy()
+
+    parts = []
+    for plateforme, col in measures.items():
+        total = cube[col].to_numpy(dtype="float64")
+        count = cube[count_col(col)].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            daily = np.where(count > 0, total / count, np.nan)
+        frame = pd.DataFrame(
+            {
+                **{k: cube[k].to_numpy() for k in keys},
+                "recent": recent & (count > 0),
+                "total": np.where(recent, total, 0.0),
+                "count": np.where(recent, count, 0.0),
+                # valeurs journalières de la période de référence
+                "daily": np.where(recent, np.nan, daily),
+            }
+        )
+        stats = frame.groupby(keys, sort=True, observed=True).agg(
+            total=("total", "sum"),
+            count=("count", "sum"),
+            n_recent=("recent", "sum"),
+            base_mean=("daily", "mean"),
+            base_std=("daily", "std"),
+            n_base=("daily", "count"),
+        )
+        stats = stats[(stats["count"] > 0) & (stats["n_base"] >= MIN_BASELINE)]
+        stats = stats.reset_index().assign(Plateforme=plateforme)
+        parts.append(stats)
+    stats = pd.concat(parts, ignore_index=True)
+
+    mean = stats["total"] / stats["count"]
+    base = stats["base_mean"]
+    # erreur type de la moyenne récente, d'après la dispersion de référence
+    stderr = stats["base_std"].fillna(0) / np.sqrt(stats["n_recent"].clip(lower=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(stderr > 0, (mean - base) / stderr, np.where(mean < base, -np.inf, 0.0))
+        change = np.where(base != 0, 100 * (mean / base - 1), np.nan)
+    return pd.DataFrame(
+        {
+            "Statut": np.select([z <= -Z_ALERT, z <= -Z_WARN], ["🔴", "🟡"], "🟢"),
+            "Alerte": label,
+            "Ville": stats[keys[0]],
+            "Période / marque": stats[keys[1]],
+            "Plateforme": stats["Plateforme"],
+            "Valeur": mean.round(2),
+            "Référence": base.round(2),
+            "Écart (σ)": np.round(z, 1),
+            "Détail": [
+                f"{c:+.1f} % sur {RECENT_DAYS} j vs les {BASELINE_DAYS} j précédents"
+                for c in change
+            ],
+        }
+    )
+
+
+def _sorted(parts) -> pd.DataFrame:
+    alerts = pd.concat(parts, ignore_index=True)
+    for col in ("Ville", "Période / marque"):
+        alerts[col] = alerts[col].astype(str)
+    rank = alerts["Statut"].map({s: i for i, s in enumerate(STATUSES)})
+    return (
+        alerts.assign(_rang=rank)
+        .sort_values(["_rang", "Alerte", "Ville", "Période / marque", "Plateforme"], kind="stable")
+        .reset_index(drop=True)[COLUMNS]
+    )
+
+
+def ca_alerts(detail: pd.DataFrame, cube: pd.DataFrame, objectives, as_of) -> pd.DataFrame:
+    """
+    Alertes CA au `as_of`. `detail` (lignes CA_Close) et `cube` (cube
+    journalier) doivent couvrir au moins les jours depuis `window_start`.
+    """
+    keys = ["Ville", "Période de close"]
+    detail = detail[(detail["Date"] >= _days_before(as_of, OBJECTIVE_DAYS)) & (detail["Date"] <= as_of)]
+    detail = detail[detail["Ville"].notna() & detail["Période de close"].notna()]
+    objectif = objectives.evaluate_ca(detail)
+    ok = detail["Chiffre d’affaires (€)"] >= objectif
+    cube = cube[cube["Ville"].notna() & cube["Période de close"].notna()]
+    return _sorted(
+        [
+            _compliance(detail, ok, objectif, keys, "Objectif CA", "closes"),
+            _drops(cube, keys, {"": "Chiffre d’affaires (€)"}, as_of, "Baisse CA par close"),
+        ]
+    )
+
+
+def notes_alerts(detail: pd.DataFrame, cube: pd.DataFrame, objectives, as_of) -> pd.DataFrame:
+    """Alertes notes au `as_of` (mêmes fenêtres que `ca_alerts`)."""
+    keys = ["Ville", "Marque"]
+    detail = detail[(detail["Date"] >= _days_before(as_of, OBJECTIVE_DAYS)) & (detail["Date"] <= as_of)]
+    detail = detail[detail["Ville"].notna() & detail["Marque"].notna()]
+    objectif = objectives.evaluate_notes(detail)
+    ok = (detail["Note Uber Eats"] >= objectif) & (detail["Note Deliveroo"] >= objectif)
+    cube = cube[cube["Ville"].notna() & cube["Marque"].notna()]
+    return _sorted(
+        [
+            _compliance(detail, ok, objectif, keys, "Objectif notes", "lignes"),
+            _drops(
+                cube,
+                keys,
+                {"Uber Eats": "Note Uber Eats", "Deliveroo": "Note Deliveroo"},
+                as_of,
+                "Baisse de note",
+            ),
+        ]
+    )
+
+
+def summary(alerts: pd.DataFrame) -> dict:
+    """Nombre d'alertes par statut."""
+    counts = alerts["Statut"].value_counts()
+    return {status: int(counts.get(status, 0)) for status in STATUSES}
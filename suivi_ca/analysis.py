@@ -0,0 +1,107 @@
+"""
+Calculs du dashboard réutilisables hors de Streamlit (rapports en lot).
+
+Respect des objectifs ligne à ligne et contenu du rapport XLSX d'une
+période : KPI (lus dans les cubes journaliers), top périodes de close,
+performance par marque et détail avec statut objectif. L'objectif de chaque
+ligne est passé tel quel (`ObjectivesStore.evaluate_*`) : il peut être
+évalué une seule fois sur toute la table puis découpé avec elle.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .cube import build_ca_cube, build_notes_cube, ca_kpis, notes_kpis, perf_marques, top_periods
+from .schema import CA_SCHEMA, NOTES_SCHEMA, widen
+
+
+class Compliance(NamedTuple):
+    # objectif applicable à chaque ligne (NaN : sans objectif)
+    objectif: pd.Series
+    ok: pd.Series
+    nb_ok: int
+    # lignes ayant un objectif
+    nb_total: int
+    pct: float
+
+
+def _compliance(objectif: pd.Series, ok: pd.Series) -> Compliance:
+    nb_ok = int(ok.sum())
+    nb_total = int(objectif.notna().sum())
+    return Compliance(objectif, ok, nb_ok, nb_total, 100 * nb_ok / nb_total if nb_total > 0 else 0)
+
+
+def ca_compliance(df_ca: pd.DataFrame, objectif: pd.Series) -> Compliance:
+    """Closes au niveau de leur objectif CA."""
+    return _compliance(objectif, df_ca["Chiffre d’affaires (€)"] >= objectif)
+
+
+def notes_compliance(df_notes: pd.DataFrame, objectif: pd.Series) -> Compliance:
+    """Lignes dont les deux notes atteignent l'objectif."""
+    ok = (df_notes["Note Uber Eats"] >= objectif) & (df_notes["Note Deliveroo"] >= objectif)
+    return _compliance(objectif, ok)
+
+
+def _status(conformite: Compliance) -> np.ndarray:
+    return np.select(
+        [conformite.objectif.isna(), conformite.ok],
+        ["⚪ Sans objectif", "🟢 OK"],
+        "🔴 Sous objectif",
+    )
+
+
+def report_sheets(
+    df_ca_f: pd.DataFrame,
+    df_notes_f: pd.DataFrame,
+    objectif_ca: pd.Series,
+    objectif_notes: pd.Series,
+) -> dict:
+    """Feuilles du rapport XLSX d'une période ({nom: DataFrame})."""
+    cube_ca = build_ca_cube(df_ca_f)
+    cube_notes = build_notes_cube(df_notes_f)
+    kpis_ca = ca_kpis(cube_ca)
+    kpis_notes = notes_kpis(cube_notes)
+    conformite_ca = ca_compliance(df_ca_f, objectif_ca)
+    conformite_notes = notes_compliance(df_notes_f, objectif_notes)
+
+    kpi = pd.DataFrame(
+        [
+            ("CA total (€)", kpis_ca["total_ca"]),
+            ("Nombre de commandes", kpis_ca["total_cmd"]),
+            ("Panier moyen (€)", kpis_ca["panier_moy"]),
+            ("CA horaire moyen (€ / h)", kpis_ca["ca_horaire_moy"]),
+            ("Closes", kpis_ca["lignes"]),
+            ("Closes ≥ objectif", conformite_ca.nb_ok),
+            ("Closes avec objectif", conformite_ca.nb_total),
+            ("Closes ≥ objectif (%)", conformite_ca.pct),
+            ("Note moyenne Uber Eats", kpis_notes["moy_uber"]),
+            ("Note moyenne Deliveroo", kpis_notes["moy_deliv"]),
+            ("Lignes de notes ≥ objectif", conformite_notes.nb_ok),
+            ("Lignes de notes avec objectif", conformite_notes.nb_total),
+            ("Lignes de notes ≥ objectif (%)", conformite_notes.pct),
+        ],
+        columns=["Indicateur", "Valeur"],
+    )
+    kpi["Valeur"] = kpi["Valeur"].astype("float64").round(2)
+
+    detail_ca = widen(df_ca_f, CA_SCHEMA).assign(
+        **{
+            "Objectif CA (€)": objectif_ca.astype("float64").round(2),
+            "Statut objectif CA": _status(conformite_ca),
+        }
+    )
+    detail_notes = widen(df_notes_f, NOTES_SCHEMA).assign(
+        **{
+            "Objectif note": objectif_notes.astype("float64").round(2),
+            "Statut objectif notes": _status(conformite_notes),
+        }
+    )
+    return {
+        "KPI": kpi,
+        "Périodes de close": top_periods(cube_ca).round(2),
+        "Marques": perf_marques(cube_notes).round(2),
+        "Détail CA": detail_ca,
+        "Détail notes": detail_notes,
+    }
@@ -0,0 +1,163 @@
+"""
+Rapports hebdomadaires en lot, sans serveur Streamlit.
+
+Un seul chargement des données (classeur ou partitions par ville, avec les
+lignes saisies du journal SQLite), objectifs évalués une fois sur toutes
+les lignes, puis un rapport PDF et / ou XLSX par ville (et « Toutes ») ×
+semaine. Les rapports sont rendus en parallèle dans des processus (la mise
+en page ReportLab est du Python pur) et écrits dans le dossier de sortie :
+
+    python -m suivi_ca.batch --semaines 4 --formats pdf xlsx --sortie rapports
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+from .config import DATA_PATH, DB_PATH, PARTITIONS_DIR
+from .index import DateVilleIndex
+from .loader import load_workbook, workbook_digest, workbook_stamp
+from .objectives import ObjectivesStore
+from .partitions import load_partitions, partition_paths, partitions_stamp
+from .report import build_pdf_report, build_xlsx_report
+from .shared import SharedDataStore
+
+FORMATS = ("pdf", "xlsx")
+TOUTES = "Toutes"
+
+
+def load_data(data_path=DATA_PATH, partitions_dir=PARTITIONS_DIR, db_path=DB_PATH) -> SharedDataStore:
+    """Données comme dans l'application : partitions si le dossier existe, sinon le classeur."""
+    partitions = partition_paths(partitions_dir)
+    if partitions:
+        paths = tuple(partitions.values())
+        data = load_partitions(paths)
+        return SharedDataStore(data.ca, data.notes, partitions_stamp(paths), data.digests, db_path)
+    df_ca, df_notes = load_workbook(data_path)
+    return SharedDataStore(
+        df_ca, df_notes, workbook_stamp(data_path), workbook_digest(data_path), db_path
+    )
+
+
+def weeks(as_of, count: int) -> list:
+    """Les `count` dernières semaines (lundi, dimanche), jusqu'à celle du `as_of` incluse."""
+    as_of = pd.Timestamp(as_of).normalize()
+    monday = as_of - pd.Timedelta(days=as_of.weekday())
+    starts = [monday - pd.Timedelta(weeks=i) for i in reversed(range(count))]
+    return [(start, start + pd.Timedelta(days=6)) for start in starts]
+
+
+class ReportTask(NamedTuple):
+    fmt: str
+    path: Path
+    ville: str
+    date_deb: pd.Timestamp
+    date_fin: pd.Timestamp
+    df_ca: pd.DataFrame
+    df_notes: pd.DataFrame
+    objectifs: dict
+
+
+# colonnes ajoutées aux tables : objectif de chaque ligne, évalué une fois
+_OBJ_CA = "_objectif_ca"
+_OBJ_NOTES = "_objectif_notes"
+
+
+def render(task: ReportTask) -> Path:
+    """Rend et écrit un rapport (exécuté dans un processus du pool)."""
+    df_ca = task.df_ca.drop(columns=_OBJ_CA)
+    df_notes = task.df_notes.drop(columns=_OBJ_NOTES)
+    if task.fmt == "pdf":
+        data = build_pdf_report(
+            df_ca,
+            df_notes,
+            task.ville,
+            task.date_deb,
+            task.date_fin,
+            task.objectifs,
+            task.df_ca[_OBJ_CA],
+            task.df_notes[_OBJ_NOTES],
+        )
+    else:
+        data = build_xlsx_report(df_ca, df_notes, task.df_ca[_OBJ_CA], task.df_notes[_OBJ_NOTES])
+    task.path.write_bytes(data)
+    return task.path
+
+
+def plan(store: SharedDataStore, objectives: ObjectivesStore, periods, formats, output, villes=None) -> list:
+    """Une tâche par ville (et « Toutes ») × semaine × format, données déjà découpées."""
+    df_ca = store.ca.frame
+    df_notes = store.notes.frame
+    toutes = sorted(df_ca["Ville"].dropna().unique().tolist())
+    villes = villes or [TOUTES, *toutes]
+    objectifs = objectives.as_dict(toutes)
+    index_ca = DateVilleIndex(df_ca.assign(**{_OBJ_CA: objectives.evaluate_ca(df_ca)}))
+    index_notes = DateVilleIndex(df_notes.assign(**{_OBJ_NOTES: objectives.evaluate_notes(df_notes)}))
+
+    output = Path(output)
+    tasks = []
+    for date_deb, date_fin in periods:
+        semaine = f"{date_deb:%G}-S{date_deb:%V}"
+        for ville in villes:
+            filtre = None if ville == TOUTES else ville
+            df_ca_f = index_ca.slice(date_deb, date_fin, filtre)
+            df_notes_f = index_notes.slice(date_deb, date_fin, filtre)
+            if df_ca_f.empty and df_notes_f.empty:
+                continue
+            for fmt in formats:
+                path = output / semaine / f"rapport_{ville}_{semaine}.{fmt}"
+                tasks.append(
+                    ReportTask(fmt, path, ville, date_deb, date_fin, df_ca_f, df_notes_f, objectifs)
+                )
+    return tasks
+
+
+def run(tasks, jobs: int = None) -> list:
+    """Rend les rapports en parallèle (`jobs` processus, 1 = dans ce processus)."""
+    for task in tasks:
+        task.path.parent.mkdir(parents=True, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(tasks) <= 1:
+        return [render(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        return list(executor.map(render, tasks))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Génère les rapports hebdomadaires par ville.")
+    parser.add_argument("--donnees", default=DATA_PATH, help="classeur de données")
+    parser.add_argument("--partitions", default=PARTITIONS_DIR,
+                        help="dossier des classeurs par ville (prioritaire s'il existe)")
+    parser.add_argument("--db", default=DB_PATH, help="base des saisies et des objectifs")
+    parser.add_argument("--sortie", default="rapports", help="dossier des rapports")
+    parser.add_argument("--semaines", type=int, default=1,
+                        help="nombre de semaines, jusqu'à celle du dernier jour de données")
+    parser.add_argument("--au", help="jour de référence (AAAA-MM-JJ), dernier jour de données par défaut")
+    parser.add_argument("--villes", nargs="+", help=f"villes (et / ou « {TOUTES} »), toutes par défaut")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--jobs", type=int, default=None, help="processus de rendu (par défaut : un par cœur)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    store = load_data(args.donnees, args.partitions, args.db)
+    objectives = ObjectivesStore(args.db)
+    as_of = pd.Timestamp(args.au) if args.au else store.ca.frame["Date"].max()
+    tasks = plan(store, objectives, weeks(as_of, args.semaines), args.formats, args.sortie, args.villes)
+    loaded = time.perf_counter()
+    written = run(tasks, args.jobs)
+    print(
+        f"{len(written)} rapports écrits dans {args.sortie} "
+        f"(chargement {loaded - start:.1f} s, rendu {time.perf_counter() - loaded:.1f} s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
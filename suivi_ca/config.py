@@ -0,0 +1,13 @@
+"""
+Emplacements des données, communs à l'application, au préchauffage
+(`warmup.py`) et aux rapports en lot (`batch.py`).
+
+Chemins relatifs au dossier de lancement (celui de `app.py`).
+"""
+
+# Fichier de données lu au lancement
+DATA_PATH = "suivi_ca_etoile_v2.xlsx"
+# Un classeur par ville (`<Ville>.xlsx`) : utilisé à la place de DATA_PATH s'il existe
+PARTITIONS_DIR = "donnees"
+# Journal SQLite des lignes saisies et des objectifs (partagé par toutes les sessions)
+DB_PATH = "suivi_ca.db"
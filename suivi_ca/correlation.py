@@ -0,0 +1,231 @@
+"""
+Croisement notes × CA : table de faits par Date × Ville et décalages.
+
+CA_Close (Date × Ville × Période de close) et Évolution_Notes (Date × Ville ×
+Marque) n'ont en commun que la date et la ville, et les notes ne sont pas
+relevées tous les jours. La table de faits agrège chaque jour de closes
+d'une ville (CA, commandes, closes) et lui associe le dernier relevé de
+notes de cette ville à cette date ou avant (jointure « as-of », au plus
+`AS_OF_DAYS` jours plus tôt) : moyennes Uber Eats / Deliveroo toutes
+marques, et date du relevé.
+
+Elle est construite à partir des cubes journaliers, puis tenue à jour :
+une ligne ajoutée (CA ou notes) ne fait recalculer que sa ville, à partir
+de sa date (un relevé de notes sert aussi aux jours de closes suivants).
+
+`lag_correlations` mesure, pour chaque décalage k de -N à +N jours, la
+corrélation entre la note d'un jour et le CA par close k jours plus tard
+(écarts à la moyenne de la ville, et du jour de la semaine pour le CA) :
+un pic pour k > 0 indique que les variations de note précèdent celles du CA.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .cube import NOTES_MEASURES, count_col
+from .schema import concat
+
+AS_OF_DAYS = 7
+MAX_LAG = 14
+# paires (note, CA) en dessous desquelles la corrélation n'est pas calculée
+MIN_PAIRS = 10
+
+NOTE_MOYENNE = "Note moyenne"
+NOTES = [*NOTES_MEASURES, NOTE_MOYENNE]
+COLUMNS = [
+    "Date",
+    "Ville",
+    "Chiffre d’affaires (€)",
+    "Nombre commandes",
+    "Closes",
+    "CA par close (€)",
+    *NOTES,
+    "Date note",
+]
+
+
+def _daily_ca(cube_ca: pd.DataFrame) -> pd.DataFrame:
+    rows = cube_ca[cube_ca["Ville"].notna()]
+    out = rows.groupby(["Date", "Ville"], as_index=False, sort=True, observed=True)[
+        ["Chiffre d’affaires (€)", "Nombre commandes", "Lignes"]
+    ].sum()
+    return out.rename(columns={"Lignes": "Closes"})
+
+
+def _daily_notes(cube_notes: pd.DataFrame) -> pd.DataFrame:
+    """Notes moyennes par Date × Ville (toutes marques), jours relevés seulement."""
+    counts = [count_col(c) for c in NOTES_MEASURES]
+    rows = cube_notes[cube_notes["Ville"].notna()]
+    sums = rows.groupby(["Date", "Ville"], as_index=False, sort=True, observed=True)[
+        NOTES_MEASURES + counts
+    ].sum()
+    out = sums[["Date", "Ville"]].copy()
+    for col in NOTES_MEASURES:
+        n = sums[count_col(col)]
+        out[col] = sums[col] / n.where(n > 0)
+    n = sums[counts].sum(axis=1)
+    out[NOTE_MOYENNE] = sums[NOTES_MEASURES].sum(axis=1) / n.where(n > 0)
+    out["Date note"] = out["Date"]
+    return out[out[NOTE_MOYENNE].notna()]
+
+
+def _as_of(daily_ca: pd.DataFrame, daily_notes: pd.DataFrame, tolerance_days: int) -> pd.DataFrame:
+    if daily_ca.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    # mêmes types des deux côtés (catégories et unités de date propres à chaque table)
+    left = daily_ca.astype({"Ville": object, "Date": "datetime64[ns]"}).sort_values("Date")
+    right = daily_notes.astype(
+        {"Ville": object, "Date": "datetime64[ns]", "Date note": "datetime64[ns]"}
+    ).sort_values("Date")
+    facts = pd.merge_asof(
+        left,
+        right,
+        on="Date",
+        by="Ville",
+        direction="backward",
+        tolerance=pd.Timedelta(days=tolerance_days),
+    )
+    closes = facts["Closes"]
+    facts["CA par close (€)"] = facts["Chiffre d’affaires (€)"] / closes.where(closes > 0)
+    return facts[COLUMNS]
+
+
+def _ordered(facts: pd.DataFrame) -> pd.DataFrame:
+    facts = facts.sort_values(["Date", "Ville"], kind="stable").reset_index(drop=True)
+    return facts.astype({"Ville": "category"})
+
+
+def build_facts(cube_ca: pd.DataFrame, cube_notes: pd.DataFrame, tolerance_days: int = AS_OF_DAYS) -> pd.DataFrame:
+    """Table de faits CA × notes par Date × Ville (triée par date puis ville)."""
+    return _ordered(_as_of(_daily_ca(cube_ca), _daily_notes(cube_notes), tolerance_days))
+
+
+def update_facts(facts, cube_ca, cube_notes, since: dict, tolerance_days: int = AS_OF_DAYS) -> pd.DataFrame:
+    """
+    Recalcule les lignes des villes de `since` ({ville: première date
+    touchée}) à partir de cette date. Les lignes antérieures à la première
+    date touchée sont reprises telles quelles (la table est triée par date) :
+    une saisie du jour ne retrie que les dernières lignes.
+    """
+    def touched(frame: pd.DataFrame, offset=pd.Timedelta(0)) -> pd.Series:
+        # lignes des villes touchées, à partir de leur date (moins `offset`)
+        debut = frame["Ville"].astype(object).map(since).astype("datetime64[ns]")
+        return frame["Date"] >= debut - offset
+
+    debut_min = min(since.values())
+    ca = cube_ca[cube_ca["Date"] >= debut_min]
+    # relevés antérieurs encore utilisables par les jours recalculés
+    notes = cube_notes[cube_notes["Date"] >= debut_min - pd.Timedelta(days=tolerance_days)]
+    recomputed = _as_of(
+        _daily_ca(ca[touched(ca)]),
+        _daily_notes(notes[touched(notes, pd.Timedelta(days=tolerance_days))]),
+        tolerance_days,
+    )
+    head = facts.iloc[: facts["Date"].searchsorted(debut_min)]
+    tail = facts.iloc[len(head) :]
+    tail = tail[~touched(tail)].astype({"Ville": object, "Date": "datetime64[ns]"})
+    if not recomputed.empty:
+        tail = pd.concat([tail, recomputed], ignore_index=True)
+    # `concat` réunit les catégories de Ville (villes ajoutées)
+    return concat([head, _ordered(tail)])
+
+
+class RatingsRevenueFacts:
+    """Table de faits CA × notes, recalculée seulement là où des lignes ont été ajoutées."""
+
+    def __init__(self, tolerance_days: int = AS_OF_DAYS, facts: pd.DataFrame = None):
+        # `facts` : table déjà construite (`build_facts`), sinon construite au premier accès
+        self.tolerance_days = tolerance_days
+        self._facts = facts
+        # {ville: première date à recalculer}
+        self._since = {}
+        self._lock = threading.Lock()
+
+    def touch(self, rows: pd.DataFrame) -> "RatingsRevenueFacts":
+        """Note les villes et dates de lignes ajoutées (CA_Close ou Évolution_Notes)."""
+        rows = rows[rows["Ville"].notna() & rows["Date"].notna()]
+        firsts = rows.groupby("Ville", observed=True)["Date"].min()
+        with self._lock:
+            for ville, debut in firsts.items():
+                self._since[ville] = min(debut, self._since.get(ville, debut))
+        return self
+
+    def frame(self, cube_ca: pd.DataFrame, cube_notes: pd.DataFrame) -> pd.DataFrame:
+        """Table à jour (`cube_*` : cubes journaliers incluant les lignes notées)."""
+        with self._lock:
+            if self._facts is None:
+                self._facts = build_facts(cube_ca, cube_notes, self.tolerance_days)
+            elif self._since:
+                self._facts = update_facts(
+                    self._facts, cube_ca, cube_notes, self._since, self.tolerance_days
+                )
+            self._since = {}
+            return self._facts
+
+
+def _grid(facts: pd.DataFrame, col: str, days: pd.DatetimeIndex, villes) -> np.ndarray:
+    """Valeurs de `col` sur la grille jours × villes (NaN : pas de valeur)."""
+    return (
+        facts.pivot_table(index="Date", columns="Ville", values=col, observed=True, dropna=False)
+        .reindex(index=days, columns=villes)
+        .to_numpy(dtype="float64", copy=True)
+    )
+
+
+def _centered(values: np.ndarray) -> np.ndarray:
+    """Écarts à la moyenne de chaque colonne (NaN ignorés)."""
+    n = (~np.isnan(values)).sum(axis=0)
+    mean = np.nansum(values, axis=0) / np.where(n > 0, n, np.nan)
+    return values - mean
+
+
+def _pearson(x: np.ndarray, y: np.ndarray):
+    pairs = ~np.isnan(x) & ~np.isnan(y)
+    n = int(pairs.sum())
+    if n < MIN_PAIRS:
+        return np.nan, n
+    x = x[pairs] - x[pairs].mean()
+    y = y[pairs] - y[pairs].mean()
+    den = np.sqrt((x**2).sum() * (y**2).sum())
+    return (float((x * y).sum() / den) if den > 0 else np.nan), n
+
+
+def lag_correlations(facts: pd.DataFrame, ville=None, max_lag: int = MAX_LAG) -> pd.DataFrame:
+    """
+    Corrélation note (jour t) / CA par close (jour t + k), pour k de
+    -max_lag à max_lag, sur une ville ou toutes (None, séries de chaque
+    ville mises bout à bout). Une ligne par décalage ; `Paires` = nombre de
+    couples (note moyenne, CA) comparés.
+    """
+    columns = ["Décalage (j)", *NOTES, "Paires"]
+    if ville is not None:
+        facts = facts[facts["Ville"] == ville]
+    facts = facts[facts["CA par close (€)"].notna()]
+    if facts.empty:
+        return pd.DataFrame(columns=columns)
+    days = pd.date_range(facts["Date"].min().normalize(), facts["Date"].max().normalize(), freq="D")
+    facts = facts.assign(Date=facts["Date"].dt.normalize())
+    villes = sorted(facts["Ville"].dropna().unique().tolist())
+
+    # écarts à la moyenne de la ville (et du jour de la semaine pour le CA)
+    ca = _grid(facts, "CA par close (€)", days, villes)
+    weekday = days.weekday.to_numpy()
+    for day in range(7):
+        ca[weekday == day] = _centered(ca[weekday == day])
+    notes = {col: _centered(_grid(facts, col, days, villes)) for col in NOTES}
+
+    out = []
+    for lag in range(-max_lag, max_lag + 1):
+        # couples (note du jour t, CA du jour t + lag), ville par ville
+        n_days = max(len(days) - abs(lag), 0)
+        start = max(-lag, 0)
+        cut = slice(start, start + n_days)
+        later = ca[start + lag : start + lag + n_days]
+        row = {"Décalage (j)": lag}
+        for col in NOTES:
+            row[col], n = _pearson(notes[col][cut].ravel(), later.ravel())
+        row["Paires"] = n
+        out.append(row)
+    return pd.DataFrame(out, columns=columns)
@@ -0,0 +1,133 @@
+"""
+Cubes pré-agrégés par jour pour les KPI du mode Analyse.
+
+- CA_Close : Date × Ville × Période de close ;
+- Évolution_Notes : Date × Ville × Marque.
+
+Les mesures sont additives (sommes et nombres de valeurs renseignées) : un
+cube peut donc être filtré sur n'importe quelle période puis ré-agrégé, et
+mis à jour en n'agrégeant que les lignes ajoutées. Les moyennes sont
+obtenues par somme / nombre, comme `mean()` qui ignore les NaN.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .schema import CA_SCHEMA, NOTES_SCHEMA, concat, widen
+
+CA_KEYS = ["Date", "Ville", "Période de close"]
+CA_MEASURES = [
+    "Chiffre d’affaires (€)",
+    "Nombre commandes",
+    "CA horaire (€ / h)",
+    "Cmd horaires",
+]
+NOTES_KEYS = ["Date", "Ville", "Marque"]
+NOTES_MEASURES = ["Note Uber Eats", "Note Deliveroo"]
+
+
+def count_col(col: str) -> str:
+    return f"{col} (n)"
+
+
+def _build_cube(df: pd.DataFrame, keys, measures, schema) -> pd.DataFrame:
+    # float32 du schéma ré-élargis (arrondis à la saisie) avant de sommer
+    values = widen(df[measures], schema).astype("float64")
+    counts = values.notna().rename(columns=count_col)
+    parts = pd.concat([df[keys], values, counts], axis=1)
+    parts = parts[parts["Date"].notna()]
+    cube = parts.groupby(keys, as_index=False, sort=True, dropna=False, observed=True).sum()
+    cube["Lignes"] = parts.groupby(keys, sort=True, dropna=False, observed=True).size().to_numpy()
+    return cube
+
+
+def _merge_cubes(cube: pd.DataFrame, delta: pd.DataFrame, keys) -> pd.DataFrame:
+    if delta.empty:
+        return cube
+    # cas courant : saisie de jours nouveaux, l'ordre reste trié
+    if cube.empty or delta["Date"].min() > cube["Date"].max():
+        return concat([cube, delta])
+    combined = concat([cube, delta])
+    return combined.groupby(keys, as_index=False, sort=True, dropna=False, observed=True).sum()
+
+
+def build_ca_cube(df_ca: pd.DataFrame) -> pd.DataFrame:
+    return _build_cube(df_ca, CA_KEYS, CA_MEASURES, CA_SCHEMA)
+
+
+def update_ca_cube(cube: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    return _merge_cubes(cube, build_ca_cube(new_rows), CA_KEYS)
+
+
+def build_notes_cube(df_notes: pd.DataFrame) -> pd.DataFrame:
+    return _build_cube(df_notes, NOTES_KEYS, NOTES_MEASURES, NOTES_SCHEMA)
+
+
+def update_notes_cube(cube: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    return _merge_cubes(cube, build_notes_cube(new_rows), NOTES_KEYS)
+
+
+def _means(sums: pd.DataFrame, measures) -> pd.DataFrame:
+    out = sums.drop(columns=[count_col(c) for c in measures] + ["Lignes"])
+    for col in measures:
+        n = sums[count_col(col)]
+        out[col] = sums[col] / n.where(n > 0)
+    return out
+
+
+def _mean(cube: pd.DataFrame, col: str) -> float:
+    n = cube[count_col(col)].sum()
+    return cube[col].sum() / n if n > 0 else np.nan
+
+
+# -------------------- REQUÊTES CA --------------------
+
+
+def ca_kpis(cube: pd.DataFrame) -> dict:
+    """Totaux, panier moyen et CA horaire moyen d'un cube (déjà filtré)."""
+    total_ca = cube["Chiffre d’affaires (€)"].sum()
+    total_cmd = cube["Nombre commandes"].sum()
+    return {
+        "total_ca": total_ca,
+        "total_cmd": total_cmd,
+        "panier_moy": total_ca / total_cmd if total_cmd > 0 else np.nan,
+        "ca_horaire_moy": _mean(cube, "CA horaire (€ / h)"),
+        "lignes": int(cube["Lignes"].sum()),
+    }
+
+
+def top_periods(cube: pd.DataFrame) -> pd.DataFrame:
+    """Moyennes par Ville × Période de close, triées par CA horaire."""
+    cols = ["CA horaire (€ / h)", "Chiffre d’affaires (€)", "Nombre commandes"]
+    sums = cube.groupby(["Ville", "Période de close"], as_index=False, observed=True)[
+        CA_MEASURES + [count_col(c) for c in CA_MEASURES] + ["Lignes"]
+    ].sum()
+    means = _means(sums, CA_MEASURES)
+    return means[["Ville", "Période de close"] + cols].sort_values(
+        "CA horaire (€ / h)", ascending=False
+    )
+
+
+def pivot_ca(cube: pd.DataFrame) -> pd.DataFrame:
+    """Sommes par Date × Ville × Période de close (lignes du cube)."""
+    rows = cube[cube["Ville"].notna() & cube["Période de close"].notna()]
+    return rows[CA_KEYS + CA_MEASURES].reset_index(drop=True)
+
+
+# -------------------- REQUÊTES NOTES --------------------
+
+
+def notes_kpis(cube: pd.DataFrame) -> dict:
+    return {
+        "moy_uber": _mean(cube, "Note Uber Eats"),
+        "moy_deliv": _mean(cube, "Note Deliveroo"),
+        "lignes": int(cube["Lignes"].sum()),
+    }
+
+
+def perf_marques(cube: pd.DataFrame) -> pd.DataFrame:
+    """Notes moyennes par Ville × Marque."""
+    sums = cube.groupby(["Ville", "Marque"], as_index=False, observed=True)[
+        NOTES_MEASURES + [count_col(c) for c in NOTES_MEASURES] + ["Lignes"]
+    ].sum()
+    return _means(sums, NOTES_MEASURES).sort_values(["Ville", "Marque"])
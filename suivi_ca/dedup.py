@@ -0,0 +1,67 @@
+"""
+Clés naturelles des tables et dédoublonnage.
+
+Une ligne CA_Close est identifiée par (Date, Ville, Période de close), une
+ligne Évolution_Notes par (Date, Ville, Marque). L'import en masse ignore
+les lignes dont la clé existe déjà ; le journal des saisies (`shared.py`)
+ne rejoue pas une saisie d'un autre classeur déjà reprise dans les données.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from .loader import SHEET_CA, SHEET_NOTES
+
+KEYS = {
+    SHEET_CA: ["Date", "Ville", "Période de close"],
+    SHEET_NOTES: ["Date", "Ville", "Marque"],
+}
+
+
+def key_hashes(df: pd.DataFrame, keys) -> np.ndarray:
+    """Clé de chaque ligne, hachée sur 8 octets (catégories comprises comme leurs valeurs)."""
+    cols = {}
+    for k in keys:
+        if k == "Date":
+            cols[k] = df[k].to_numpy(dtype="datetime64[ns]").view("int64")
+        else:
+            cols[k] = df[k]
+    return hash_pandas_object(pd.DataFrame(cols), index=False).to_numpy()
+
+
+class Deduplicator:
+    """Clés (hachées sur 8 octets) des lignes existantes et déjà importées."""
+
+    def __init__(self, existing: pd.DataFrame, keys):
+        self.keys = keys
+        self._seen = np.unique(key_hashes(existing, keys)) if len(existing) else np.empty(0, "uint64")
+        self._added = set()
+
+    def _known(self, hashes: np.ndarray) -> np.ndarray:
+        known = np.array([h in self._added for h in hashes.tolist()], dtype=bool)
+        if len(self._seen):
+            pos = np.searchsorted(self._seen, hashes).clip(max=len(self._seen) - 1)
+            known |= self._seen[pos] == hashes
+        return known
+
+    def known(self, rows: pd.DataFrame) -> np.ndarray:
+        """Masque des lignes dont la clé figure dans les données existantes ou ajoutées."""
+        return self._known(key_hashes(rows, self.keys))
+
+    def add(self, rows: pd.DataFrame) -> "Deduplicator":
+        """Enregistre les clés de lignes ajoutées aux données (sans refaire le tri)."""
+        if len(rows):
+            self._added.update(key_hashes(rows, self.keys).tolist())
+        return self
+
+    def new_rows(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Lignes de clé inconnue, enregistrées comme ajoutées."""
+        if rows.empty:
+            return rows
+        hashes = key_hashes(rows, self.keys)
+        # doublons internes au fichier : première occurrence conservée
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        keep = ~self._known(hashes) & first
+        self._added.update(hashes[keep].tolist())
+        return rows[keep]
@@ -0,0 +1,61 @@
+"""
+Colonnes dérivées de CA_Close : durée de la close, CA horaire, commandes/h.
+
+Il n'existe qu'une poignée de « Période de close » distinctes : chaque chaîne
+est analysée une seule fois (mémoïsée), puis la durée est propagée à toutes
+les lignes via les codes de la colonne catégorielle. Le coût reste ainsi
+quasi constant quel que soit le nombre de closes.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .schema import CA_SCHEMA, widen
+
+
+@lru_cache(maxsize=1024)
+def _parse_period(period_str: str) -> float:
+    try:
+        start_str, end_str = [s.strip() for s in period_str.split("-")]
+        start = datetime.strptime(start_str, "%H:%M")
+        end = datetime.strptime(end_str, "%H:%M")
+    except (AttributeError, ValueError):
+        return np.nan
+    delta = (end - start).total_seconds() / 3600.0
+    if delta <= 0:
+        delta += 24.0  # close à cheval sur minuit
+    return delta
+
+
+def compute_duration_hours(period_str: str) -> float:
+    """Calcule la durée en heures à partir d'une chaîne du type '23:00 - 00:00'."""
+    if not isinstance(period_str, str):
+        return np.nan
+    return _parse_period(period_str)
+
+
+def period_durations(periods: pd.Series) -> np.ndarray:
+    """Durée (h) de chaque ligne, en n'analysant que les périodes distinctes."""
+    periods = periods.astype("category")
+    categories = periods.cat.categories
+    by_category = np.array(
+        [compute_duration_hours(p) for p in categories], dtype="float64"
+    )
+    codes = periods.cat.codes.to_numpy()
+    if by_category.size == 0:
+        return np.full(len(codes), np.nan)
+    # code -1 = valeur manquante -> NaN
+    return np.where(codes >= 0, by_category.take(codes, mode="clip"), np.nan)
+
+
+def add_ca_horaire(df_ca: pd.DataFrame) -> pd.DataFrame:
+    df = df_ca.copy()
+    # ratios en float64, calculés sur les valeurs saisies (float32 ré-élargis)
+    mesures = widen(df[["Chiffre d’affaires (€)", "Nombre commandes"]], CA_SCHEMA).astype("float64")
+    df["Duree (h)"] = period_durations(df["Période de close"])
+    df["CA horaire (€ / h)"] = mesures["Chiffre d’affaires (€)"] / df["Duree (h)"]
+    df["Cmd horaires"] = mesures["Nombre commandes"] / df["Duree (h)"]
+    return df
@@ -0,0 +1,149 @@
+"""
+Export des données mises à jour (Excel, CSV ou Parquet).
+
+L'Excel est écrit ligne par ligne en mode streaming (xlsxwriter en mode
+`constant_memory` dans un fichier temporaire, sinon openpyxl en
+`write_only`) : la mémoire de travail reste constante quelle que soit la
+taille de l'historique ; seul le fichier final, compressé, est relu en
+mémoire. Pour les gros
+historiques, CSV et Parquet (deux fichiers dans un zip) sont bien plus
+rapides à produire.
+"""
+
+import tempfile
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .loader import SHEET_CA, SHEET_NOTES
+from .schema import CA_SCHEMA, NOTES_SCHEMA, widen
+
+
+def _wide(df_ca: pd.DataFrame, df_notes: pd.DataFrame):
+    # fichiers produits dans les types d'origine (chaînes, int64, float64)
+    return widen(df_ca, CA_SCHEMA), widen(df_notes, NOTES_SCHEMA)
+
+
+def _rows(df: pd.DataFrame):
+    """Lignes du DataFrame en types Python natifs (None pour les manquants)."""
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        if pd.api.types.is_datetime64_any_dtype(col):
+            values = np.array(col.dt.to_pydatetime(), dtype=object)
+        else:
+            values = np.array(col.to_numpy(dtype=object))
+        values[col.isna().to_numpy()] = None
+        columns.append(values)
+    return zip(*columns)
+
+
+def _excel_xlsxwriter(xlsxwriter, sheets: dict) -> bytes:
+    # `constant_memory` est ignoré avec `in_memory` (ou un BytesIO) : le
+    # classeur est écrit dans un fichier temporaire, feuilles flushées ligne à ligne
+    with tempfile.TemporaryDirectory(prefix="export_") as tmp:
+        path = Path(tmp) / "export.xlsx"
+        _write_xlsxwriter(xlsxwriter, path, sheets)
+        return path.read_bytes()
+
+
+def _write_xlsxwriter(xlsxwriter, path, sheets: dict):
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True, "tmpdir": str(Path(path).parent)})
+    bold = workbook.add_format({"bold": True})
+    date_fmt = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    for sheet_name, df in sheets.items():
+        ws = workbook.add_worksheet(sheet_name)
+        ws.write_row(0, 0, list(df.columns), bold)
+        dates = [
+            pd.api.types.is_datetime64_any_dtype(df[c]) for c in df.columns
+        ]
+        for j, is_date in enumerate(dates):
+            if is_date:
+                ws.set_column(j, j, 19, date_fmt)
+        for i, row in enumerate(_rows(df), start=1):
+            ws.write_row(i, 0, row)
+    workbook.close()
+
+
+def _excel_openpyxl(sheets: dict) -> bytes:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        ws = workbook.create_sheet(sheet_name)
+        ws.append(list(df.columns))
+        for row in _rows(df):
+            ws.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def build_sheets_bytes(sheets: dict) -> bytes:
+    """Classeur XLSX d'une feuille par DataFrame ({nom de feuille: DataFrame})."""
+    # writers chargés au premier export, pas à l'import du module
+    try:
+        import xlsxwriter
+    except ImportError:  # repli sur openpyxl
+        return _excel_openpyxl(sheets)
+    return _excel_xlsxwriter(xlsxwriter, sheets)
+
+
+def build_excel_bytes(df_ca: pd.DataFrame, df_notes: pd.DataFrame) -> bytes:
+    df_ca, df_notes = _wide(df_ca, df_notes)
+    return build_sheets_bytes({SHEET_CA: df_ca, SHEET_NOTES: df_notes})
+
+
+def _zip_bytes(files: dict) -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def build_csv_zip_bytes(df_ca: pd.DataFrame, df_notes: pd.DataFrame) -> bytes:
+    df_ca, df_notes = _wide(df_ca, df_notes)
+    return _zip_bytes(
+        {
+            "ca_close.csv": df_ca.to_csv(index=False).encode("utf-8-sig"),
+            "evolution_notes.csv": df_notes.to_csv(index=False).encode("utf-8-sig"),
+        }
+    )
+
+
+def build_parquet_zip_bytes(df_ca: pd.DataFrame, df_notes: pd.DataFrame) -> bytes:
+    df_ca, df_notes = _wide(df_ca, df_notes)
+    return _zip_bytes(
+        {
+            "ca_close.parquet": df_ca.to_parquet(index=False),
+            "evolution_notes.parquet": df_notes.to_parquet(index=False),
+        }
+    )
+
+
+class ExportFormat(NamedTuple):
+    build: Callable[[pd.DataFrame, pd.DataFrame], bytes]
+    file_name: str
+    mime: str
+
+
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": ExportFormat(
+        build_excel_bytes,
+        "suivi_close_amiens_beauvais_updated.xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+    "CSV (.zip)": ExportFormat(
+        build_csv_zip_bytes, "suivi_close_amiens_beauvais_csv.zip", "application/zip"
+    ),
+    "Parquet (.zip)": ExportFormat(
+        build_parquet_zip_bytes,
+        "suivi_close_amiens_beauvais_parquet.zip",
+        "application/zip",
+    ),
+}
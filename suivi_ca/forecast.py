@@ -0,0 +1,150 @@
+"""
+Prévision de la semaine suivante par Ville × Période de close.
+
+Modèle volontairement simple, ajusté avec NumPy sur les dernières semaines
+du cube journalier : niveau + tendance linéaire (par semaine) + effet du
+jour de la semaine, par moindres carrés (légèrement régularisés, pour les
+séries courtes). Toutes les séries sont ajustées d'un coup : équations
+normales empilées (une matrice 8 × 8 par série) résolues par un seul
+`np.linalg.solve`.
+
+La bande autour de la prévision est l'intervalle à 80 % tiré de l'écart type
+des résidus. Les objectifs suggérés sont le niveau de CA atteint par ~80 %
+des closes prévues (le seuil 🟢 des pages Analyse).
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from .alerts import OK_PCT
+from .cube import CA_KEYS, count_col
+
+HISTORY_DAYS = 182
+HORIZON_DAYS = 7
+# nombre minimal de jours observés pour prévoir une série
+MIN_OBS = 8
+# régularisation de la tendance et des effets jour (pas du niveau)
+RIDGE = 1.0
+BAND = 0.80
+
+MEASURES = {
+    "CA par close (€)": "Chiffre d’affaires (€)",
+    "Cmd horaires": "Cmd horaires",
+}
+KEYS = [k for k in CA_KEYS if k != "Date"]
+
+
+def _design(days: pd.DatetimeIndex, as_of: pd.Timestamp) -> np.ndarray:
+    """Niveau, tendance (en semaines depuis `as_of`), indicatrices mardi..dimanche."""
+    weeks = ((days - as_of) / pd.Timedelta(days=7)).to_numpy(dtype="float64")
+    weekday = days.weekday.to_numpy()
+    dummies = (weekday[:, None] == np.arange(1, 7)[None, :]).astype("float64")
+    return np.column_stack([np.ones(len(days)), weeks, dummies])
+
+
+def _fit(X: np.ndarray, Y: np.ndarray):
+    """
+    Coefficients (séries × paramètres), écart type des résidus et nombre de
+    jours observés, pour chaque colonne de `Y` (jours × séries, NaN = absent).
+    """
+    observed = ~np.isnan(Y)
+    values = np.where(observed, Y, 0.0)
+    mask = observed.astype("float64")
+    xtx = np.einsum("tp,tq,ts->spq", X, X, mask)
+    xty = np.einsum("tp,ts->sp", X, values)
+    penalty = np.diag([0.0] + [RIDGE] * (X.shape[1] - 1))
+    beta = np.linalg.solve(xtx + penalty, xty[..., None])[..., 0]
+
+    n_obs = observed.sum(axis=0)
+    residuals = np.where(observed, Y - X @ beta.T, 0.0)
+    dof = np.maximum(n_obs - X.shape[1], 1)
+    sigma = np.sqrt((residuals**2).sum(axis=0) / dof)
+    return beta, sigma, n_obs
+
+
+def fit_forecasts(
+    cube: pd.DataFrame,
+    as_of=None,
+    history_days: int = HISTORY_DAYS,
+    horizon_days: int = HORIZON_DAYS,
+) -> pd.DataFrame:
+    """
+    Prévisions journalières des `horizon_days` jours suivant `as_of` (dernier
+    jour du cube par défaut) : une ligne par jour × série × mesure, avec la
+    bande à 80 % (Bas, Haut) et l'écart type des résidus (σ).
+    """
+    columns = ["Date", *KEYS, "Mesure", "Prévision", "Bas", "Haut", "σ"]
+    cube = cube[cube["Date"].notna()]
+    for key in KEYS:
+        cube = cube[cube[key].notna()]
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+    as_of = pd.Timestamp(as_of if as_of is not None else cube["Date"].max()).normalize()
+    days = pd.date_range(as_of - pd.Timedelta(days=history_days - 1), as_of, freq="D")
+    cube = cube[(cube["Date"] >= days[0]) & (cube["Date"] <= as_of)]
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+
+    series_pos = cube.groupby(KEYS, sort=True, observed=True).ngroup().to_numpy()
+    first = pd.Series(series_pos).drop_duplicates().sort_values()
+    series = cube[KEYS].iloc[first.index].reset_index(drop=True)
+    day_pos = ((cube["Date"].dt.normalize() - days[0]) // pd.Timedelta(days=1)).to_numpy()
+
+    future = pd.date_range(as_of + pd.Timedelta(days=1), periods=horizon_days, freq="D")
+    X = _design(days, as_of)
+    X_future = _design(future, as_of)
+    z = NormalDist().inv_cdf(0.5 + BAND / 2)
+
+    parts = []
+    for label, col in MEASURES.items():
+        total = cube[col].to_numpy(dtype="float64")
+        count = cube[count_col(col)].to_numpy(dtype="float64")
+        Y = np.full((len(days), len(series)), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            Y[day_pos, series_pos] = np.where(count > 0, total / count, np.nan)
+
+        beta, sigma, n_obs = _fit(X, Y)
+        keep = np.flatnonzero(n_obs >= MIN_OBS)
+        pred = (X_future @ beta.T)[:, keep]
+        part = {
+            "Date": np.repeat(future.to_numpy(), len(keep)),
+            **{k: np.tile(series[k].to_numpy()[keep], horizon_days) for k in KEYS},
+            "Mesure": label,
+            # valeurs positives : pas de CA ni de commandes négatifs
+            "Prévision": np.clip(pred, 0, None).ravel(),
+            "Bas": np.clip(pred - z * sigma[keep], 0, None).ravel(),
+            "Haut": np.clip(pred + z * sigma[keep], 0, None).ravel(),
+            "σ": np.tile(sigma[keep], horizon_days),
+        }
+        parts.append(pd.DataFrame(part))
+    return pd.concat(parts, ignore_index=True)[columns]
+
+
+def suggest_objectives(
+    forecasts: pd.DataFrame,
+    keys=("Ville",),
+    share: float = OK_PCT / 100,
+    step: float = 5.0,
+) -> pd.DataFrame:
+    """
+    Objectif CA par close atteint par ~`share` des closes prévues, par `keys` :
+    moyenne des quantiles (1 - share) des prévisions, arrondie à `step` €.
+    """
+    keys = list(keys)
+    ca = forecasts[forecasts["Mesure"] == "CA par close (€)"]
+    z = NormalDist().inv_cdf(1 - share)
+    floor = np.clip(ca["Prévision"] + z * ca["σ"], 0, None)
+    out = (
+        ca.assign(_seuil=floor)
+        .groupby(keys, sort=True, observed=True)
+        .agg(prevu=("Prévision", "mean"), seuil=("_seuil", "mean"))
+        .reset_index()
+    )
+    return out.assign(
+        **{
+            "CA prévu par close (€)": out["prevu"].round(2),
+            "Objectif suggéré (€)": (out["seuil"] / step).round() * step,
+        }
+    ).drop(columns=["prevu", "seuil"])
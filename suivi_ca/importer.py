@@ -0,0 +1,321 @@
+"""
+Import en masse de fichiers CSV / XLSX (exports Uber Eats, Deliveroo...).
+
+Le fichier est lu par blocs de lignes (`read_csv(chunksize=...)`, openpyxl
+en lecture seule) : la mémoire utilisée reste bornée par la taille d'un bloc,
+quel que soit le nombre de lignes. Chaque bloc est :
+
+1. renommé vers les colonnes de CA_Close / Évolution_Notes (correspondance
+   proposée automatiquement, modifiable) ;
+2. validé contre le schéma (`schema.py`), les lignes non conformes écartées
+   (ainsi que celles d'une ville hors des partitions chargées) ;
+3. dédoublonné sur (Date, Ville, Période de close) ou (Date, Ville, Marque),
+   contre les données existantes et les blocs déjà importés ;
+4. ajouté aux données partagées (journal SQLite + store) en un seul lot.
+
+Les doublons sont ignorés : une ligne déjà présente n'est jamais remplacée.
+"""
+
+import csv
+import io
+import unicodedata
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+from .dedup import KEYS, Deduplicator
+from .loader import SHEET_CA, SHEET_NOTES
+from .schema import CA_SCHEMA, CATEGORY, NOTES_SCHEMA, split_valid
+
+CHUNK_ROWS = 50_000
+
+
+class ImportTarget(NamedTuple):
+    schema: dict
+    keys: list
+    # noms de colonnes reconnus (normalisés : minuscules, sans accents)
+    aliases: dict
+
+
+TARGETS = {
+    SHEET_CA: ImportTarget(
+        CA_SCHEMA,
+        KEYS[SHEET_CA],
+        {
+            "Date": ["date", "jour", "day", "order date", "date de la commande"],
+            "Ville": ["ville", "city", "site", "location", "restaurant"],
+            "Nombre commandes": [
+                "nombre commandes", "nombre de commandes", "commandes", "nb commandes",
+                "orders", "order count", "total orders",
+            ],
+            "Chiffre d’affaires (€)": [
+                "chiffre d'affaires (€)", "chiffre d'affaires", "ca", "ca (€)",
+                "revenue", "sales", "gross sales", "total",
+            ],
+            "Période de close": [
+                "période de close", "periode de close", "période", "close",
+                "creneau", "shift",
+            ],
+        },
+    ),
+    SHEET_NOTES: ImportTarget(
+        NOTES_SCHEMA,
+        KEYS[SHEET_NOTES],
+        {
+            "Date": ["date", "jour", "day"],
+            "Ville": ["ville", "city", "site", "location"],
+            "Marque": ["marque", "brand", "store", "restaurant"],
+            "Note Uber Eats": ["note uber eats", "uber eats", "uber rating", "note uber"],
+            "Note Deliveroo": ["note deliveroo", "deliveroo", "deliveroo rating"],
+        },
+    ),
+}
+
+
+def _normalize(name) -> str:
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    return " ".join(text.replace("’", "'").replace("_", " ").lower().split())
+
+
+def suggest_mapping(columns, table: str) -> dict:
+    """Colonne du fichier proposée pour chaque colonne cible (None si aucune)."""
+    by_name = {_normalize(c): c for c in columns}
+    mapping = {}
+    for target, aliases in TARGETS[table].aliases.items():
+        candidates = [_normalize(target), *(_normalize(a) for a in aliases)]
+        mapping[target] = next((by_name[c] for c in candidates if c in by_name), None)
+    return mapping
+
+
+# -------------------- LECTURE PAR BLOCS --------------------
+
+
+def _is_excel(name: str) -> bool:
+    return Path(name).suffix.lower() in (".xlsx", ".xlsm")
+
+
+def _open_binary(source):
+    if isinstance(source, (str, Path)):
+        return open(source, "rb")
+    source.seek(0)
+    return source
+
+
+def _csv_dialect(sample: bytes):
+    """(encodage, séparateur, séparateur décimal) déduits du début du fichier."""
+    try:
+        text = sample.decode("utf-8-sig")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        text = sample.decode("latin-1")
+        encoding = "latin-1"
+    try:
+        sep = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t|").delimiter
+    except csv.Error:
+        sep = ","
+    # exports « à la française » : ';' entre colonnes, ',' décimale
+    return encoding, sep, "," if sep == ";" else "."
+
+
+def excel_sheets(source) -> list:
+    from openpyxl import load_workbook
+
+    fh = _open_binary(source)
+    workbook = load_workbook(fh, read_only=True, data_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def _excel_chunks(source, sheet, chunk_rows):
+    from openpyxl import load_workbook
+
+    fh = _open_binary(source)
+    workbook = load_workbook(fh, read_only=True, data_only=True)
+    try:
+        ws = workbook[sheet] if sheet else workbook.worksheets[0]
+        total = max((ws.max_row or 0) - 1, 1)
+        rows = ws.iter_rows(values_only=True)
+        header = [
+            str(c) if c is not None else f"Colonne {i + 1}"
+            for i, c in enumerate(next(rows, ()))
+        ]
+        done, block = 0, []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            block.append(row[: len(header)])
+            if len(block) == chunk_rows:
+                done += len(block)
+                yield pd.DataFrame(block, columns=header), min(done / total, 1.0)
+                block = []
+        if block or not done:
+            yield pd.DataFrame(block, columns=header), 1.0
+    finally:
+        workbook.close()
+
+
+def _csv_chunks(source, chunk_rows):
+    fh = _open_binary(source)
+    sample = fh.read(64 * 1024)
+    fh.seek(0, io.SEEK_END)
+    size = max(fh.tell(), 1)
+    fh.seek(0)
+    encoding, sep, decimal = _csv_dialect(sample)
+    # décodage fait ici : pandas fermerait le fichier téléversé en fin de lecture
+    text = io.TextIOWrapper(fh, encoding=encoding, newline="")
+    try:
+        with pd.read_csv(text, sep=sep, decimal=decimal, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                # position dans le fichier : avancement approximatif
+                yield chunk, min(fh.tell() / size, 1.0)
+    finally:
+        text.detach()
+
+
+def iter_chunks(source, name: str, sheet=None, chunk_rows: int = CHUNK_ROWS):
+    """Blocs (DataFrame brut, avancement entre 0 et 1) d'un fichier CSV ou XLSX."""
+    if _is_excel(name):
+        return _excel_chunks(source, sheet, chunk_rows)
+    return _csv_chunks(source, chunk_rows)
+
+
+def preview(source, name: str, sheet=None, rows: int = 5) -> pd.DataFrame:
+    """Premières lignes du fichier, pour choisir la correspondance des colonnes."""
+    chunk, _ = next(iter_chunks(source, name, sheet, chunk_rows=rows))
+    return chunk
+
+
+# -------------------- CORRESPONDANCE DES COLONNES --------------------
+
+
+# « 1,234 » / « 1,234,567 » : virgules des milliers (format anglais)
+_THOUSANDS_COMMA = r"-?\d{1,3}(?:,\d{3})+"
+# « 1.234.567 » : points des milliers (au moins deux groupes)
+_THOUSANDS_DOT = r"-?\d{1,3}(?:\.\d{3}){2,}"
+
+
+def _to_number(series: pd.Series) -> pd.Series:
+    """
+    Nombres écrits en texte, aux formats français ou anglais. Avec un point
+    et une virgule, le dernier des deux est la décimale (« 1.234,50 »,
+    « 1,234.50 ») ; une virgule seule est une décimale (« 1234,50 »), sauf
+    suivie de groupes de trois chiffres (« 1,234 » = 1234).
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    text = series.astype(str).str.replace(r"[\s€]", "", regex=True)
+    comma, dot = text.str.rfind(","), text.str.rfind(".")
+    thousands = (
+        ((comma >= 0) & (dot >= 0) & (dot > comma))
+        | ((dot < 0) & text.str.fullmatch(_THOUSANDS_COMMA))
+    )
+    decimal_comma = (comma >= 0) & ~thousands
+    thousands_dot = (decimal_comma & (dot >= 0)) | text.str.fullmatch(_THOUSANDS_DOT)
+    text = text.where(~thousands_dot, text.str.replace(".", "", regex=False))
+    text = text.where(~thousands, text.str.replace(",", "", regex=False))
+    text = text.where(~decimal_comma, text.str.replace(",", ".", regex=False))
+    # valeur illisible laissée telle quelle : la validation l'écarte
+    numbers = pd.to_numeric(text, errors="coerce")
+    return numbers.where(numbers.notna() | series.isna(), series)
+
+
+def _to_dates(values: pd.Series) -> pd.Series:
+    """
+    Dates ISO (« 2025-11-03 », courantes dans les exports des plateformes)
+    lues telles quelles ; les autres au format français, jour en premier.
+    """
+    dates = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    rest = dates.isna() & values.notna()
+    if rest.any():
+        dates = dates.copy()
+        dates[rest] = pd.to_datetime(values[rest], format="mixed", dayfirst=True, errors="coerce")
+    return dates
+
+
+def map_columns(chunk: pd.DataFrame, table: str, mapping: dict, constants: dict = None) -> pd.DataFrame:
+    """
+    Renomme un bloc vers les colonnes cibles : `mapping[cible]` = colonne du
+    fichier, ou `constants[cible]` = valeur fixe (ex. la ville d'un export).
+    """
+    schema = TARGETS[table].schema
+    constants = constants or {}
+    out = {}
+    for target in TARGETS[table].aliases:
+        source_col = mapping.get(target)
+        if source_col is not None and source_col in chunk:
+            values = chunk[source_col]
+        elif constants.get(target) not in (None, ""):
+            values = pd.Series(constants[target], index=chunk.index)
+        else:
+            continue
+        if target == "Date":
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                values = _to_dates(values)
+            # les données sont journalières
+            values = values.dt.normalize()
+        elif schema[target].dtype != CATEGORY:
+            values = _to_number(values)
+        else:
+            values = values.astype(str).str.strip().where(values.notna())
+        out[target] = values
+    return pd.DataFrame(out, index=chunk.index)
+
+
+class ImportStats:
+    def __init__(self):
+        self.lues = 0
+        self.invalides = 0
+        self.doublons = 0
+        self.ajoutees = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "lues": self.lues,
+            "invalides": self.invalides,
+            "doublons": self.doublons,
+            "ajoutees": self.ajoutees,
+        }
+
+
+def import_file(
+    source,
+    name: str,
+    table: str,
+    mapping: dict,
+    append,
+    existing: pd.DataFrame,
+    constants: dict = None,
+    sheet=None,
+    chunk_rows: int = CHUNK_ROWS,
+    progress=None,
+    villes=None,
+) -> ImportStats:
+    """
+    Importe un fichier bloc par bloc. `append(lignes)` ajoute un lot aux
+    données (ex. `SharedDataStore.append_ca`) ; `progress(fraction, stats)`
+    est appelé après chaque bloc. `villes` : villes acceptées (ex.
+    `SharedDataStore.villes`), les autres lignes sont comptées non conformes
+    au lieu de faire échouer l'ajout du bloc.
+    """
+    target = TARGETS[table]
+    dedup = Deduplicator(existing, target.keys)
+    stats = ImportStats()
+    for chunk, fraction in iter_chunks(source, name, sheet, chunk_rows):
+        stats.lues += len(chunk)
+        rows, invalid = split_valid(map_columns(chunk, table, mapping, constants), target.schema)
+        if villes is not None:
+            hors = ~rows["Ville"].astype(object).isin(villes)
+            invalid += int(hors.sum())
+            rows = rows[~hors]
+        stats.invalides += invalid
+        new = dedup.new_rows(rows)
+        stats.doublons += len(rows) - len(new)
+        if not new.empty:
+            append(new)
+            stats.ajoutees += len(new)
+        if progress is not None:
+            progress(fraction, stats)
+    return stats
@@ -0,0 +1,86 @@
+"""
+Index Date / Ville pour les filtres du mode Analyse.
+
+Les données sont triées une fois par date, globalement et par ville. Un
+filtre « période + ville » devient alors deux recherches dichotomiques et
+une tranche `iloc` (une vue, sans copie) au lieu d'un masque booléen sur
+toutes les lignes à chaque rerun.
+
+Les lignes ajoutées ensuite (`extend`) ne refont pas le tri de toute la
+table : elles forment un petit index à part, fusionné dans les tranches
+qui les concernent, et ne sont intégrées au tri principal qu'au-delà de
+`COMPACT_MIN_ROWS` lignes ou de `COMPACT_RATIO` de la table.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .schema import concat
+
+COMPACT_MIN_ROWS = 1_000
+COMPACT_RATIO = 0.05
+
+
+def _stack(frames: list) -> pd.DataFrame:
+    # `concat` renumérote : les lignes gardent leur index d'origine
+    return concat(frames).set_axis(frames[0].index.append([f.index for f in frames[1:]]))
+
+
+class DateVilleIndex:
+    def __init__(self, df: pd.DataFrame, date_col: str = "Date", ville_col: str = "Ville"):
+        self._cols = (date_col, ville_col)
+        dates = df[date_col].to_numpy(dtype="datetime64[ns]")
+        # tri stable : l'ordre d'origine est conservé à date égale (NaT en fin)
+        order = np.argsort(dates, kind="stable")
+        self._all = (df.take(order), dates[order])
+
+        self._villes = {}
+        villes = df[ville_col].to_numpy()[order]
+        for ville in pd.unique(villes[pd.notna(villes)]):
+            positions = np.flatnonzero(villes == ville)
+            self._villes[ville] = (self._all[0].take(positions), self._all[1][positions])
+        # lignes ajoutées depuis le tri (DateVilleIndex), None si aucune
+        self._added = None
+
+    def extend(self, rows: pd.DataFrame) -> "DateVilleIndex":
+        """Nouvel index avec `rows` en plus (celui-ci, partagé, n'est pas modifié)."""
+        if rows.empty:
+            return self
+        added = rows if self._added is None else _stack([self._added._all[0], rows])
+        if len(added) > max(COMPACT_MIN_ROWS, COMPACT_RATIO * len(self._all[0])):
+            # tri stable : les lignes ajoutées restent après les autres à date égale
+            return DateVilleIndex(_stack([self._all[0], added]), *self._cols)
+        index = object.__new__(DateVilleIndex)
+        index._cols, index._all, index._villes = self._cols, self._all, self._villes
+        index._added = DateVilleIndex(added, *self._cols)
+        return index
+
+    @property
+    def villes(self) -> list:
+        villes = set(self._villes)
+        if self._added is not None:
+            villes.update(self._added._villes)
+        return sorted(villes)
+
+    def _range(self, date_deb, date_fin, ville):
+        if ville is None:
+            frame, dates = self._all
+        elif ville in self._villes:
+            frame, dates = self._villes[ville]
+        else:
+            return self._all[0].iloc[0:0], self._all[1][0:0]
+        lo = dates.searchsorted(np.datetime64(pd.Timestamp(date_deb), "ns"), side="left")
+        hi = dates.searchsorted(np.datetime64(pd.Timestamp(date_fin), "ns"), side="right")
+        return frame.iloc[lo:hi], dates[lo:hi]
+
+    def slice(self, date_deb, date_fin, ville=None) -> pd.DataFrame:
+        """Lignes avec date_deb <= Date <= date_fin, pour une ville ou toutes (None)."""
+        frame, dates = self._range(date_deb, date_fin, ville)
+        if self._added is None:
+            return frame
+        extra, extra_dates = self._added._range(date_deb, date_fin, ville)
+        if extra.empty:
+            return frame
+        # tranche presque triée : fusion des quelques lignes ajoutées
+        order = np.argsort(np.concatenate([dates, extra_dates]), kind="stable")
+        return _stack([frame, extra]).take(order)
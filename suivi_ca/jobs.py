@@ -0,0 +1,51 @@
+"""
+Exécution de tâches lourdes hors du thread du script Streamlit.
+
+Les tâches sont mémoïsées par clé : redemander un résultat déjà produit (ou
+en cours de production) pour les mêmes paramètres renvoie le même `Future`
+au lieu de relancer le calcul.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class JobRunner:
+    def __init__(self, max_workers: int = 2, max_entries: int = 32, processes: bool = False):
+        if processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="suivi-ca"
+            )
+        self._max_entries = max_entries
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Lance `fn(*args, **kwargs)` sauf si un résultat existe déjà pour `key`."""
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and not (future.done() and future.exception()):
+                self._jobs.move_to_end(key)
+                return future
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._jobs[key] = future
+            self._evict()
+            return future
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _evict(self):
+        # on oublie les plus anciens résultats terminés au-delà de la limite
+        for old_key in list(self._jobs):
+            if len(self._jobs) <= self._max_entries:
+                break
+            if self._jobs[old_key].done():
+                del self._jobs[old_key]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,234 @@
+"""
+Chargement du classeur Excel avec un cache colonne sur disque.
+
+Le parsing XLSX (openpyxl) est l'étape la plus lente du démarrage. Les
+feuilles `CA_Close` et `Évolution_Notes` sont donc converties une seule fois
+en fichiers Arrow IPC (au schéma compact de `schema.py`), relus ensuite en
+mémoire mappée. Le cache est indexé
+sur le chemin du classeur et invalidé dès que sa taille, sa date de
+modification ou son contenu (SHA-256) changent.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from .schema import CA_SCHEMA, NOTES_SCHEMA, apply_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow absent : on relit simplement l'Excel
+    pa = None
+    feather = None
+
+SHEET_CA = "CA_Close"
+SHEET_NOTES = "Évolution_Notes"
+
+# Dossier du cache, à côté de app.py (ignoré par git)
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "excel"
+# À incrémenter si le format des fichiers en cache change
+CACHE_FORMAT_VERSION = 2
+
+_CACHE_FILES = {SHEET_CA: "ca_close.arrow", SHEET_NOTES: "evolution_notes.arrow"}
+_MANIFEST = "manifest.json"
+
+
+def workbook_stamp(path):
+    """Renvoie (taille, mtime en ns) du classeur, ou None s'il n'existe pas."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_workbook(path):
+    """Lit directement les deux feuilles utiles du classeur (sans cache)."""
+    xls = pd.ExcelFile(path)
+    df_ca = pd.read_excel(xls, SHEET_CA)
+    df_notes = pd.read_excel(xls, SHEET_NOTES)
+
+    return apply_schema(df_ca, CA_SCHEMA), apply_schema(df_notes, NOTES_SCHEMA)
+
+
+def _entry_dir(path: Path, cache_dir) -> Path:
+    key = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / key
+
+
+def _read_manifest(entry: Path):
+    try:
+        with open(entry / _MANIFEST, encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != CACHE_FORMAT_VERSION:
+        return None
+    if not all((entry / name).exists() for name in _CACHE_FILES.values()):
+        return None
+    return manifest
+
+
+def _write_atomic(target: Path, write):
+    tmp = target.with_name(target.name + f".tmp{os.getpid()}")
+    write(tmp)
+    os.replace(tmp, target)
+
+
+def _write_manifest(entry: Path, manifest: dict):
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, ensure_ascii=False, indent=2)
+
+    _write_atomic(entry / _MANIFEST, write)
+
+
+def _read_cached(entry: Path):
+    frames = []
+    for sheet, schema in ((SHEET_CA, CA_SCHEMA), (SHEET_NOTES, NOTES_SCHEMA)):
+        table = feather.read_table(entry / _CACHE_FILES[sheet], memory_map=True)
+        frames.append(apply_schema(table.to_pandas(), schema))
+    return tuple(frames)
+
+
+def _write_cached(entry: Path, df_ca: pd.DataFrame, df_notes: pd.DataFrame):
+    entry.mkdir(parents=True, exist_ok=True)
+    # le manifeste est écrit en dernier : sans lui, le cache n'est jamais lu
+    (entry / _MANIFEST).unlink(missing_ok=True)
+    for sheet, df in ((SHEET_CA, df_ca), (SHEET_NOTES, df_notes)):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        _write_atomic(
+            entry / _CACHE_FILES[sheet],
+            # non compressé pour pouvoir être relu en mémoire mappée
+            lambda tmp, table=table: feather.write_feather(
+                table, tmp, compression="uncompressed"
+            ),
+        )
+
+
+def cache_is_fresh(path, cache_dir=CACHE_DIR) -> bool:
+    """Le cache Arrow du classeur est-il à jour (relu sans analyser le XLSX) ?"""
+    if feather is None:
+        return False
+    path = Path(path).resolve()
+    manifest = _read_manifest(_entry_dir(path, cache_dir))
+    return bool(manifest) and (manifest["size"], manifest["mtime_ns"]) == workbook_stamp(path)
+
+
+def clear_cache(path, cache_dir=CACHE_DIR):
+    """Supprime le cache Arrow du classeur (reconstruit au prochain chargement)."""
+    shutil.rmtree(_entry_dir(Path(path).resolve(), cache_dir), ignore_errors=True)
+
+
+def load_combined(key: str, stamps, cache_dir=CACHE_DIR):
+    """
+    Tables réunies de plusieurs classeurs (ex. les partitions par ville),
+    mises en cache sous `key` : (df_ca, df_notes, manifeste) si les
+    signatures `stamps` des classeurs n'ont pas changé, sinon None.
+    """
+    if feather is None:
+        return None
+    entry = _entry_dir(key, cache_dir)
+    manifest = _read_manifest(entry)
+    if not manifest or manifest.get("stamps") != [list(s) for s in stamps]:
+        return None
+    try:
+        return (*_read_cached(entry), manifest)
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def store_combined(key: str, stamps, df_ca, df_notes, extra: dict, cache_dir=CACHE_DIR):
+    """Écrit le cache de `load_combined` (`extra` : champs ajoutés au manifeste)."""
+    if feather is None:
+        return
+    entry = _entry_dir(key, cache_dir)
+    try:
+        _write_cached(entry, df_ca, df_notes)
+        _write_manifest(
+            entry,
+            {"format": CACHE_FORMAT_VERSION, "key": key, "stamps": [list(s) for s in stamps], **extra},
+        )
+    except OSError:
+        pass
+
+
+def workbook_digest(path, cache_dir=CACHE_DIR) -> str:
+    """SHA-256 du classeur, lu dans le manifeste du cache s'il est à jour."""
+    path = Path(path).resolve()
+    manifest = _read_manifest(_entry_dir(path, cache_dir))
+    if manifest and (manifest["size"], manifest["mtime_ns"]) == workbook_stamp(path):
+        return manifest["sha256"]
+    return file_sha256(path)
+
+
+def load_workbook(path, cache_dir=CACHE_DIR):
+    """
+    Charge (df_ca, df_notes) en passant par le cache Arrow quand c'est possible.
+
+    - taille + mtime identiques au manifeste : lecture directe du cache ;
+    - sinon on recalcule le SHA-256 : si le contenu n'a pas changé (copie,
+      checkout git...) le cache est réutilisé et le manifeste mis à jour ;
+    - sinon le classeur est relu et le cache reconstruit.
+
+    Lève FileNotFoundError si le classeur n'existe pas.
+    """
+    path = Path(path).resolve()
+    stamp = workbook_stamp(path)
+    if stamp is None:
+        raise FileNotFoundError(str(path))
+    if feather is None:
+        return read_workbook(path)
+
+    size, mtime_ns = stamp
+    entry = _entry_dir(path, cache_dir)
+    manifest = _read_manifest(entry)
+
+    if manifest and (manifest["size"], manifest["mtime_ns"]) == (size, mtime_ns):
+        try:
+            return _read_cached(entry)
+        except (OSError, pa.ArrowException):
+            manifest = None  # cache corrompu : on le reconstruit
+
+    sha256 = file_sha256(path)
+    new_manifest = {
+        "format": CACHE_FORMAT_VERSION,
+        "path": str(path),
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha256": sha256,
+    }
+
+    if manifest and manifest["sha256"] == sha256:
+        try:
+            frames = _read_cached(entry)
+        except (OSError, pa.ArrowException):
+            pass
+        else:
+            try:
+                _write_manifest(entry, new_manifest)
+            except OSError:
+                pass
+            return frames
+
+    df_ca, df_notes = read_workbook(path)
+    try:
+        _write_cached(entry, df_ca, df_notes)
+        _write_manifest(entry, new_manifest)
+    except OSError:
+        # disque en lecture seule : on fonctionne sans cache
+        pass
+    return df_ca, df_notes
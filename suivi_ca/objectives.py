@@ -0,0 +1,199 @@
+"""
+Objectifs persistés (SQLite) et versionnés dans le temps.
+
+Un objectif porte sur un type (`CA_close` ou `note_min`), une portée
+optionnelle (ville, période de close, marque ; vide = toutes) et une date
+de début de validité. Pour une ligne de données, l'objectif applicable est
+le plus spécifique dont la portée correspond, dans sa dernière version
+en vigueur à la date de la ligne.
+
+L'évaluation se fait en une seule jointure « as-of » par niveau de
+spécificité (`pd.merge_asof`), pour toutes les villes à la fois.
+"""
+
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .schema import FLOAT
+
+CA_CLOSE = "CA_close"
+NOTE_MIN = "note_min"
+
+# Valeurs par défaut insérées dans une base vide
+DEFAULT_OBJECTIFS = [
+    (CA_CLOSE, {"ville": "Amiens"}, 350.0),
+    (CA_CLOSE, {"ville": "Beauvais"}, 200.0),
+    (NOTE_MIN, {}, 4.5),
+]
+
+# Niveaux de spécificité, du plus précis au plus général
+_LEVELS = {
+    CA_CLOSE: [["ville", "periode_close"], ["ville"], ["periode_close"], []],
+    NOTE_MIN: [["ville", "marque"], ["ville"], ["marque"], []],
+}
+_SCOPE = ["ville", "periode_close", "marque"]
+_DATA_COLUMNS = {"ville": "Ville", "periode_close": "Période de close", "marque": "Marque"}
+# « depuis toujours »
+_ORIGIN = pd.Timestamp("1900-01-01")
+
+
+class ObjectivesStore:
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._targets = None
+        # incrémenté à chaque modification : sert de clé aux calculs mémoïsés
+        self.version = 0
+        with self._connect() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS objectifs ("
+                "id INTEGER PRIMARY KEY, type TEXT NOT NULL, ville TEXT, "
+                "periode_close TEXT, marque TEXT, valid_from TEXT, valeur REAL NOT NULL)"
+            )
+            empty = con.execute("SELECT COUNT(*) FROM objectifs").fetchone()[0] == 0
+        if empty:
+            for kind, scope, valeur in DEFAULT_OBJECTIFS:
+                self.set_target(kind, valeur, **scope)
+
+    @contextmanager
+    def _connect(self):
+        # transaction validée (ou annulée) puis connexion fermée
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as con, con:
+            yield con
+
+    def set_target(self, kind, valeur, ville=None, periode_close=None, marque=None, valid_from=None):
+        """
+        Ajoute (ou remplace, à portée et date identiques) un objectif. Sans
+        `valid_from`, il vaut pour tout l'historique : les versions datées de
+        la même portée sont supprimées (sinon elles resteraient en vigueur).
+        """
+        valid_from = pd.Timestamp(valid_from).strftime("%Y-%m-%d") if valid_from else None
+        scope = (kind, ville, periode_close, marque, valid_from)
+        with self._lock, self._connect() as con:
+            con.execute(
+                "DELETE FROM objectifs WHERE type = ? AND ville IS ? AND periode_close IS ? "
+                "AND marque IS ? AND (valid_from IS ? OR ? IS NULL)",
+                (*scope, valid_from),
+            )
+            con.execute(
+                "INSERT INTO objectifs (type, ville, periode_close, marque, valid_from, valeur) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*scope, float(valeur)),
+            )
+            self._targets = None
+            self.version += 1
+
+    def delete_target(self, target_id: int):
+        """
+        Supprime un objectif. Lève ValueError s'il ne resterait aucune note
+        minimale globale en vigueur (rapports et page notes en dépendent).
+        """
+        with self._lock, self._connect() as con:
+            row = con.execute(
+                "SELECT type, ville, periode_close, marque FROM objectifs WHERE id = ?",
+                (int(target_id),),
+            ).fetchone()
+            if row == (NOTE_MIN, None, None, None):
+                restantes = con.execute(
+                    "SELECT COUNT(*) FROM objectifs WHERE type = ? AND ville IS NULL "
+                    "AND periode_close IS NULL AND marque IS NULL AND id != ? "
+                    "AND (valid_from IS NULL OR valid_from <= ?)",
+                    (NOTE_MIN, int(target_id), pd.Timestamp.today().strftime("%Y-%m-%d")),
+                ).fetchone()[0]
+                if restantes == 0:
+                    raise ValueError(
+                        "Dernière note minimale globale en vigueur : modifiez-la au lieu de la supprimer."
+                    )
+            con.execute("DELETE FROM objectifs WHERE id = ?", (int(target_id),))
+            self._targets = None
+            self.version += 1
+
+    def targets(self) -> pd.DataFrame:
+        """Table complète des objectifs (historique compris)."""
+        with self._lock:
+            if self._targets is None:
+                with self._connect() as con:
+                    df = pd.read_sql_query(
+                        "SELECT * FROM objectifs ORDER BY type, ville, periode_close, marque, valid_from",
+                        con,
+                    )
+                df["valid_from"] = pd.to_datetime(df["valid_from"])
+                self._targets = df
+            return self._targets
+
+    def current(self, kind, ville=None, periode_close=None, marque=None, date=None):
+        """Valeur de l'objectif exact (même portée) en vigueur à `date` (aujourd'hui par défaut)."""
+        t = self.targets()
+        date = pd.Timestamp(date) if date is not None else pd.Timestamp.today()
+        mask = t["type"] == kind
+        for col, value in (("ville", ville), ("periode_close", periode_close), ("marque", marque)):
+            mask &= t[col].isna() if value is None else t[col] == value
+        t = t[mask & (t["valid_from"].fillna(_ORIGIN) <= date)]
+        if t.empty:
+            return None
+        return float(t.sort_values("valid_from", na_position="first")["valeur"].iloc[-1])
+
+    def as_dict(self, villes) -> dict:
+        """Objectifs en vigueur, au format {"CA_close": {ville: €}, "note_min": x}."""
+        return {
+            CA_CLOSE: {
+                v: obj
+                for v in villes
+                if (obj := self.current(CA_CLOSE, ville=v)) is not None
+            },
+            NOTE_MIN: self.current(NOTE_MIN),
+        }
+
+    def _evaluate(self, kind, df: pd.DataFrame) -> pd.Series:
+        result = np.full(len(df), np.nan)
+        dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+        valid = ~np.isnat(dates)
+        targets = self.targets()
+        targets = targets[targets["type"] == kind]
+        if targets.empty or not valid.any():
+            return pd.Series(result, index=df.index)
+
+        order = np.flatnonzero(valid)[np.argsort(dates[valid], kind="stable")]
+        left = pd.DataFrame({"Date": dates[order], "_pos": order})
+        for col, data_col in _DATA_COLUMNS.items():
+            if data_col in df:
+                left[col] = pd.Series(df[data_col].to_numpy(dtype=object)[order], dtype=object)
+        targets = targets.assign(
+            valid_from=targets["valid_from"].fillna(_ORIGIN).astype("datetime64[ns]")
+        )
+
+        for keys in _LEVELS[kind]:
+            # objectifs dont la portée est exactement `keys`
+            mask = np.ones(len(targets), dtype=bool)
+            for col in _SCOPE:
+                mask &= targets[col].notna() if col in keys else targets[col].isna()
+            level = targets[mask]
+            if level.empty or any(k not in left for k in keys):
+                continue
+            level = level[["valid_from", *keys, "valeur"]].astype({k: object for k in keys})
+            merged = pd.merge_asof(
+                left,
+                level.sort_values("valid_from"),
+                left_on="Date",
+                right_on="valid_from",
+                by=keys or None,
+                direction="backward",
+            )
+            pos = merged["_pos"].to_numpy()
+            valeur = merged["valeur"].to_numpy(dtype="float64")
+            fill = np.isnan(result[pos]) & ~np.isnan(valeur)
+            result[pos[fill]] = valeur[fill]
+        return pd.Series(result, index=df.index)
+
+    def evaluate_ca(self, df_ca: pd.DataFrame) -> pd.Series:
+        """Objectif CA close applicable à chaque ligne (NaN si aucun)."""
+        # float32 comme les montants du schéma : 93.1 (float32) >= 93.1
+        return self._evaluate(CA_CLOSE, df_ca).astype(FLOAT)
+
+    def evaluate_notes(self, df_notes: pd.DataFrame) -> pd.Series:
+        """Note minimale applicable à chaque ligne (NaN si aucune)."""
+        return self._evaluate(NOTE_MIN, df_notes).astype(FLOAT)
@@ -0,0 +1,168 @@
+"""
+Données partitionnées par ville : un classeur par ville dans un dossier.
+
+Avec beaucoup de villes, un classeur unique relu en entier ne tient plus :
+chaque ville a son propre classeur (`<dossier>/<Ville>.xlsx`, mêmes feuilles
+CA_Close / Évolution_Notes), avec son propre cache Arrow (`loader.py`).
+
+- une ville sélectionnée : seul son classeur est chargé ;
+- « Toutes » : les classeurs sont chargés en parallèle puis réunis en une
+  seule table. Les cubes journaliers sont construits ensuite, une seule fois
+  sur la table réunie (`snapshot.py`), comme pour un classeur unique : un
+  cube par ville coûtait surtout le surcoût fixe de ses groupby.
+
+Les classeurs à relire (cache absent ou périmé) sont analysés dans des
+processus, l'analyse XLSX étant du Python pur ; les autres, relus depuis le
+cache Arrow en mémoire mappée, dans des threads. Les tables réunies sont
+elles-mêmes mises en cache (`loader.load_combined`) : tant qu'aucun
+classeur ne change, un chargement relit un seul cache. Les processus sont lancés
+en mode « spawn » : le serveur a déjà des threads (sessions, rechargement),
+et un `fork` d'un processus multithreadé peut se bloquer.
+
+Un classeur existant se découpe en partitions avec :
+
+    python -m suivi_ca.partitions suivi_ca_etoile_v2.xlsx donnees
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+from .loader import (
+    CACHE_DIR,
+    cache_is_fresh,
+    load_combined,
+    load_workbook,
+    store_combined,
+    workbook_digest,
+    workbook_stamp,
+)
+from .schema import concat
+
+SUFFIX = ".xlsx"
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def partition_paths(directory) -> dict:
+    """{ville: classeur} des partitions du dossier (vide s'il n'existe pas)."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return {}
+    return {
+        path.stem: path
+        for path in sorted(directory.glob(f"*{SUFFIX}"))
+        # fichiers de verrouillage d'Excel (~$Amiens.xlsx)
+        if not path.name.startswith("~$")
+    }
+
+
+def partitions_stamp(paths):
+    """Signatures (taille, mtime) de chaque classeur, ou None s'il en manque un."""
+    stamps = tuple(workbook_stamp(path) for path in paths)
+    return None if None in stamps else stamps
+
+
+def source_stamp(source):
+    """Signature d'une source : un classeur (chemin) ou des partitions (tuple)."""
+    if isinstance(source, tuple):
+        return partitions_stamp(source)
+    return workbook_stamp(source)
+
+
+class Partition(NamedTuple):
+    ca: pd.DataFrame
+    notes: pd.DataFrame
+    digest: str
+
+
+def load_partition(path, cache_dir=CACHE_DIR) -> Partition:
+    """Charge un classeur de ville (exécuté dans un worker)."""
+    df_ca, df_notes = load_workbook(path, cache_dir)
+    return Partition(df_ca, df_notes, workbook_digest(path, cache_dir))
+
+
+class PartitionedData(NamedTuple):
+    ca: pd.DataFrame
+    notes: pd.DataFrame
+    # {ville: SHA-256 de son classeur} (journal des saisies, `shared.py`)
+    digests: dict
+
+
+def load_partitions(paths, max_workers: int = MAX_WORKERS, cache_dir=CACHE_DIR) -> PartitionedData:
+    """
+    Charge des partitions en parallèle et réunit leurs tables.
+    Lève FileNotFoundError si un classeur manque.
+    """
+    paths = [Path(p).resolve() for p in paths]
+    stamps = [workbook_stamp(path) for path in paths]
+    for path, stamp in zip(paths, stamps):
+        if stamp is None:
+            raise FileNotFoundError(str(path))
+    key = "partitions:" + "|".join(map(str, paths))
+    cached = load_combined(key, stamps, cache_dir)
+    if cached is not None:
+        df_ca, df_notes, manifest = cached
+        return PartitionedData(df_ca, df_notes, manifest["digests"])
+
+    load = partial(load_partition, cache_dir=cache_dir)
+    workers = min(max_workers, len(paths))
+    if workers <= 1:
+        parts = [load(path) for path in paths]
+    else:
+        # analyse XLSX à refaire : des processus ; cache Arrow à jour : des threads
+        if all(cache_is_fresh(path, cache_dir) for path in paths):
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        with executor:
+            parts = list(executor.map(load, paths))
+    data = PartitionedData(
+        concat([part.ca for part in parts]),
+        concat([part.notes for part in parts]),
+        {path.stem: part.digest for path, part in zip(paths, parts)},
+    )
+    store_combined(key, stamps, data.ca, data.notes, {"digests": data.digests}, cache_dir)
+    return data
+
+
+def split_workbook(path, directory, cache_dir=CACHE_DIR) -> dict:
+    """Écrit un classeur par ville à partir d'un classeur unique ; renvoie {ville: chemin}."""
+    from .export import build_excel_bytes
+
+    df_ca, df_notes = load_workbook(path, cache_dir)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    villes = sorted(set(df_ca["Ville"].dropna()) | set(df_notes["Ville"].dropna()))
+    written = {}
+    for ville in villes:
+        target = directory / f"{str(ville).replace(os.sep, '-')}{SUFFIX}"
+        target.write_bytes(
+            build_excel_bytes(
+                df_ca[df_ca["Ville"] == ville], df_notes[df_notes["Ville"] == ville]
+            )
+        )
+        written[ville] = target
+    return written
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Découpe un classeur en partitions par ville.")
+    parser.add_argument("workbook", help="classeur à découper (.xlsx)")
+    parser.add_argument("directory", help="dossier des partitions à écrire")
+    args = parser.parse_args(argv)
+
+    for ville, target in split_workbook(args.workbook, args.directory).items():
+        print(f"{ville} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
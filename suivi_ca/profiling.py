@@ -0,0 +1,155 @@
+"""
+Instrumentation légère d'une exécution du script (un « rerun » Streamlit).
+
+`RunProfiler` chronomètre des étapes nommées (chargement, filtres, KPI,
+graphiques, tableaux, export) et produit un résumé ou une trace au format
+Chrome / Perfetto (`chrome://tracing`). Désactivé, il ne coûte qu'un test.
+
+`CacheStats` compte les appels et les calculs effectifs des fonctions mises
+en cache : hits = appels - calculs.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+_NO_SPAN = nullcontext()
+
+
+class RunProfiler:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._spans = []
+        self._depth = 0
+        self._memory = {}
+
+    def span(self, name: str):
+        """Contexte chronométrant `name` (imbriquable)."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name: str):
+        depth = self._depth
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._depth = depth
+            self._spans.append(
+                {
+                    "name": name,
+                    "depth": depth,
+                    "start_ms": (start - self._t0) * 1000,
+                    "duration_ms": (end - start) * 1000,
+                    "thread": threading.get_ident(),
+                }
+            )
+
+    def record_memory(self, name: str, df: pd.DataFrame):
+        """Mémoire occupée par un DataFrame (chaînes comprises)."""
+        if self.enabled:
+            self._memory[name] = {
+                "rows": len(df),
+                "bytes": int(df.memory_usage(deep=True).sum()),
+            }
+
+    def spans(self) -> pd.DataFrame:
+        """Étapes dans l'ordre de démarrage, indentées selon leur imbrication."""
+        spans = sorted(self._spans, key=lambda s: s["start_ms"])
+        return pd.DataFrame(
+            {
+                "Étape": ["  " * s["depth"] + s["name"] for s in spans],
+                "Début (ms)": [round(s["start_ms"], 1) for s in spans],
+                "Durée (ms)": [round(s["duration_ms"], 1) for s in spans],
+            }
+        )
+
+    def memory(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "Table": list(self._memory),
+                "Lignes": [m["rows"] for m in self._memory.values()],
+                "Mémoire (Ko)": [
+                    round(m["bytes"] / 1024, 1) for m in self._memory.values()
+                ],
+            }
+        )
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def to_json(self, cache_stats: dict = None) -> str:
+        return json.dumps(
+            {
+                "started_at": self.started_at,
+                "total_ms": self.total_ms(),
+                "spans": sorted(self._spans, key=lambda s: s["start_ms"]),
+                "memory": self._memory,
+                "cache": cache_stats or {},
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
+
+    def to_trace(self) -> str:
+        """Trace « Trace Event Format » (événements complets, durées en µs)."""
+        events = [
+            {
+                "name": s["name"],
+                "ph": "X",
+                "ts": round(s["start_ms"] * 1000),
+                "dur": round(s["duration_ms"] * 1000),
+                "pid": 1,
+                "tid": s["thread"],
+            }
+            for s in self._spans
+        ]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+class CacheStats:
+    """Compteurs d'appels / de calculs par fonction, partagés entre sessions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._misses = {}
+
+    def call(self, name: str):
+        with self._lock:
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    def miss(self, name: str):
+        with self._lock:
+            self._misses[name] = self._misses.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": calls,
+                    "misses": self._misses.get(name, 0),
+                    "hits": calls - self._misses.get(name, 0),
+                }
+                for name, calls in self._calls.items()
+            }
+
+    def table(self) -> pd.DataFrame:
+        snap = self.snapshot()
+        return pd.DataFrame(
+            {
+                "Fonction": list(snap),
+                "Appels": [s["calls"] for s in snap.values()],
+                "Hits": [s["hits"] for s in snap.values()],
+                "Misses": [s["misses"] for s in snap.values()],
+            }
+        )
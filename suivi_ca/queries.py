@@ -0,0 +1,103 @@
+"""
+Requêtes du mode Analyse pour une sélection (période, ville).
+
+`CubeSelection` les calcule en pandas sur les index triés des tables et des
+cubes journaliers (tranches par date / ville). `sql.SqlSelection` expose les
+mêmes méthodes, avec les mêmes résultats (colonnes, types, ordre et index),
+sur une base DuckDB : l'application choisit l'une ou l'autre au démarrage.
+"""
+
+from functools import cached_property
+
+import pandas as pd
+
+from . import cube
+from .cube import count_col
+from .resample import resample
+
+PLATFORMS = ["Note Uber Eats", "Note Deliveroo"]
+
+
+class CubeSelection:
+    def __init__(self, index_ca, index_notes, cube_index_ca, cube_index_notes, date_deb, date_fin, ville=None):
+        # index Date/Ville des tables (DateVilleIndex) et de leurs cubes journaliers
+        self._index_ca = index_ca
+        self._index_notes = index_notes
+        self._cube_index_ca = cube_index_ca
+        self._cube_index_notes = cube_index_notes
+        self._filtre = (date_deb, date_fin, ville)
+
+    # -------------------- LIGNES --------------------
+
+    def ca_rows(self) -> pd.DataFrame:
+        return self._index_ca.slice(*self._filtre)
+
+    def notes_rows(self) -> pd.DataFrame:
+        return self._index_notes.slice(*self._filtre)
+
+    # -------------------- CA --------------------
+
+    @cached_property
+    def _cube_ca(self) -> pd.DataFrame:
+        return self._cube_index_ca.slice(*self._filtre)
+
+    def ca_kpis(self) -> dict:
+        return cube.ca_kpis(self._cube_ca)
+
+    def top_periods(self) -> pd.DataFrame:
+        return cube.top_periods(self._cube_ca)
+
+    def pivot_ca(self) -> pd.DataFrame:
+        return cube.pivot_ca(self._cube_ca)
+
+    def ca_heatmap(self, freq: str) -> pd.DataFrame:
+        """CA, commandes et CA horaire moyen par intervalle × Ville × Période de close."""
+        rows = self._cube_ca
+        return resample(
+            rows[rows["Ville"].notna() & rows["Période de close"].notna()],
+            freq,
+            ["Ville", "Période de close"],
+            [
+                "Chiffre d’affaires (€)",
+                "Nombre commandes",
+                "CA horaire (€ / h)",
+                count_col("CA horaire (€ / h)"),
+            ],
+            ratios={"CA horaire (€ / h)": ("CA horaire (€ / h)", count_col("CA horaire (€ / h)"))},
+        )
+
+    # -------------------- NOTES --------------------
+
+    @cached_property
+    def _cube_notes(self) -> pd.DataFrame:
+        return self._cube_index_notes.slice(*self._filtre)
+
+    def _cube_marque(self, marque=None) -> pd.DataFrame:
+        rows = self._cube_notes
+        return rows if marque is None else rows[rows["Marque"] == marque]
+
+    def notes_kpis(self, marque=None) -> dict:
+        return cube.notes_kpis(self._cube_marque(marque))
+
+    def perf_marques(self) -> pd.DataFrame:
+        return cube.perf_marques(self._cube_notes)
+
+    def notes_series(self, marque=None) -> int:
+        """Nombre de séries Ville × Marque (une courbe par plateforme chacune)."""
+        return len(self._cube_marque(marque)[["Ville", "Marque"]].drop_duplicates())
+
+    def notes_long(self, freq: str, marque=None) -> pd.DataFrame:
+        """Notes moyennes par intervalle × Ville × Marque, une ligne par plateforme."""
+        bins = resample(
+            self._cube_marque(marque),
+            freq,
+            ["Ville", "Marque"],
+            [col for note in PLATFORMS for col in (note, count_col(note))],
+            ratios={note: (note, count_col(note)) for note in PLATFORMS},
+        )
+        return bins.melt(
+            id_vars=["Date", "Ville", "Marque"],
+            value_vars=PLATFORMS,
+            var_name="Plateforme",
+            value_name="Note",
+        )
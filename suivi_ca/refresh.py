@@ -0,0 +1,102 @@
+"""
+Rechargement du classeur en arrière-plan, sans bloquer les sessions.
+
+Un thread surveille la signature (taille, mtime) du classeur. Quand elle
+change et reste stable le temps d'un intervalle (fichier en cours de copie),
+il construit un nouveau snapshot des données (lecture, schéma, colonnes
+dérivées, index) puis le publie d'une seule affectation : les sessions
+lisent `current` au début de chaque rerun et ne voient jamais un snapshot à
+moitié construit, ni n'attendent la lecture du fichier.
+
+En cas d'échec (classeur supprimé, illisible), l'ancien snapshot reste
+servi et l'erreur est exposée dans `error`.
+"""
+
+import threading
+import time
+
+from .loader import workbook_stamp
+
+POLL_SECONDS = 5.0
+
+
+class DataRefresher:
+    """Snapshot courant des données + thread de surveillance du classeur."""
+
+    def __init__(self, path, build, poll_seconds: float = POLL_SECONDS, stamp=workbook_stamp):
+        # `build(path, stamp)` construit un snapshot ; le premier est chargé ici.
+        # `stamp(path)` : signature de la source (None si absente)
+        self.path = path
+        self._build = build
+        self._stamp = stamp
+        self.poll_seconds = poll_seconds
+        self.error = None
+        self.last_check = None
+        self._pending = None
+        self._refresh_lock = threading.Lock()
+
+        stamp = self._stamp(path)
+        self._snapshot = (1, build(path, stamp), stamp, time.time())
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._watch, name="suivi-ca-refresh", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def current(self):
+        """Snapshot en service (à lire une fois par rerun)."""
+        return self._snapshot[1]
+
+    def snapshot(self):
+        """(numéro, snapshot) lus ensemble, cohérents même pendant une bascule."""
+        generation, data, _, _ = self._snapshot
+        return generation, data
+
+    @property
+    def generation(self) -> int:
+        """Numéro du snapshot, incrémenté à chaque rechargement du classeur."""
+        return self._snapshot[0]
+
+    @property
+    def loaded_at(self) -> float:
+        return self._snapshot[3]
+
+    def check(self, force: bool = False) -> bool:
+        """
+        Recharge le classeur s'il a changé (et n'a plus bougé depuis la
+        vérification précédente, sauf `force`). Renvoie True si un nouveau
+        snapshot a été publié.
+        """
+        with self._refresh_lock:
+            self.last_check = time.time()
+            stamp = self._stamp(self.path)
+            generation, _, loaded_stamp, _ = self._snapshot
+            if stamp is None:
+                self.error = FileNotFoundError(str(self.path))
+                return False
+            if stamp == loaded_stamp:
+                self._pending = None
+                return False
+            if not force and stamp != self._pending:
+                # première vue de cette signature : on attend qu'elle se stabilise
+                self._pending = stamp
+                return False
+            try:
+                snapshot = self._build(self.path, stamp)
+            except Exception as err:  # fichier incomplet ou invalide : on réessaiera
+                self.error = err
+                return False
+            self._pending = None
+            self.error = None
+            # une seule affectation : les lecteurs voient l'ancien ou le nouveau snapshot
+            self._snapshot = (generation + 1, snapshot, stamp, time.time())
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
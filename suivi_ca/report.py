@@ -0,0 +1,287 @@
+"""
+Rapport PDF de synthèse : objectifs, KPI, puis détail par ville, par période
+de close et par marque (tableaux et graphiques en barres).
+
+La mise en page passe par `_PdfLayout`, qui ouvre une nouvelle page dès que
+le contenu ne tient plus (en-têtes de tableau répétés) : un rapport mensuel
+complet peut donc s'étendre sur plusieurs pages.
+"""
+
+from io import BytesIO
+
+import pandas as pd
+
+from .analysis import ca_compliance, notes_compliance, report_sheets
+from .cube import build_ca_cube, build_notes_cube, ca_kpis, notes_kpis, perf_marques, top_periods
+from .export import build_sheets_bytes
+
+REPORT_TITLE = "Synthèse Closes Amiens & Beauvais"
+
+MARGIN = 40
+TOP = 50
+BOTTOM = 50
+ROW_HEIGHT = 14
+
+
+class _PdfLayout:
+    """Canvas ReportLab avec curseur vertical et saut de page automatique."""
+
+    def __init__(self, buffer, title: str):
+        # ReportLab n'est chargé qu'à la première génération d'un PDF
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        self.c = canvas.Canvas(buffer, pagesize=A4)
+        self.width, self.height = A4
+        self.title = title
+        self.page = 1
+        self.y = self.height - TOP
+
+    def ensure(self, needed: float):
+        if self.y - needed < BOTTOM:
+            self.new_page()
+
+    def new_page(self):
+        self._footer()
+        self.c.showPage()
+        self.page += 1
+        self.y = self.height - TOP
+
+    def _footer(self):
+        self.c.setFont("Helvetica", 8)
+        self.c.drawString(MARGIN, 25, self.title)
+        self.c.drawRightString(self.width - MARGIN, 25, f"Page {self.page}")
+
+    def space(self, height: float):
+        self.y -= height
+
+    def heading(self, text: str):
+        # un titre n'est jamais laissé seul en bas de page
+        self.ensure(18 + 2 * ROW_HEIGHT)
+        self.c.setFont("Helvetica-Bold", 12)
+        self.c.drawString(MARGIN, self.y, text)
+        self.y -= 18
+
+    def line(self, text: str, indent: float = 10):
+        self.ensure(15)
+        self.c.setFont("Helvetica", 10)
+        self.c.drawString(MARGIN + indent, self.y, text)
+        self.y -= 15
+
+    def table(self, columns, rows, widths):
+        def header():
+            self.c.setFont("Helvetica-Bold", 9)
+            x = MARGIN
+            for label, w in zip(columns, widths):
+                self.c.drawString(x + 2, self.y, str(label))
+                x += w
+            self.c.line(MARGIN, self.y - 4, MARGIN + sum(widths), self.y - 4)
+            self.y -= ROW_HEIGHT
+
+        self.ensure(2 * ROW_HEIGHT)
+        header()
+        for row in rows:
+            if self.y - ROW_HEIGHT < BOTTOM:
+                self.new_page()
+                header()
+            self.c.setFont("Helvetica", 9)
+            x = MARGIN
+            for value, w in zip(row, widths):
+                self.c.drawString(x + 2, self.y, str(value))
+                x += w
+            self.y -= ROW_HEIGHT
+        self.y -= 10
+
+    def bar_chart(self, title: str, labels, values, fmt: str = "{:.0f}"):
+        """Barres horizontales, une ligne par valeur."""
+        label_w, value_w = 170, 50
+        bar_max = self.width - 2 * MARGIN - label_w - value_w
+        vmax = max((v for v in values if pd.notna(v)), default=0) or 1
+
+        self.ensure(18 + 2 * ROW_HEIGHT)
+        self.c.setFont("Helvetica-Oblique", 9)
+        self.c.drawString(MARGIN, self.y, title)
+        self.y -= ROW_HEIGHT
+        for label, value in zip(labels, values):
+            self.ensure(ROW_HEIGHT)
+            self.c.setFont("Helvetica", 8)
+            self.c.drawString(MARGIN, self.y, str(label)[:40])
+            if pd.notna(value):
+                self.c.setFillColorRGB(0.2, 0.45, 0.75)
+                self.c.rect(
+                    MARGIN + label_w, self.y - 2, bar_max * max(value, 0) / vmax, 9,
+                    stroke=0, fill=1,
+                )
+                self.c.setFillColorRGB(0, 0, 0)
+            self.c.drawRightString(
+                self.width - MARGIN, self.y, fmt.format(value) if pd.notna(value) else "NA"
+            )
+            self.y -= ROW_HEIGHT
+        self.y -= 10
+
+    def finish(self):
+        self._footer()
+        self.c.save()
+
+
+def _fmt(value, pattern: str = "{:.2f}") -> str:
+    return pattern.format(value) if pd.notna(value) else "NA"
+
+
+def _conformite(conformite) -> str:
+    if conformite.nb_total == 0:
+        return "-"
+    return f"{conformite.pct:.0f} % ({conformite.nb_ok} / {conformite.nb_total})"
+
+
+def _ca_par_ville(df_ca_f: pd.DataFrame, objectif_ca: pd.Series) -> list:
+    rows = []
+    for ville, grp in df_ca_f.groupby("Ville", sort=True, observed=True):
+        kpis = ca_kpis(build_ca_cube(grp))
+        rows.append(
+            [
+                ville,
+                kpis["lignes"],
+                f"{kpis['total_ca']:.0f} €",
+                int(kpis["total_cmd"]),
+                _fmt(kpis["panier_moy"]),
+                _fmt(kpis["ca_horaire_moy"]),
+                _conformite(ca_compliance(grp, objectif_ca.loc[grp.index])),
+            ]
+        )
+    return rows
+
+
+def build_pdf_report(
+    df_ca_f, df_notes_f, ville_sel, date_deb, date_fin, objectifs, objectif_ca, objectif_notes
+) -> bytes:
+    """
+    Génère le PDF de synthèse (KPI & objectifs, détail par ville, période et
+    marque). `objectifs` (`ObjectivesStore.as_dict`) n'est que rappelé en
+    tête ; le respect des objectifs est calculé avec l'objectif de chaque
+    ligne (`objectif_*`, `ObjectivesStore.evaluate_*`), comme le rapport
+    XLSX et le dashboard.
+    """
+    buffer = BytesIO()
+    pdf = _PdfLayout(buffer, REPORT_TITLE)
+    c = pdf.c
+    cube_ca = build_ca_cube(df_ca_f)
+    cube_notes = build_notes_cube(df_notes_f)
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(MARGIN, pdf.y, REPORT_TITLE)
+    pdf.space(25)
+    c.setFont("Helvetica", 10)
+    c.drawString(
+        MARGIN,
+        pdf.y,
+        f"Période : {date_deb.strftime('%d/%m/%Y')} - {date_fin.strftime('%d/%m/%Y')}   |   Filtre ville : {ville_sel}",
+    )
+    pdf.space(30)
+
+    # Objectifs
+    pdf.heading("Objectifs (en vigueur)")
+    pdf.line(
+        "  |  ".join(
+            f"CA close {ville} ≥ {valeur} €"
+            for ville, valeur in objectifs["CA_close"].items()
+        )
+    )
+    note_min = objectifs["note_min"]
+    pdf.line(f"Notes (Uber & Deliveroo) ≥ {note_min if note_min is not None else '-'}")
+    pdf.line("Respect calculé avec l'objectif applicable à chaque ligne (période, marque, date).")
+    pdf.space(15)
+
+    # KPI CA
+    if not df_ca_f.empty:
+        kpis = ca_kpis(cube_ca)
+        pdf.heading("KPI CA & commandes")
+        pdf.line(f"CA total : {kpis['total_ca']:.0f} €")
+        pdf.line(f"Nombre de commandes : {int(kpis['total_cmd'])}")
+        pdf.line(f"Panier moyen : {_fmt(kpis['panier_moy'])} €" if pd.notna(kpis["panier_moy"]) else "Panier moyen : NA")
+        pdf.line(f"Closes ≥ objectif : {_conformite(ca_compliance(df_ca_f, objectif_ca))}")
+        pdf.space(10)
+
+    # KPI notes
+    if not df_notes_f.empty:
+        kpis = notes_kpis(cube_notes)
+        pdf.heading("KPI Notes")
+        pdf.line(f"Note moyenne Uber Eats : {_fmt(kpis['moy_uber'])}")
+        pdf.line(f"Note moyenne Deliveroo : {_fmt(kpis['moy_deliv'])}")
+        pdf.line(f"Lignes de notes ≥ objectif : {_conformite(notes_compliance(df_notes_f, objectif_notes))}")
+        pdf.space(10)
+
+    # Détail par ville
+    if not df_ca_f.empty:
+        pdf.heading("Détail par ville")
+        pdf.table(
+            ["Ville", "Closes", "CA total", "Commandes", "Panier", "CA/h moyen", "Closes ≥ objectif"],
+            _ca_par_ville(df_ca_f, objectif_ca),
+            [80, 45, 70, 65, 55, 70, 130],
+        )
+
+        daily = (
+            df_ca_f.groupby(df_ca_f["Date"].dt.normalize())["Chiffre d’affaires (€)"]
+            .sum()
+            .sort_index()
+        )
+        pdf.bar_chart(
+            "CA total par jour (€)",
+            [d.strftime("%a %d/%m/%Y") for d in daily.index],
+            daily.tolist(),
+        )
+
+    # Détail par période de close
+    if not df_ca_f.empty:
+        periodes = top_periods(cube_ca)
+        pdf.heading("Détail par période de close (moyennes par close)")
+        pdf.table(
+            ["Ville", "Période de close", "CA horaire (€/h)", "CA (€)", "Commandes"],
+            [
+                [r[0], r[1], _fmt(r[2]), _fmt(r[3]), _fmt(r[4], "{:.1f}")]
+                for r in periodes.itertuples(index=False)
+            ],
+            [90, 120, 100, 90, 90],
+        )
+        pdf.bar_chart(
+            "CA horaire moyen par période (€ / h)",
+            [f"{r[0]} – {r[1]}" for r in periodes.itertuples(index=False)],
+            periodes["CA horaire (€ / h)"].tolist(),
+            fmt="{:.1f}",
+        )
+
+    # Détail par marque
+    if not df_notes_f.empty:
+        marques = perf_marques(cube_notes)
+        # respect de l'objectif ligne à ligne, par Ville × Marque
+        conformite = {
+            cle: _conformite(notes_compliance(grp, objectif_notes.loc[grp.index]))
+            for cle, grp in df_notes_f.groupby(["Ville", "Marque"], observed=True)
+        }
+        pdf.heading("Détail par marque (notes moyennes)")
+        pdf.table(
+            ["Ville", "Marque", "Uber Eats", "Deliveroo", "Lignes ≥ objectif"],
+            [
+                [r[0], r[1], _fmt(r[2]), _fmt(r[3]), conformite.get((r[0], r[1]), "-")]
+                for r in marques[["Ville", "Marque", "Note Uber Eats", "Note Deliveroo"]].itertuples(index=False)
+            ],
+            [90, 110, 80, 80, 120],
+        )
+        labels, values = [], []
+        for row in marques.to_dict("records"):
+            for plateforme in ("Uber Eats", "Deliveroo"):
+                labels.append(f"{row['Ville']} – {row['Marque']} ({plateforme})")
+                values.append(row[f"Note {plateforme}"])
+        pdf.bar_chart("Notes moyennes par marque et plateforme", labels, values, fmt="{:.2f}")
+
+    pdf.finish()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def build_xlsx_report(df_ca_f, df_notes_f, objectif_ca, objectif_notes) -> bytes:
+    """
+    Rapport XLSX d'une période (KPI, périodes de close, marques, détail avec
+    statut objectif) ; `objectif_*` = objectif de chaque ligne.
+    """
+    return build_sheets_bytes(report_sheets(df_ca_f, df_notes_f, objectif_ca, objectif_notes))
@@ -0,0 +1,105 @@
+"""
+Réduction des séries envoyées aux graphiques Altair.
+
+Les graphiques embarquent leurs données dans la page (Vega-Lite) : sur une
+année de closes, le poids devient vite de plusieurs Mo. La résolution
+(jour, semaine ou mois) est choisie d'après la période sélectionnée pour
+rester sous un plafond de points par graphique ; au-delà, chaque série est
+encore réduite par LTTB (Largest-Triangle-Three-Buckets). Les graphiques
+sans axe continu (heatmap) ne gardent que les séries les plus lourdes.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Plafond de points par graphique (toutes séries confondues)
+MAX_POINTS_PER_CHART = 1500
+
+RESOLUTIONS = {"D": "jour", "W": "semaine", "M": "mois"}
+
+
+def choose_resolution(date_deb, date_fin, n_series: int = 1, max_points: int = MAX_POINTS_PER_CHART) -> str:
+    """Résolution la plus fine qui tient sous `max_points` pour `n_series` séries."""
+    days = (pd.Timestamp(date_fin) - pd.Timestamp(date_deb)).days + 1
+    n_series = max(n_series, 1)
+    for freq, n_bins in (("D", days), ("W", math.ceil(days / 7) + 1)):
+        if n_bins * n_series <= max_points:
+            return freq
+    return "M"
+
+
+def bin_dates(dates: pd.Series, freq: str) -> pd.Series:
+    """Ramène chaque date au début de son intervalle (jour, lundi, 1er du mois)."""
+    if freq == "D":
+        return dates.dt.normalize()
+    period = "W-SUN" if freq == "W" else "M"
+    return dates.dt.to_period(period).dt.start_time
+
+
+def resample(frame: pd.DataFrame, freq: str, keys, sums, ratios=None) -> pd.DataFrame:
+    """
+    Somme `sums` par intervalle × `keys`, puis calcule chaque ratio
+    {colonne: (numérateur, dénominateur)} sur les sommes (moyennes pondérées).
+    """
+    binned = frame.assign(Date=bin_dates(frame["Date"], freq))
+    out = binned.groupby(["Date"] + list(keys), as_index=False, sort=True, observed=True)[
+        list(sums)
+    ].sum()
+    for col, (num, den) in (ratios or {}).items():
+        out[col] = out[num] / out[den].where(out[den] > 0)
+    return out
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices des `n_out` points retenus par l'algorithme LTTB (x croissant)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+
+    every = (n - 2) / (n_out - 2)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        # point moyen du seau suivant (le dernier point pour le dernier seau)
+        nxt_hi = min(int((i + 2) * every) + 1, n)
+        cx, cy = x[hi:nxt_hi].mean(), y[hi:nxt_hi].mean()
+        area = np.abs(
+            (x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a])
+        )
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def cap_points(frame: pd.DataFrame, keys, y_col: str, max_points: int = MAX_POINTS_PER_CHART) -> pd.DataFrame:
+    """Réduit chaque série (par `keys`) avec LTTB pour tenir sous `max_points`."""
+    if len(frame) <= max_points:
+        return frame
+    groups = frame.groupby(list(keys), sort=False, observed=True)
+    budget = max(3, max_points // max(groups.ngroups, 1))
+    keep = []
+    for _, grp in groups:
+        x = grp["Date"].to_numpy(dtype="datetime64[ns]").astype("int64")
+        keep.append(grp.index.to_numpy()[lttb(x, grp[y_col].to_numpy(), budget)])
+    return frame.loc[np.sort(np.concatenate(keep))]
+
+
+def top_series(frame: pd.DataFrame, keys, weight_col: str, max_points: int = MAX_POINTS_PER_CHART) -> pd.DataFrame:
+    """Séries (par `keys`) de plus fort total `weight_col`, tant qu'elles tiennent sous `max_points` lignes."""
+    if len(frame) <= max_points:
+        return frame
+    groups = frame.groupby(list(keys), sort=False, observed=True)
+    # numéros de série : même ordre que les sommes par série
+    codes = groups.ngroup().to_numpy()
+    order = np.argsort(-groups[weight_col].sum().to_numpy(), kind="stable")
+    fits = np.bincount(codes[codes >= 0], minlength=len(order))[order].cumsum() <= max_points
+    # au moins une série, même si elle dépasse seule le plafond
+    kept = order[: max(int(fits.sum()), 1)]
+    return frame[np.isin(codes, kept)]
@@ -0,0 +1,202 @@
+"""
+Schéma compact des tables CA_Close et Évolution_Notes.
+
+Chaînes répétitives (Ville, Marque, Période de close) en catégories, montants
+et notes en float32, nombres de commandes en uint16 (UInt16, entier nullable,
+si le classeur a des cellules vides) : la mémoire d'une table
+(et le coût de chaque copie) est divisée par plusieurs, et les groupby sur
+ces clés travaillent sur des codes entiers.
+
+Le schéma est appliqué au chargement et à chaque ajout ; les lignes saisies
+sont validées avant d'être journalisées. Les valeurs float32 sont
+ré-élargies (`widen`) avant export ou agrégation, arrondies au nombre de
+décimales de la saisie pour retrouver exactement les valeurs d'origine.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+DATE = "datetime"
+CATEGORY = "category"
+COUNT = "uint16"
+# même colonne avec des valeurs manquantes
+NULLABLE_COUNT = "UInt16"
+FLOAT = "float32"
+
+
+class Column(NamedTuple):
+    dtype: str
+    # valeur obligatoire pour chaque ligne saisie
+    required: bool = True
+    bounds: tuple = (None, None)
+    # décimales significatives, pour ré-élargir exactement les float32
+    decimals: Optional[int] = None
+
+
+CA_SCHEMA = {
+    "Date": Column(DATE),
+    "Ville": Column(CATEGORY),
+    "Nombre commandes": Column(COUNT, bounds=(0, np.iinfo(np.uint16).max)),
+    "Chiffre d’affaires (€)": Column(FLOAT, bounds=(0, None), decimals=2),
+    "Période de close": Column(CATEGORY),
+}
+NOTES_SCHEMA = {
+    "Date": Column(DATE),
+    "Ville": Column(CATEGORY),
+    "Marque": Column(CATEGORY),
+    # une note peut manquer (marque absente d'une plateforme)
+    "Note Uber Eats": Column(FLOAT, required=False, bounds=(0, 5), decimals=2),
+    "Note Deliveroo": Column(FLOAT, required=False, bounds=(0, 5), decimals=2),
+}
+
+
+class SchemaError(ValueError):
+    """Lignes saisies non conformes au schéma (message lisible par l'utilisateur)."""
+
+
+def _is_category(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def _cast(name: str, series: pd.Series, dtype: str) -> pd.Series:
+    if dtype == DATE:
+        return pd.to_datetime(series, errors="coerce")
+    if dtype == CATEGORY:
+        return series if _is_category(series) else series.astype("category")
+    values = pd.to_numeric(series, errors="coerce")
+    if dtype == COUNT:
+        lo, hi = np.iinfo(np.uint16).min, np.iinfo(np.uint16).max
+        arr = values.to_numpy(dtype="float64", na_value=np.nan)
+        present = ~np.isnan(arr)
+        bad = present & ~((arr == np.round(arr)) & (arr >= lo) & (arr <= hi))
+        if bad.any():
+            # pas de repli silencieux vers un type flottant : lignes signalées
+            lignes = ", ".join(str(i) for i in series.index[bad][:10])
+            raise SchemaError(
+                f"« {name} » : nombre entier entre {lo} et {hi} attendu (lignes {lignes})."
+            )
+        return values.astype(COUNT if present.all() else NULLABLE_COUNT)
+    return values.astype(dtype)
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Convertit les colonnes présentes dans `schema` (sans copie si déjà conformes)."""
+    casts = {}
+    for name, column in schema.items():
+        if name not in df:
+            continue
+        series = df[name]
+        if column.dtype == DATE and pd.api.types.is_datetime64_any_dtype(series):
+            continue
+        if column.dtype != DATE and str(series.dtype) == column.dtype:
+            continue
+        if column.dtype == COUNT and str(series.dtype) == NULLABLE_COUNT:
+            continue
+        casts[name] = _cast(name, series, column.dtype)
+    return df.assign(**casts) if casts else df
+
+
+def _check(rows: pd.DataFrame, schema: dict):
+    """Valeurs converties, problèmes rencontrés et masque des lignes fautives."""
+    problems = []
+    bad = np.zeros(len(rows), dtype=bool)
+    out = {}
+
+    def flag(mask, message):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            problems.append(message)
+            bad[:] |= mask
+
+    for name, column in schema.items():
+        if name not in rows:
+            if column.required:
+                problems.append(f"colonne « {name} » manquante")
+                bad[:] = True
+            continue
+        series = rows[name]
+        if column.dtype == DATE:
+            values = pd.to_datetime(series, errors="coerce")
+        elif column.dtype == CATEGORY:
+            values = series.where(series.astype(str).str.strip() != "")
+        else:
+            values = pd.to_numeric(series, errors="coerce")
+            flag(values.isna() & series.notna(), f"« {name} » : valeur non numérique")
+            lo, hi = column.bounds
+            if lo is not None:
+                flag(values < lo, f"« {name} » : valeur inférieure à {lo}")
+            if hi is not None:
+                flag(values > hi, f"« {name} » : valeur supérieure à {hi}")
+            if column.dtype == COUNT:
+                flag(values.notna() & (values % 1 != 0), f"« {name} » : nombre entier attendu")
+        if column.required:
+            flag(values.isna(), f"« {name} » : valeur manquante")
+        out[name] = values
+    return out, problems, bad
+
+
+def validate(rows: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Vérifie des lignes saisies et les renvoie converties au schéma.
+
+    Lève SchemaError (avec la liste des problèmes) si une colonne obligatoire
+    manque ou est vide, si une valeur n'est pas numérique, est hors bornes
+    ou n'est pas un entier pour une colonne de comptage.
+    """
+    out, problems, _ = _check(rows, schema)
+    if problems:
+        raise SchemaError("Lignes refusées : " + " ; ".join(problems) + ".")
+    return apply_schema(rows.assign(**out), schema)
+
+
+def split_valid(rows: pd.DataFrame, schema: dict):
+    """Comme `validate`, sans lever d'erreur : (lignes conformes, nombre de lignes écartées)."""
+    out, _, bad = _check(rows, schema)
+    if bad.all():
+        return rows.iloc[0:0], len(rows)
+    valid = rows.assign(**out)[~bad]
+    return apply_schema(valid, schema), int(bad.sum())
+
+
+def concat(frames: list) -> pd.DataFrame:
+    """
+    `pd.concat` qui conserve les colonnes catégorielles : les catégories sont
+    réunies (triées) au lieu de retomber en chaînes quand elles diffèrent.
+    """
+    first = frames[0]
+    for name in first.columns:
+        if not _is_category(first[name]):
+            continue
+        seen = set()
+        for frame in frames:
+            col = frame[name]
+            seen.update(col.cat.categories if _is_category(col) else col.dropna().unique())
+        dtype = pd.CategoricalDtype(sorted(seen))
+        frames = [
+            f if f[name].dtype == dtype else f.assign(**{name: f[name].astype(dtype)})
+            for f in frames
+        ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def widen(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Types « larges » (chaînes, int64 / Int64, float64) : pour export, journal et agrégats."""
+    casts = {}
+    for name in df.columns:
+        series = df[name]
+        column = schema.get(name)
+        if _is_category(series):
+            casts[name] = series.astype(series.cat.categories.dtype)
+        elif series.dtype == np.float32:
+            wide = series.astype("float64")
+            if column is not None and column.decimals is not None:
+                wide = wide.round(column.decimals)
+            casts[name] = wide
+        elif series.dtype == np.uint16:
+            casts[name] = series.astype("int64")
+        elif str(series.dtype) == NULLABLE_COUNT:
+            # cellules vides gardées (<NA>), exportées vides
+            casts[name] = series.astype("Int64")
+    return df.assign(**casts) if casts else df
@@ -0,0 +1,213 @@
+"""
+Données partagées entre toutes les sessions du serveur.
+
+Une seule copie en mémoire du classeur et des lignes saisies sert toutes
+les sessions (au lieu d'une copie par navigateur). Les saisies sont
+appliquées sous verrou, incrémentent un compteur de version et sont
+journalisées dans une base SQLite locale : elles survivent à un
+redémarrage et sont visibles de tous les utilisateurs.
+
+Chaque ligne du journal note le contenu (SHA-256) du classeur sur lequel
+elle a été saisie. Sur ce même classeur, elle est toujours rejouée ; sur un
+autre (classeur remplacé par l'export mis à jour, ou modifié à la main),
+elle ne l'est que si sa clé — (Date, Ville, Période de close) ou (Date,
+Ville, Marque) — ne figure pas déjà dans les données : une saisie déjà
+reprise dans le classeur n'est pas comptée deux fois, les autres ne sont
+pas perdues. Avec des données partitionnées par ville (`partitions.py`),
+chaque ligne est rattachée au classeur de sa ville. Plusieurs processus
+peuvent partager le journal : `sync()` relit les lignes journalisées par
+les autres, seulement si la base a changé depuis (`PRAGMA data_version`,
+sans requête sur les tables à chaque rerun).
+
+Chaque store garde une seule connexion SQLite, utilisée sous son verrou et
+fermée par `close()`.
+
+Les lignes saisies sont validées contre le schéma (`schema.py`) avant
+d'être journalisées : une saisie invalide lève SchemaError sans rien écrire.
+"""
+
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .derived import add_ca_horaire
+from .dedup import KEYS, Deduplicator
+from .loader import SHEET_CA, SHEET_NOTES
+from .schema import CA_SCHEMA, NOTES_SCHEMA, SchemaError, apply_schema, validate, widen
+from .store import AppendStore
+
+# colonne DataFrame -> colonne SQLite
+CA_JOURNAL = {
+    "Date": "date",
+    "Ville": "ville",
+    "Nombre commandes": "nombre_commandes",
+    "Chiffre d’affaires (€)": "chiffre_affaires",
+    "Période de close": "periode_close",
+}
+NOTES_JOURNAL = {
+    "Date": "date",
+    "Ville": "ville",
+    "Marque": "marque",
+    "Note Uber Eats": "note_uber_eats",
+    "Note Deliveroo": "note_deliveroo",
+}
+_TABLES = {"ca_close": CA_JOURNAL, "evolution_notes": NOTES_JOURNAL}
+_SCHEMAS = {"ca_close": CA_SCHEMA, "evolution_notes": NOTES_SCHEMA}
+# clés naturelles : une saisie d'un autre classeur déjà présente n'est pas rejouée
+_KEYS = {"ca_close": KEYS[SHEET_CA], "evolution_notes": KEYS[SHEET_NOTES]}
+
+
+class SharedDataStore:
+    def __init__(self, df_ca, df_notes, stamp, digest, db_path):
+        self.stamp = stamp
+        # SHA-256 du classeur, ou {ville: SHA-256} pour des partitions par ville
+        self.digest = digest
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        # une connexion par store, partagée entre threads sous `_lock`
+        self._con = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._init_db()
+
+        self.ca = AppendStore(apply_schema(df_ca, CA_SCHEMA), derive=add_ca_horaire)
+        self.notes = AppendStore(apply_schema(df_notes, NOTES_SCHEMA))
+        self._stores = {"ca_close": self.ca, "evolution_notes": self.notes}
+        # dernier id du journal déjà appliqué, par table
+        self._last_ids = dict.fromkeys(_TABLES, 0)
+        # lignes saisies précédemment sur ce même classeur
+        for table in _TABLES:
+            self._pull(table)
+        self._data_version = self._read_data_version()
+        self.version = 0
+
+    def close(self):
+        """Ferme la connexion SQLite (le store reste lisible en mémoire)."""
+        with self._lock:
+            self._con.close()
+
+    def _read_data_version(self) -> int:
+        # change quand une autre connexion a validé une écriture dans la base
+        return self._con.execute("PRAGMA data_version").fetchone()[0]
+
+    def _init_db(self):
+        with self._con as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            for table, columns in _TABLES.items():
+                # colonnes sans type : SQLite garde entiers, réels et textes tels quels
+                cols = ", ".join(columns.values())
+                con.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"(id INTEGER PRIMARY KEY, workbook_sha TEXT NOT NULL, {cols})"
+                )
+
+    @property
+    def villes(self):
+        """Villes acceptées à la saisie : celles des partitions chargées, None = toutes."""
+        return frozenset(self.digest) if isinstance(self.digest, dict) else None
+
+    def _row_digests(self, rows: pd.DataFrame) -> list:
+        """Classeur de rattachement de chaque ligne saisie."""
+        if not isinstance(self.digest, dict):
+            return [self.digest] * len(rows)
+        digests = rows["Ville"].astype(object).map(self.digest)
+        if digests.isna().any():
+            inconnues = sorted(set(rows.loc[digests.isna(), "Ville"].astype(str)))
+            raise SchemaError(
+                "Lignes refusées : aucune partition chargée pour " + ", ".join(inconnues) + "."
+            )
+        return digests.tolist()
+
+    def _pull(self, table: str) -> int:
+        """Ajoute au store les lignes du journal postérieures à la dernière lecture."""
+        columns = _TABLES[table]
+        where, params = "id > ?", [self._last_ids[table]]
+        if isinstance(self.digest, dict):
+            # lignes des villes chargées seulement
+            where += f" AND ville IN ({', '.join('?' * len(self.digest))})"
+            params += list(self.digest)
+        df = pd.read_sql_query(
+            f"SELECT id, workbook_sha, {', '.join(columns.values())} FROM {table} "
+            f"WHERE {where} ORDER BY id",
+            self._con,
+            params=params,
+        )
+        if df.empty:
+            return 0
+        self._last_ids[table] = int(df["id"].iloc[-1])
+        if isinstance(self.digest, dict):
+            current = df["workbook_sha"] == df["ville"].map(self.digest)
+        else:
+            current = df["workbook_sha"] == self.digest
+        df = df.drop(columns=["id", "workbook_sha"]).rename(columns={v: k for k, v in columns.items()})
+        df = apply_schema(df, _SCHEMAS[table])
+        store = self._stores[table]
+        if not current.all():
+            # saisies d'une autre version du classeur : ignorées si déjà présentes
+            stale = ~current.to_numpy()
+            known = np.zeros(len(df), bool)
+            known[stale] = self._keys(table).known(df[stale])
+            df = df[~known]
+            if df.empty:
+                return 0
+        store.extend(df)
+        return len(df)
+
+    def _keys(self, table: str) -> Deduplicator:
+        """Clés des lignes du store, complétées avec les lignes ajoutées."""
+        return self._stores[table].memo_incremental(
+            "cles", lambda base: Deduplicator(base, _KEYS[table]), Deduplicator.add
+        )
+
+    def sync(self) -> bool:
+        """
+        Relit les lignes journalisées depuis par une autre copie des données
+        (autre processus). True si des lignes ont été ajoutées.
+        """
+        with self._lock:
+            data_version = self._read_data_version()
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            added = sum(self._pull(table) for table in _TABLES)
+            if added:
+                self.version += 1
+            return bool(added)
+
+    def _write_journal(self, con, table: str, rows: pd.DataFrame, digests: list):
+        columns = _TABLES[table]
+        values = widen(rows[list(columns)], _SCHEMAS[table])
+        values["Date"] = values["Date"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+        values = values.astype(object).where(values.notna(), None)
+        con.executemany(
+            f"INSERT INTO {table} (workbook_sha, {', '.join(columns.values())}) "
+            f"VALUES (?{', ?' * len(columns)})",
+            [
+                (digest, *row)
+                for digest, row in zip(digests, values.itertuples(index=False, name=None))
+            ],
+        )
+
+    def _append(self, table: str, store: AppendStore, rows):
+        rows = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if rows.empty:
+            return
+        rows = validate(rows, _SCHEMAS[table])
+        digests = self._row_digests(rows)
+        with self._lock:
+            with self._con as con:
+                # verrou d'écriture pris avant de relire : aucune ligne écrite
+                # entre-temps par une autre copie n'est sautée
+                con.execute("BEGIN IMMEDIATE")
+                self._pull(table)
+                self._write_journal(con, table, rows, digests)
+                self._last_ids[table] = con.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0]
+            store.extend(rows)
+            self.version += 1
+
+    def append_ca(self, rows):
+        """Ajoute des lignes CA_Close (liste de dicts ou DataFrame) pour tous."""
+        self._append("ca_close", self.ca, rows)
+
+    def append_notes(self, rows):
+        self._append("evolution_notes", self.notes, rows)
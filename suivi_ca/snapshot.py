@@ -0,0 +1,61 @@
+"""
+Snapshot des données servi par l'application.
+
+Tables chargées (classeur unique ou partitions par ville), lignes saisies
+du journal, et structures précalculées avant publication : index des
+filtres, et au besoin cubes journaliers et copies DuckDB. Le snapshot est
+construit hors du chemin des requêtes, par le thread de rechargement
+(`refresh.DataRefresher`) ou au démarrage du serveur (`warmup.py`).
+
+Les résultats sont mémoïsés dans les `AppendStore` sous les clés que lit
+l'application : "index", "cube", "cube_index" et "sql".
+"""
+
+from .cube import build_ca_cube, build_notes_cube, update_ca_cube, update_notes_cube
+from .index import DateVilleIndex
+from .loader import load_workbook, workbook_digest
+from .partitions import load_partitions
+from .shared import SharedDataStore
+from .sql import ca_table, notes_table
+from .store import AppendStore
+
+
+def row_index(store: AppendStore) -> DateVilleIndex:
+    """Index Date/Ville des lignes d'une table, complété avec les lignes ajoutées depuis."""
+    return store.memo_incremental("index", DateVilleIndex, DateVilleIndex.extend)
+
+
+def sql_table(store: AppendStore, build):
+    """Copie DuckDB d'une table, complétée avec les lignes ajoutées depuis."""
+    return store.memo_incremental("sql", build, lambda table, rows: table.extend(rows))
+
+
+def build_snapshot(source, stamp, db_path, cubes: bool = False, sql: bool = False) -> SharedDataStore:
+    """
+    `source` = chemin du classeur, ou tuple des partitions de villes.
+    `cubes` : cubes journaliers et leurs index construits dès maintenant
+    (sinon au premier affichage) ; `sql` : copies DuckDB des tables.
+    """
+    if isinstance(source, tuple):
+        # partitions chargées en parallèle, réunies en une table
+        data = load_partitions(source)
+        snapshot = SharedDataStore(data.ca, data.notes, stamp, data.digests, db_path)
+    else:
+        df_ca_raw, df_notes_raw = load_workbook(source)
+        snapshot = SharedDataStore(
+            df_ca_raw, df_notes_raw, stamp, workbook_digest(source), db_path
+        )
+    # index des filtres construits avant la bascule vers ce snapshot
+    row_index(snapshot.ca)
+    row_index(snapshot.notes)
+    if cubes:
+        for store, build, update in (
+            (snapshot.ca, build_ca_cube, update_ca_cube),
+            (snapshot.notes, build_notes_cube, update_notes_cube),
+        ):
+            cube = store.memo_incremental("cube", build, update)
+            store.memo("cube_index", lambda cube=cube: DateVilleIndex(cube))
+    if sql:
+        sql_table(snapshot.ca, ca_table)
+        sql_table(snapshot.notes, notes_table)
+    return snapshot
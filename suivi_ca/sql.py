@@ -0,0 +1,282 @@
+"""
+Backend SQL optionnel du mode Analyse : DuckDB, base colonnaire embarquée.
+
+Chaque table (CA_Close, Évolution_Notes) est copiée une fois dans sa base
+DuckDB en mémoire, stockée et compressée par colonne, puis complétée avec
+les lignes saisies. Filtres, KPI, top périodes, courbes, heatmap et notes
+au format long y sont des requêtes : seules les lignes du résultat reviennent
+en pandas, sans tranche de cube ni copie intermédiaire.
+
+`SqlSelection` a les méthodes de `queries.CubeSelection` et les mêmes
+résultats : les agrégats SQL sont remis dans les types de la table
+(catégories, dates) et dans l'ordre du chemin pandas.
+
+Le module s'importe sans duckdb : `available()` vaut alors False et le mode
+Analyse reste sur les cubes pandas. duckdb n'est chargé qu'à la création de
+la première table (backend « duckdb » choisi).
+"""
+
+import importlib.util
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .cube import CA_KEYS, CA_MEASURES, NOTES_KEYS, NOTES_MEASURES, count_col
+from .queries import PLATFORMS
+from .schema import CA_SCHEMA, NOTES_SCHEMA, concat, widen
+
+# noms des colonnes dans la base (identifiants SQL simples)
+_CA_COLUMNS = {
+    "Date": "date",
+    "Ville": "ville",
+    "Période de close": "periode",
+    "Chiffre d’affaires (€)": "ca",
+    "Nombre commandes": "commandes",
+    "CA horaire (€ / h)": "ca_horaire",
+    "Cmd horaires": "cmd_horaires",
+}
+_NOTES_COLUMNS = {
+    "Date": "date",
+    "Ville": "ville",
+    "Marque": "marque",
+    "Note Uber Eats": "note_uber",
+    "Note Deliveroo": "note_deliveroo",
+}
+# début d'intervalle des courbes, comme `resample.bin_dates` (semaines du lundi)
+_BINS = {"D": "day", "W": "week", "M": "month"}
+
+
+def available() -> bool:
+    # sans l'importer : duckdb absent, le mode Analyse reste sur les cubes pandas
+    return importlib.util.find_spec("duckdb") is not None
+
+
+class SqlTable:
+    """Une table dans sa base DuckDB en mémoire, complétée au fil des saisies."""
+
+    def __init__(self, base: pd.DataFrame, columns: dict, keys, measures, schema):
+        import duckdb
+
+        self.columns = columns
+        self._keys = list(keys)
+        self._measures = list(measures)
+        self._schema = schema
+        # table vide aux types pandas de la table (catégories comprises)
+        self.head = base.iloc[:0]
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._con = duckdb.connect()
+        definitions = [
+            "_row BIGINT",
+            "date TIMESTAMP",
+            *(f"{columns[k]} VARCHAR" for k in self._keys if k != "Date"),
+            *(f"{columns[m]} DOUBLE" for m in self._measures),
+        ]
+        self._con.execute(f"CREATE TABLE lignes ({', '.join(definitions)})")
+        self.extend(base)
+
+    def extend(self, rows: pd.DataFrame) -> "SqlTable":
+        """Insère des lignes (position dans la table pandas = `_row`)."""
+        if rows.empty:
+            return self
+        # mesures ré-élargies en float64, comme dans les cubes
+        values = widen(rows[self._measures], self._schema).astype("float64")
+        keys = widen(rows[[k for k in self._keys if k != "Date"]], self._schema)
+        with self._lock:
+            lignes = pd.DataFrame(
+                {
+                    "_row": np.arange(self._rows, self._rows + len(rows), dtype="int64"),
+                    "date": rows["Date"].to_numpy(),
+                    **{self.columns[k]: keys[k].to_numpy(dtype=object) for k in keys},
+                    **{self.columns[m]: values[m].to_numpy() for m in self._measures},
+                }
+            )
+            with self._con.cursor() as cur:
+                cur.register("nouvelles", lignes)
+                cur.execute("INSERT INTO lignes SELECT * FROM nouvelles")
+                cur.unregister("nouvelles")
+            self._rows += len(rows)
+            self.head = concat([self.head, rows.iloc[:0]])
+        return self
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        """Résultat d'une requête, colonnes renommées et typées comme la table."""
+        # un curseur par requête : les sessions interrogent la base en parallèle
+        with self._con.cursor() as cur:
+            out = cur.execute(sql, list(params)).df()
+        names = {sql_name: name for name, sql_name in self.columns.items()}
+        out = out.rename(columns=names)
+        casts = {name: self.head[name].dtype for name in out.columns if name in self._keys}
+        return out.astype(casts) if casts else out
+
+
+def ca_table(base: pd.DataFrame) -> SqlTable:
+    return SqlTable(base, _CA_COLUMNS, CA_KEYS, CA_MEASURES, CA_SCHEMA)
+
+
+def notes_table(base: pd.DataFrame) -> SqlTable:
+    return SqlTable(base, _NOTES_COLUMNS, NOTES_KEYS, NOTES_MEASURES, NOTES_SCHEMA)
+
+
+def _ordered(out: pd.DataFrame, by) -> pd.DataFrame:
+    # ordre des groupby pandas : codes des catégories, NaN en fin
+    return out.sort_values(by, kind="stable").reset_index(drop=True)
+
+
+class SqlSelection:
+    def __init__(self, table_ca: SqlTable, table_notes: SqlTable, df_ca, df_notes, date_deb, date_fin, ville=None):
+        # `df_*` : tables complètes (DataFrame ou `AppendStore`), dont `take`
+        # renvoie les lignes filtrées telles quelles
+        self._ca = table_ca
+        self._notes = table_notes
+        self._df_ca = df_ca
+        self._df_notes = df_notes
+        self._date_deb = pd.Timestamp(date_deb).to_pydatetime()
+        self._date_fin = pd.Timestamp(date_fin).to_pydatetime()
+        self._ville = ville
+
+    def _where(self, marque=None, not_null=()):
+        clauses = ["date BETWEEN ? AND ?"]
+        params = [self._date_deb, self._date_fin]
+        if self._ville is not None:
+            clauses.append("ville = ?")
+            params.append(self._ville)
+        if marque is not None:
+            clauses.append("marque = ?")
+            params.append(marque)
+        clauses.extend(f"{col} IS NOT NULL" for col in not_null)
+        return " AND ".join(clauses), params
+
+    # -------------------- LIGNES --------------------
+
+    def _rows(self, table: SqlTable, frame: pd.DataFrame) -> pd.DataFrame:
+        where, params = self._where()
+        positions = table.query(f"SELECT _row FROM lignes WHERE {where} ORDER BY date, _row", params)
+        return frame.take(positions["_row"].to_numpy())
+
+    def ca_rows(self) -> pd.DataFrame:
+        return self._rows(self._ca, self._df_ca)
+
+    def notes_rows(self) -> pd.DataFrame:
+        return self._rows(self._notes, self._df_notes)
+
+    # -------------------- CA --------------------
+
+    def ca_kpis(self) -> dict:
+        where, params = self._where()
+        row = self._ca.query(
+            f"""
+            SELECT COALESCE(SUM(ca), 0) AS total_ca,
+                   COALESCE(SUM(commandes), 0) AS total_cmd,
+                   AVG(ca_horaire) AS ca_horaire_moy,
+                   COUNT(*) AS lignes
+            FROM lignes WHERE {where}
+            """,
+            params,
+        ).iloc[0]
+        total_ca = row["total_ca"]
+        total_cmd = row["total_cmd"]
+        return {
+            "total_ca": total_ca,
+            "total_cmd": total_cmd,
+            "panier_moy": total_ca / total_cmd if total_cmd > 0 else np.nan,
+            "ca_horaire_moy": row["ca_horaire_moy"],
+            "lignes": int(row["lignes"]),
+        }
+
+    def top_periods(self) -> pd.DataFrame:
+        where, params = self._where(not_null=("ville", "periode"))
+        out = self._ca.query(
+            f"""
+            SELECT ville, periode, AVG(ca_horaire) AS ca_horaire, AVG(ca) AS ca,
+                   AVG(commandes) AS commandes
+            FROM lignes WHERE {where} GROUP BY ville, periode
+            """,
+            params,
+        )
+        return _ordered(out, ["Ville", "Période de close"]).sort_values(
+            "CA horaire (€ / h)", ascending=False
+        )
+
+    def pivot_ca(self) -> pd.DataFrame:
+        where, params = self._where(not_null=("ville", "periode"))
+        out = self._ca.query(
+            f"""
+            SELECT date, ville, periode,
+                   {", ".join(f"COALESCE(SUM({c}), 0) AS {c}" for c in ("ca", "commandes", "ca_horaire", "cmd_horaires"))}
+            FROM lignes WHERE {where} GROUP BY date, ville, periode
+            """,
+            params,
+        )
+        return _ordered(out, CA_KEYS)[CA_KEYS + CA_MEASURES]
+
+    def ca_heatmap(self, freq: str) -> pd.DataFrame:
+        where, params = self._where(not_null=("ville", "periode"))
+        out = self._ca.query(
+            f"""
+            SELECT date_trunc('{_BINS[freq]}', date) AS date, ville, periode,
+                   COALESCE(SUM(ca), 0) AS ca, COALESCE(SUM(commandes), 0) AS commandes,
+                   AVG(ca_horaire) AS ca_horaire,
+                   COUNT(ca_horaire) AS "{count_col("CA horaire (€ / h)")}"
+            FROM lignes WHERE {where} GROUP BY ALL
+            """,
+            params,
+        )
+        return _ordered(out, ["Date", "Ville", "Période de close"])
+
+    # -------------------- NOTES --------------------
+
+    def notes_kpis(self, marque=None) -> dict:
+        where, params = self._where(marque)
+        row = self._notes.query(
+            f"""
+            SELECT AVG(note_uber) AS moy_uber, AVG(note_deliveroo) AS moy_deliv,
+                   COUNT(*) AS lignes
+            FROM lignes WHERE {where}
+            """,
+            params,
+        ).iloc[0]
+        return {"moy_uber": row["moy_uber"], "moy_deliv": row["moy_deliv"], "lignes": int(row["lignes"])}
+
+    def perf_marques(self) -> pd.DataFrame:
+        where, params = self._where(not_null=("ville", "marque"))
+        out = self._notes.query(
+            f"""
+            SELECT ville, marque, AVG(note_uber) AS note_uber, AVG(note_deliveroo) AS note_deliveroo
+            FROM lignes WHERE {where} GROUP BY ville, marque
+            """,
+            params,
+        )
+        return _ordered(out, ["Ville", "Marque"])
+
+    def notes_series(self, marque=None) -> int:
+        where, params = self._where(marque)
+        out = self._notes.query(
+            f"SELECT COUNT(*) AS n FROM (SELECT DISTINCT ville, marque FROM lignes WHERE {where})",
+            params,
+        )
+        return int(out["n"].iloc[0])
+
+    def notes_long(self, freq: str, marque=None) -> pd.DataFrame:
+        where, params = self._where(marque, not_null=("ville", "marque"))
+        out = self._notes.query(
+            f"""
+            WITH bins AS (
+                SELECT date_trunc('{_BINS[freq]}', date) AS date, ville, marque,
+                       AVG(note_uber) AS note_uber, AVG(note_deliveroo) AS note_deliveroo
+                FROM lignes WHERE {where} GROUP BY ALL
+            )
+            SELECT date, ville, marque, 0 AS plateforme, note_uber AS note FROM bins
+            UNION ALL
+            SELECT date, ville, marque, 1 AS plateforme, note_deliveroo AS note FROM bins
+            """,
+            params,
+        )
+        # ordre de `melt` : toutes les lignes d'une plateforme, puis de la suivante
+        out = _ordered(out, ["plateforme", "Date", "Ville", "Marque"])
+        return out.assign(
+            # même type que les noms de colonnes repris par `melt`
+            Plateforme=pd.Index(PLATFORMS).take(out["plateforme"].to_numpy()),
+            Note=out["note"],
+        )[["Date", "Ville", "Marque", "Plateforme", "Note"]]
@@ -0,0 +1,159 @@
+"""
+Stockage en ajout seul des tables CA_Close / Évolution_Notes.
+
+Chaque saisie faisait auparavant `pd.concat` sur toute la table puis
+recalculait les colonnes dérivées de toutes les lignes. Ici, les colonnes
+dérivées ne sont calculées que pour les nouvelles lignes, gardées en lots à
+côté de la table principale. Les lots ne sont fusionnés (une copie de toute
+la table) qu'au-delà d'un seuil de lignes en attente, ou quand un appelant
+demande explicitement la table entière (`frame` : export, import).
+
+Le reste se sert des lots sans reconstruire la table : `memo_incremental`
+ne passe que les lignes ajoutées aux structures qui en dépendent (cubes,
+index Date/Ville, copies DuckDB, listes des filtres) et `take` extrait des
+lignes par position, où qu'elles soient.
+
+Toutes les opérations sont protégées par un verrou : un même store peut être
+partagé entre les sessions (threads) du serveur.
+"""
+
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .schema import concat
+
+# fusion des lots en attente : au moins COMPACT_MIN_ROWS lignes et
+# COMPACT_RATIO de la table principale (copie amortie sur les saisies)
+COMPACT_MIN_ROWS = 1_000
+COMPACT_RATIO = 0.05
+
+
+class AppendStore:
+    """Table principale compacte + lots des lignes ajoutées depuis."""
+
+    def __init__(self, base: pd.DataFrame, derive=None):
+        self._derive = derive
+        base = derive(base) if derive is not None else base
+        self._base = base.reset_index(drop=True)
+        self._pending = []
+        self._memo = {}
+        self._lock = threading.RLock()
+        # identifiant unique : deux stores de même version n'ont pas les mêmes lignes
+        self.token = uuid.uuid4().hex
+        # incrémenté à chaque ajout : sert de clé aux calculs mémoïsés
+        self.version = 0
+        # nombre de lignes à chaque version (la table n'est jamais réécrite)
+        self._lengths = [len(self._base)]
+
+    def __len__(self) -> int:
+        return self._lengths[-1]
+
+    @property
+    def columns(self) -> pd.Index:
+        return self._base.columns
+
+    @property
+    def pending_rows(self) -> int:
+        """Lignes ajoutées pas encore fusionnées dans la table principale."""
+        return self._lengths[-1] - len(self._base)
+
+    def append(self, row: dict):
+        self.extend([row])
+
+    def extend(self, rows):
+        """Ajoute des lignes (liste de dicts ou DataFrame)."""
+        new = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if new.empty:
+            return
+        if self._derive is not None:
+            new = self._derive(new)
+        with self._lock:
+            self._pending.append(new.reindex(columns=self._base.columns))
+            self.version += 1
+            self._lengths.append(self._lengths[-1] + len(new))
+            if self.pending_rows >= max(COMPACT_MIN_ROWS, COMPACT_RATIO * len(self._base)):
+                self._compact()
+
+    def _compact(self):
+        if self._pending:
+            # `concat` garde les colonnes catégorielles du schéma
+            self._base = concat([self._base, *self._pending])
+            self._pending = []
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Table entière : fusionne les lots en attente (copie de toute la table)."""
+        with self._lock:
+            self._compact()
+            return self._base
+
+    def _parts(self, start: int = 0) -> list:
+        """Table principale et lots en attente, à partir de la ligne `start`."""
+        parts = [self._base, *self._pending]
+        offset = 0
+        out = []
+        for part in parts:
+            end = offset + len(part)
+            if end > start:
+                out.append(part.iloc[max(start - offset, 0) :])
+            offset = end
+        return out
+
+    def rows_since(self, start: int) -> pd.DataFrame:
+        """Lignes à partir de la position `start` (index = positions dans la table)."""
+        with self._lock:
+            parts = self._parts(start)
+            if not parts:
+                return self._base.iloc[:0]
+            rows = parts[0] if len(parts) == 1 else concat(parts)
+            return rows.set_axis(pd.RangeIndex(start, start + len(rows)))
+
+    def take(self, positions) -> pd.DataFrame:
+        """Lignes aux positions données, dans cet ordre, sans fusionner les lots."""
+        positions = np.asarray(positions, dtype="int64")
+        with self._lock:
+            if not self._pending:
+                return self._base.take(positions)
+            split = len(self._base)
+            in_base = positions < split
+            if in_base.all():
+                return self._base.take(positions)
+            pending = self.rows_since(split)
+            rows = concat([self._base.take(positions[in_base]), pending.take(positions[~in_base] - split)])
+            # lignes de la table principale puis des lots : remises dans l'ordre demandé
+            source = np.empty(len(positions), dtype="int64")
+            source[in_base] = np.arange(in_base.sum())
+            source[~in_base] = np.arange(in_base.sum(), len(positions))
+            return rows.take(source).set_axis(pd.Index(positions))
+
+    def memo(self, key, build):
+        """Résultat de `build()`, recalculé seulement si la version a changé."""
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is None or cached[0] != self.version:
+                cached = (self.version, build())
+                self._memo[key] = cached
+            return cached[1]
+
+    def memo_incremental(self, key, build, update):
+        """
+        Comme `memo`, pour les résultats additifs : `build(base)` est calculé
+        une fois sur les lignes d'origine, puis `update(valeur, nouvelles)` ne
+        traite que les lignes ajoutées depuis la dernière version vue.
+        """
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            if cached is None:
+                seen, value = 0, build(self._base.iloc[: self._lengths[0]])
+            else:
+                seen, value = cached
+            start = self._lengths[seen]
+            if start < len(self):
+                value = update(value, self.rows_since(start))
+            self._memo[key] = (self.version, value)
+            return value
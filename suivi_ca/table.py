@@ -0,0 +1,122 @@
+"""
+Tables de détail paginées côté serveur.
+
+Au lieu de trier tout le détail filtré et de l'envoyer entier au
+navigateur, on ne calcule que l'ordre des lignes jusqu'à la fin de la page
+demandée : un `np.partition` sur la première clé de tri isole les
+candidats, puis seuls ceux-ci sont triés (tri stable, valeurs manquantes en
+dernier, comme `sort_values`). Seule la page visible est ensuite extraite
+et sérialisée.
+"""
+
+import numpy as np
+import pandas as pd
+
+_INT_LAST = np.iinfo(np.int64).max
+
+
+def _sort_key(series: pd.Series, ascending: bool) -> np.ndarray:
+    """Clé numérique équivalente à l'ordre de `series` (manquants en dernier)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if categories.is_monotonic_increasing:
+            ranks = np.arange(len(categories))
+        else:
+            ranks = np.argsort(np.argsort(categories.to_numpy(), kind="stable"))
+        codes = series.cat.codes.to_numpy()
+        missing = codes < 0
+        key = np.zeros(len(codes), dtype="int64")
+        if len(categories):
+            key = ranks.take(codes, mode="clip").astype("int64")
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]")
+        missing = np.isnat(values)
+        key = values.view("int64").copy()
+    elif pd.api.types.is_numeric_dtype(series):
+        key = series.to_numpy(dtype="float64", na_value=np.nan)
+        missing = np.isnan(key)
+    else:
+        codes, _ = pd.factorize(series, sort=True)
+        missing = codes < 0
+        key = codes.astype("int64")
+
+    if not ascending:
+        key = -key
+    key[missing] = np.inf if key.dtype.kind == "f" else _INT_LAST
+    return key
+
+
+def sorted_positions(df: pd.DataFrame, by, ascending: bool = True, stop: int = None) -> np.ndarray:
+    """
+    Positions des `stop` premières lignes de `df` triées selon `by` (toutes si
+    None), sans trier le reste de la table.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    n = len(df)
+    stop = n if stop is None else min(stop, n)
+    if stop <= 0:
+        return np.empty(0, dtype="int64")
+
+    keys = [_sort_key(df[col], ascending) for col in by]
+    candidates = np.arange(n)
+    if stop < n:
+        # toute ligne des `stop` premières a une première clé <= la stop-ième valeur
+        threshold = np.partition(keys[0], stop - 1)[stop - 1]
+        candidates = np.flatnonzero(keys[0] <= threshold)
+    # lexsort : dernière clé = clé principale ; tri stable à égalité
+    order = np.lexsort([key[candidates] for key in reversed(keys)])
+    return candidates[order[:stop]]
+
+
+def search_mask(df: pd.DataFrame, query: str) -> np.ndarray:
+    """Lignes dont une colonne texte contient `query` (sans casse)."""
+    query = (query or "").strip().lower()
+    mask = np.zeros(len(df), dtype=bool)
+    if not query:
+        return ~mask
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            # test sur les quelques catégories, propagé par les codes
+            hits = col.cat.categories.astype(str).str.lower().str.contains(query, regex=False)
+            codes = col.cat.codes.to_numpy()
+            mask |= (codes >= 0) & np.asarray(hits, dtype=bool).take(codes, mode="clip")
+        elif pd.api.types.is_string_dtype(col) or col.dtype == object:
+            mask |= col.astype(str).str.lower().str.contains(query, regex=False).to_numpy(
+                dtype=bool, na_value=False
+            )
+    return mask
+
+
+def page(
+    df: pd.DataFrame,
+    by,
+    ascending: bool = True,
+    page_number: int = 0,
+    page_size: int = 50,
+    query: str = "",
+):
+    """
+    Renvoie (lignes de la page, nombre de lignes correspondant à la recherche).
+
+    `page_number` commence à 0 ; la page est triée selon `by`, les lignes
+    gardent leur index d'origine.
+    """
+    positions = np.flatnonzero(search_mask(df, query)) if query else None
+    subset = df if positions is None else df.iloc[positions]
+    start = page_number * page_size
+    order = sorted_positions(subset, by, ascending, stop=start + page_size)
+    return subset.iloc[order[start:]], len(subset)
+
+
+def last_rows(df: pd.DataFrame, by: str, n: int = 10) -> pd.DataFrame:
+    """Équivalent de `df.sort_values(by, kind="stable").tail(n)`, sans trier toute la table."""
+    total = len(df)
+    if total <= n:
+        return df.iloc[np.lexsort([np.arange(total), _sort_key(df[by], True)])]
+    key = _sort_key(df[by], True)
+    threshold = np.partition(key, total - n)[total - n]
+    candidates = np.flatnonzero(key >= threshold)
+    # à clé égale, l'ordre d'origine départage (tri stable)
+    order = np.lexsort([candidates, key[candidates]])
+    return df.iloc[candidates[order[-n:]]]
@@ -0,0 +1,160 @@
+"""
+Tendances : moyennes glissantes, variations S-1 / A-1 et EWMA.
+
+Calculées sur le cube journalier (sommes et nombres de valeurs par jour),
+pour chaque série (ex. une ville, ou une ville × marque). Les séries sont
+posées sur une grille calendaire dense (jours × séries) :
+
+- moyenne glissante sur 7 / 28 jours calendaires = différence de sommes
+  cumulées (somme des valeurs / nombre de valeurs de la fenêtre, comme
+  `mean()` sur les lignes de détail) ;
+- variation S-1 : moyenne 7 jours comparée à celle de la semaine
+  précédente ; variation A-1 : moyenne 28 jours comparée à la même fenêtre
+  52 semaines plus tôt (mêmes jours de la semaine) ;
+- EWMA (demi-vie en jours) pondérée par le nombre de valeurs : rapport des
+  moyennes exponentielles des sommes et des nombres.
+
+Tout est vectorisé sur la grille ; l'historique complet est traité une fois
+par version des données, l'affichage n'en extrait qu'une tranche de dates.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .cube import count_col
+
+WINDOWS = (7, 28)
+WOW_LAG = 7
+# 52 semaines : compare les mêmes jours de la semaine
+YOY_LAG = 364
+EWM_HALFLIFE = 7
+
+CURVES = ["Jour", "Moy. 7 j", "Moy. 28 j", "EWMA"]
+# colonnes du résumé à une date
+SUMMARY = ["Moy. 7 j", "Δ S-1 (%)", "Moy. 28 j", "Δ A-1 (%)", "EWMA"]
+
+
+def _window_sum(cumsum: np.ndarray, window: int) -> np.ndarray:
+    """Somme sur les `window` derniers jours (inclus), ligne par ligne."""
+    n = len(cumsum) - 1
+    end = np.arange(1, n + 1)
+    return cumsum[end] - cumsum[np.maximum(end - window, 0)]
+
+
+def _lag(values: np.ndarray, days: int) -> np.ndarray:
+    out = np.full_like(values, np.nan)
+    if days < len(values):
+        out[days:] = values[: len(values) - days]
+    return out
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+def _pct_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous != 0, 100 * (current / previous - 1), np.nan)
+
+
+class Trends:
+    """
+    Courbes de tendance de `measures` ({libellé: colonne du cube}) par série
+    `keys` (liste vide = toutes les lignes du cube en une seule série).
+    """
+
+    def __init__(self, cube: pd.DataFrame, keys, measures: dict, halflife: float = EWM_HALFLIFE):
+        self.keys = list(keys)
+        self.measures = dict(measures)
+        cube = cube[cube["Date"].notna()]
+        for key in self.keys:
+            cube = cube[cube[key].notna()]
+
+        columns = list(self.measures.values())
+        sums = columns + [count_col(c) for c in columns]
+        daily = cube.groupby(["Date"] + self.keys, sort=True, observed=True)[sums].sum().reset_index()
+        if self.keys:
+            series_pos = daily.groupby(self.keys, sort=True, observed=True).ngroup().to_numpy()
+            first = pd.Series(series_pos).drop_duplicates().sort_values()
+            self.series = daily[self.keys].iloc[first.index].reset_index(drop=True)
+        else:
+            series_pos = np.zeros(len(daily), dtype=int)
+            self.series = pd.DataFrame(index=[0])
+        dates = pd.DatetimeIndex(daily["Date"])
+
+        if len(daily):
+            self.days = pd.date_range(dates.min().normalize(), dates.max().normalize(), freq="D")
+            day_pos = ((dates.normalize() - self.days[0]) // pd.Timedelta(days=1)).to_numpy()
+        else:
+            self.days = pd.DatetimeIndex([])
+            day_pos = np.empty(0, dtype=int)
+
+        shape = (len(self.days), len(self.series))
+        self._curves = {}
+        for label, col in self.measures.items():
+            total = np.zeros(shape)
+            count = np.zeros(shape)
+            total[day_pos, series_pos] = daily[col].to_numpy(dtype="float64")
+            count[day_pos, series_pos] = daily[count_col(col)].to_numpy(dtype="float64")
+            self._curves[label] = self._compute(total, count, halflife)
+
+    @staticmethod
+    def _compute(total: np.ndarray, count: np.ndarray, halflife: float) -> dict:
+        zero = np.zeros((1, total.shape[1]))
+        cum_total = np.vstack([zero, total.cumsum(axis=0)])
+        cum_count = np.vstack([zero, count.cumsum(axis=0)])
+        means = {
+            window: _ratio(_window_sum(cum_total, window), _window_sum(cum_count, window))
+            for window in WINDOWS
+        }
+        # moyennes exponentielles des sommes et des nombres : leur rapport est
+        # l'EWMA des valeurs, jours sans valeur compris dans la décroissance
+        ewm_total = pd.DataFrame(total).ewm(halflife=halflife).mean().to_numpy()
+        ewm_count = pd.DataFrame(count).ewm(halflife=halflife).mean().to_numpy()
+        return {
+            "Jour": _ratio(total, count),
+            "Moy. 7 j": means[7],
+            "Moy. 28 j": means[28],
+            "EWMA": _ratio(ewm_total, ewm_count),
+            "Δ S-1 (%)": _pct_change(means[7], _lag(means[7], WOW_LAG)),
+            "Δ A-1 (%)": _pct_change(means[28], _lag(means[28], YOY_LAG)),
+        }
+
+    def _series_mask(self, filters: dict) -> np.ndarray:
+        mask = np.ones(len(self.series), dtype=bool)
+        for key, value in filters.items():
+            if value is not None and key in self.series:
+                mask &= (self.series[key] == value).to_numpy()
+        return mask
+
+    def frame(self, date_deb, date_fin, **filters) -> pd.DataFrame:
+        """
+        Courbes entre deux dates, une ligne par jour × série × mesure ;
+        `filters` restreint les séries (ex. Ville="Amiens", None = toutes).
+        """
+        lo = self.days.searchsorted(pd.Timestamp(date_deb), side="left")
+        hi = self.days.searchsorted(pd.Timestamp(date_fin), side="right")
+        cols = np.flatnonzero(self._series_mask(filters))
+        n_days, n_series = hi - lo, len(cols)
+        base = {"Date": np.repeat(self.days[lo:hi].to_numpy(), n_series)}
+        for key in self.keys:
+            base[key] = np.tile(self.series[key].to_numpy()[cols], n_days)
+
+        parts = []
+        for label, curves in self._curves.items():
+            part = dict(base, Mesure=label)
+            for name, grid in curves.items():
+                part[name] = grid[lo:hi, cols].ravel()
+            parts.append(pd.DataFrame(part))
+        out = pd.concat(parts, ignore_index=True)
+        # jours antérieurs à la première valeur d'une série : rien à tracer
+        return out[out["Moy. 28 j"].notna() | out["EWMA"].notna()].reset_index(drop=True)
+
+    def latest(self, date, **filters) -> pd.DataFrame:
+        """Valeurs des courbes au jour `date` (ou au dernier jour connu avant)."""
+        pos = self.days.searchsorted(pd.Timestamp(date), side="right") - 1
+        if pos < 0:
+            return pd.DataFrame(columns=self.keys + ["Mesure"] + SUMMARY)
+        day = self.days[pos]
+        return self.frame(day, day, **filters)[self.keys + ["Mesure"] + SUMMARY]
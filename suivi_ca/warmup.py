@@ -0,0 +1,129 @@
+"""
+Démarrage à chaud : données et dépendances prêtes avant la première requête.
+
+Sans préchauffage, le premier visiteur après un déploiement paie l'analyse
+du classeur (ou des partitions), les index et cubes journaliers, et l'import
+des bibliothèques de graphiques. Deux niveaux :
+
+- étape de déploiement, avant de lancer le serveur : charge les données
+  comme l'application, ce qui écrit les caches Arrow sur disque (le premier
+  chargement du serveur les relit en mémoire mappée) ;
+
+      python -m suivi_ca.warmup
+
+- démarrage du serveur : la même chose dans le processus du serveur, puis
+  le serveur Streamlit est lancé. Le snapshot des données (index, cubes) est
+  confié à `get_refresher` de l'application via `warmed_refresher` : la
+  première session le sert sans rien recharger.
+
+      python -m suivi_ca.warmup --serve --server.port 8501
+
+Les fichiers par défaut sont ceux de l'application (`config.py`) ; avec
+d'autres --donnees / --partitions / --db, la première session charge ses
+propres données.
+"""
+
+import functools
+import importlib
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .config import DATA_PATH, DB_PATH, PARTITIONS_DIR
+from .partitions import partition_paths, source_stamp
+from .refresh import DataRefresher
+from .snapshot import build_snapshot
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+# chargés à la demande par l'application (graphiques du mode Analyse),
+# importés au démarrage d'un serveur préchauffé
+PRELOAD_MODULES = ("altair",)
+
+_lock = threading.Lock()
+# {source: DataRefresher} préchauffés, pas encore repris par l'application
+_warmed = {}
+
+
+def data_source(data_path=DATA_PATH, partitions_dir=PARTITIONS_DIR):
+    """Source ouverte par défaut par l'application : toutes les partitions, sinon le classeur."""
+    partitions = partition_paths(partitions_dir)
+    return tuple(partitions.values()) if partitions else data_path
+
+
+def preload(modules=PRELOAD_MODULES):
+    """Importe les modules lourds chargés à la demande (ignorés s'ils sont absents)."""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def warm(source, db_path=DB_PATH, sql: bool = False) -> DataRefresher:
+    """Charge `source` (cubes et index compris) et la réserve à la première session."""
+    refresher = DataRefresher(
+        source,
+        functools.partial(build_snapshot, db_path=db_path, cubes=True, sql=sql),
+        stamp=source_stamp,
+    )
+    with _lock:
+        previous = _warmed.pop(source, None)
+        _warmed[source] = refresher
+    if previous is not None:
+        previous.stop()
+    return refresher
+
+
+def warmed_refresher(source):
+    """Refresher préchauffé pour `source` (repris une seule fois), sinon None."""
+    with _lock:
+        return _warmed.pop(source, None)
+
+
+def serve(streamlit_args=()):
+    """Lance le serveur Streamlit de l'application dans ce processus."""
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(APP_PATH), *streamlit_args]
+    cli.main()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Préchauffe les données avant la première requête (et lance le serveur)."
+    )
+    parser.add_argument("--donnees", default=DATA_PATH, help="classeur de données")
+    parser.add_argument("--partitions", default=PARTITIONS_DIR,
+                        help="dossier des classeurs par ville (prioritaire s'il existe)")
+    parser.add_argument("--db", default=DB_PATH, help="base des saisies")
+    parser.add_argument("--sql", action="store_true",
+                        help="avec --serve : prépare aussi les copies DuckDB (backend « duckdb »)")
+    parser.add_argument("--serve", action="store_true",
+                        help="lance ensuite le serveur dans ce processus "
+                             "(options non reconnues transmises à `streamlit run`)")
+    args, streamlit_args = parser.parse_known_args(argv)
+    if streamlit_args and not args.serve:
+        parser.error(f"options inconnues : {' '.join(streamlit_args)}")
+
+    start = time.perf_counter()
+    source = data_source(args.donnees, args.partitions)
+    if args.serve:
+        preload()
+        warm(source, args.db, args.sql)
+    else:
+        # caches Arrow écrits au passage ; le snapshot lui-même n'est pas conservé
+        build_snapshot(source, source_stamp(source), args.db)
+    print(f"Données préchauffées en {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    if args.serve:
+        serve(streamlit_args)
+
+
+if __name__ == "__main__":
+    # via le module importé : `python -m` exécute ce fichier sous le nom
+    # __main__, et l'application doit retrouver le même `_warmed`
+    from suivi_ca.warmup import main as _main
+
+    _main()
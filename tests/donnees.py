@@ -0,0 +1,33 @@
+"""Petites tables CA_Close / Évolution_Notes pour les tests (déterministes)."""
+
+import numpy as np
+import pandas as pd
+
+from suivi_ca.derived import add_ca_horaire
+from suivi_ca.schema import CA_SCHEMA, NOTES_SCHEMA, apply_schema
+
+VILLES = ["Amiens", "Beauvais", "Lille"]
+PERIODES = ["11:30 - 14:30", "18:30 - 22:00", "22:00 - 01:00"]
+MARQUES = ["Out Fry", "Pokawa"]
+DEBUT = pd.Timestamp("2025-01-01")
+
+
+def tables(jours: int = 60, villes=VILLES, seed: int = 0):
+    """(df_ca, df_notes) au schéma : une close par jour × ville × période, une note par jour × ville × marque."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(DEBUT, periods=jours, freq="D")
+    ca = pd.MultiIndex.from_product([dates, villes, PERIODES], names=["Date", "Ville", "Période de close"])
+    ca = ca.to_frame(index=False)
+    ca["Nombre commandes"] = rng.integers(0, 40, len(ca))
+    ca["Chiffre d’affaires (€)"] = np.round(ca["Nombre commandes"] * rng.uniform(12, 25, len(ca)), 2)
+    notes = pd.MultiIndex.from_product([dates, villes, MARQUES], names=["Date", "Ville", "Marque"])
+    notes = notes.to_frame(index=False)
+    notes["Note Uber Eats"] = np.round(rng.uniform(3.5, 5, len(notes)), 1)
+    notes["Note Deliveroo"] = np.round(rng.uniform(3.5, 5, len(notes)), 1)
+    return apply_schema(ca, CA_SCHEMA), apply_schema(notes, NOTES_SCHEMA)
+
+
+def tables_derivees(jours: int = 60, villes=VILLES, seed: int = 0):
+    """Comme `tables`, avec les colonnes dérivées de CA_Close (CA horaire...)."""
+    df_ca, df_notes = tables(jours, villes, seed)
+    return add_ca_horaire(df_ca), df_notes
@@ -0,0 +1,65 @@
+"""Table de faits CA × notes : mise à jour incrémentale comparée à une reconstruction."""
+
+import pandas as pd
+import pytest
+
+from suivi_ca.correlation import RatingsRevenueFacts, build_facts, update_facts
+from suivi_ca.cube import build_ca_cube, build_notes_cube, update_ca_cube, update_notes_cube
+from suivi_ca.derived import add_ca_horaire
+
+from .donnees import tables_derivees
+
+
+@pytest.fixture(scope="module")
+def donnees():
+    return tables_derivees(jours=90)
+
+
+def _lignes(df, ville, dates, **valeurs):
+    modele = df[df["Ville"] == ville].iloc[[0] * len(dates)]
+    return modele.assign(Date=pd.to_datetime(dates), **valeurs).reset_index(drop=True)
+
+
+def _ajouts(df_ca, df_notes):
+    fin = df_ca["Date"].max()
+    return (
+        # jour suivant, et un jour ancien corrigé dans une autre ville
+        pd.concat(
+            [
+                _lignes(df_ca, "Beauvais", [fin + pd.Timedelta(days=1)]),
+                add_ca_horaire(_lignes(df_ca, "Lille", [fin - pd.Timedelta(days=20)])),
+            ]
+        ),
+        # relevé de notes antérieur : repris par les jours qui suivent (as-of)
+        _lignes(df_notes, "Lille", [fin - pd.Timedelta(days=25)], **{"Note Uber Eats": 1.0}),
+    )
+
+
+def test_mise_a_jour_comme_reconstruction(donnees):
+    df_ca, df_notes = donnees
+    cube_ca, cube_notes = build_ca_cube(df_ca), build_notes_cube(df_notes)
+    facts = build_facts(cube_ca, cube_notes)
+
+    ajout_ca, ajout_notes = _ajouts(df_ca, df_notes)
+    cube_ca = update_ca_cube(cube_ca, ajout_ca)
+    cube_notes = update_notes_cube(cube_notes, ajout_notes)
+    since = pd.concat([ajout_ca, ajout_notes]).groupby("Ville", observed=True)["Date"].min()
+
+    obtenu = update_facts(facts, cube_ca, cube_notes, since.to_dict())
+    attendu = build_facts(cube_ca, cube_notes)
+    pd.testing.assert_frame_equal(obtenu, attendu, check_categorical=False)
+
+
+def test_touch_puis_frame(donnees):
+    df_ca, df_notes = donnees
+    cube_ca, cube_notes = build_ca_cube(df_ca), build_notes_cube(df_notes)
+    faits = RatingsRevenueFacts()
+    faits.frame(cube_ca, cube_notes)
+
+    ajout_ca, ajout_notes = _ajouts(df_ca, df_notes)
+    cube_ca = update_ca_cube(cube_ca, ajout_ca)
+    cube_notes = update_notes_cube(cube_notes, ajout_notes)
+    obtenu = faits.touch(ajout_ca).touch(ajout_notes).frame(cube_ca, cube_notes)
+    pd.testing.assert_frame_equal(
+        obtenu, build_facts(cube_ca, cube_notes), check_categorical=False
+    )
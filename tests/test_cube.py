@@ -0,0 +1,97 @@
+"""KPI des cubes journaliers comparés à un groupby direct sur les lignes."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca.cube import (
+    build_ca_cube,
+    build_notes_cube,
+    ca_kpis,
+    notes_kpis,
+    perf_marques,
+    top_periods,
+    update_ca_cube,
+)
+from suivi_ca.derived import add_ca_horaire
+from suivi_ca.schema import CA_SCHEMA, NOTES_SCHEMA, widen
+
+from .donnees import tables
+
+CA = "Chiffre d’affaires (€)"
+CMD = "Nombre commandes"
+HORAIRE = "CA horaire (€ / h)"
+
+
+@pytest.fixture(scope="module")
+def donnees():
+    df_ca, df_notes = tables(jours=90)
+    # valeurs manquantes : les moyennes doivent les ignorer comme `mean()`
+    df_ca.loc[::7, CA] = np.nan
+    df_notes.loc[::5, "Note Deliveroo"] = np.nan
+    return add_ca_horaire(df_ca), df_notes
+
+
+def _periode(df, debut="2025-01-10", fin="2025-02-20", ville="Beauvais"):
+    return df[(df["Date"] >= debut) & (df["Date"] <= fin) & (df["Ville"] == ville)]
+
+
+def test_ca_kpis_comme_les_lignes(donnees):
+    df_ca, _ = donnees
+    cube = build_ca_cube(df_ca)
+    for lignes, filtre in ((df_ca, cube), (_periode(df_ca), _periode(cube))):
+        mesures = widen(lignes[[CA, CMD]], CA_SCHEMA).astype("float64")
+        kpis = ca_kpis(filtre)
+        assert kpis["total_ca"] == pytest.approx(mesures[CA].sum())
+        assert kpis["total_cmd"] == pytest.approx(mesures[CMD].sum())
+        assert kpis["panier_moy"] == pytest.approx(mesures[CA].sum() / mesures[CMD].sum())
+        assert kpis["ca_horaire_moy"] == pytest.approx(lignes[HORAIRE].mean())
+        assert kpis["lignes"] == len(lignes)
+
+
+def test_top_periods_comme_groupby(donnees):
+    df_ca, _ = donnees
+    attendu = (
+        df_ca.groupby(["Ville", "Période de close"], observed=True)[[HORAIRE, CA, CMD]]
+        .mean()
+        .reset_index()
+    )
+    obtenu = top_periods(build_ca_cube(df_ca))
+    fusion = obtenu.merge(attendu, on=["Ville", "Période de close"], suffixes=("", "_attendu"))
+    assert len(fusion) == len(attendu)
+    for col in (HORAIRE, CA, CMD):
+        np.testing.assert_allclose(fusion[col], fusion[f"{col}_attendu"], rtol=1e-6)
+    assert obtenu[HORAIRE].is_monotonic_decreasing
+
+
+def test_notes_kpis_et_marques_comme_groupby(donnees):
+    _, df_notes = donnees
+    cube = build_notes_cube(df_notes)
+    notes = widen(df_notes[["Note Uber Eats", "Note Deliveroo"]], NOTES_SCHEMA)
+    kpis = notes_kpis(cube)
+    assert kpis["moy_uber"] == pytest.approx(notes["Note Uber Eats"].mean())
+    assert kpis["moy_deliv"] == pytest.approx(notes["Note Deliveroo"].mean())
+    assert kpis["lignes"] == len(df_notes)
+
+    attendu = (
+        df_notes.assign(**notes)
+        .groupby(["Ville", "Marque"], observed=True)[["Note Uber Eats", "Note Deliveroo"]]
+        .mean()
+        .reset_index()
+    )
+    obtenu = perf_marques(cube).merge(attendu, on=["Ville", "Marque"], suffixes=("", "_attendu"))
+    assert len(obtenu) == len(attendu)
+    for col in ("Note Uber Eats", "Note Deliveroo"):
+        np.testing.assert_allclose(obtenu[col], obtenu[f"{col}_attendu"], rtol=1e-6)
+
+
+def test_mise_a_jour_comme_reconstruction(donnees):
+    df_ca, _ = donnees
+    base, ajout = df_ca.iloc[:700], df_ca.iloc[700:]
+    # ajout de jours nouveaux et d'un jour déjà présent
+    ajout = pd.concat([ajout, df_ca.iloc[[10]]])
+    attendu = build_ca_cube(pd.concat([base, ajout]))
+    obtenu = update_ca_cube(build_ca_cube(base), ajout)
+    pd.testing.assert_frame_equal(
+        obtenu.reset_index(drop=True), attendu.reset_index(drop=True), check_categorical=False
+    )
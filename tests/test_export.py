@@ -0,0 +1,79 @@
+"""Exports : chaque format relu redonne les valeurs saisies (types larges)."""
+
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca.export import (
+    EXPORT_FORMATS,
+    _excel_openpyxl,
+    build_csv_zip_bytes,
+    build_excel_bytes,
+    build_parquet_zip_bytes,
+)
+from suivi_ca.loader import SHEET_CA, SHEET_NOTES
+from suivi_ca.schema import CA_SCHEMA, NOTES_SCHEMA, widen
+
+from .donnees import tables
+
+
+@pytest.fixture(scope="module")
+def donnees():
+    df_ca, df_notes = tables(jours=4)
+    # note manquante : cellule vide, relue NaN
+    df_notes.loc[0, "Note Deliveroo"] = np.nan
+    return df_ca, df_notes
+
+
+def _attendu(df, schema):
+    return widen(df, schema).reset_index(drop=True)
+
+
+def _compare(relu, df, schema):
+    attendu = _attendu(df, schema)
+    relu = relu.astype({c: attendu[c].dtype for c in attendu.columns})
+    pd.testing.assert_frame_equal(relu, attendu, check_dtype=False, check_exact=True)
+
+
+def test_excel(donnees):
+    df_ca, df_notes = donnees
+    xls = pd.ExcelFile(io.BytesIO(build_excel_bytes(df_ca, df_notes)))
+    assert xls.sheet_names == [SHEET_CA, SHEET_NOTES]
+    _compare(pd.read_excel(xls, SHEET_CA), df_ca, CA_SCHEMA)
+    _compare(pd.read_excel(xls, SHEET_NOTES), df_notes, NOTES_SCHEMA)
+
+
+def test_excel_openpyxl(donnees):
+    # repli sans xlsxwriter
+    df_ca, df_notes = donnees
+    data = _excel_openpyxl({SHEET_CA: widen(df_ca, CA_SCHEMA), SHEET_NOTES: widen(df_notes, NOTES_SCHEMA)})
+    xls = pd.ExcelFile(io.BytesIO(data))
+    _compare(pd.read_excel(xls, SHEET_CA), df_ca, CA_SCHEMA)
+    _compare(pd.read_excel(xls, SHEET_NOTES), df_notes, NOTES_SCHEMA)
+
+
+def test_csv_zip(donnees):
+    df_ca, df_notes = donnees
+    with zipfile.ZipFile(io.BytesIO(build_csv_zip_bytes(df_ca, df_notes))) as zf:
+        assert sorted(zf.namelist()) == ["ca_close.csv", "evolution_notes.csv"]
+        ca = pd.read_csv(zf.open("ca_close.csv"), encoding="utf-8-sig", parse_dates=["Date"])
+        notes = pd.read_csv(zf.open("evolution_notes.csv"), encoding="utf-8-sig", parse_dates=["Date"])
+    _compare(ca, df_ca, CA_SCHEMA)
+    _compare(notes, df_notes, NOTES_SCHEMA)
+
+
+def test_parquet_zip(donnees):
+    df_ca, df_notes = donnees
+    with zipfile.ZipFile(io.BytesIO(build_parquet_zip_bytes(df_ca, df_notes))) as zf:
+        ca = pd.read_parquet(io.BytesIO(zf.read("ca_close.parquet")))
+        notes = pd.read_parquet(io.BytesIO(zf.read("evolution_notes.parquet")))
+    _compare(ca, df_ca, CA_SCHEMA)
+    _compare(notes, df_notes, NOTES_SCHEMA)
+
+
+def test_formats_proposes(donnees):
+    for fmt in EXPORT_FORMATS.values():
+        assert fmt.build(*donnees)
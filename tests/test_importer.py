@@ -0,0 +1,129 @@
+"""Import en masse : formats de dates et de nombres, dédoublonnage par blocs."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca.importer import _to_dates, _to_number, import_file, suggest_mapping
+from suivi_ca.loader import SHEET_CA
+from suivi_ca.schema import CA_SCHEMA, apply_schema
+
+
+@pytest.mark.parametrize(
+    "texte, attendu",
+    [
+        ("2025-11-03", "2025-11-03"),
+        ("2025-11-13", "2025-11-13"),
+        ("2025-11-20T18:30:00", "2025-11-20 18:30"),
+        ("03/11/2025", "2025-11-03"),
+        ("13/11/2025", "2025-11-13"),
+        ("3/1/25", "2025-01-03"),
+    ],
+)
+def test_dates(texte, attendu):
+    assert _to_dates(pd.Series([texte], dtype=object)).iloc[0] == pd.Timestamp(attendu)
+
+
+def test_dates_melangees_et_illisibles():
+    dates = _to_dates(pd.Series(["2025-11-13", "13/11/2025", "hier", None], dtype=object))
+    assert dates.iloc[0] == dates.iloc[1] == pd.Timestamp("2025-11-13")
+    assert dates.iloc[2:].isna().all()
+
+
+@pytest.mark.parametrize(
+    "texte, attendu",
+    [
+        ("1,234", 1234),
+        ("1,234,567", 1234567),
+        ("1,234.50", 1234.5),
+        ("1234,50", 1234.5),
+        ("12,5", 12.5),
+        ("0,5", 0.5),
+        ("-3,5", -3.5),
+        ("1 234,50", 1234.5),
+        ("1.234,50", 1234.5),
+        ("1.234.567", 1234567),
+        ("12.5", 12.5),
+        ("100 €", 100),
+    ],
+)
+def test_nombres(texte, attendu):
+    assert _to_number(pd.Series([texte], dtype=object)).iloc[0] == pytest.approx(attendu)
+
+
+def test_nombre_illisible_garde_pour_la_validation():
+    valeurs = _to_number(pd.Series(["abc", None, "12"], dtype=object))
+    assert valeurs.iloc[0] == "abc"
+    assert pd.isna(valeurs.iloc[1])
+    assert valeurs.iloc[2] == 12
+
+
+def _importer(csv: str, existant: pd.DataFrame, chunk_rows: int = 2):
+    ajouts = []
+    colonnes = csv.splitlines()[0].split(";")
+    stats = import_file(
+        io.BytesIO(csv.encode()),
+        "export.csv",
+        SHEET_CA,
+        suggest_mapping(colonnes, SHEET_CA),
+        append=ajouts.append,
+        existing=existant,
+        chunk_rows=chunk_rows,
+    )
+    return stats, (pd.concat(ajouts) if ajouts else None)
+
+
+EXISTANT = apply_schema(
+    pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2025-11-03"]),
+            "Ville": ["Amiens"],
+            "Nombre commandes": [10],
+            "Chiffre d’affaires (€)": [200.0],
+            "Période de close": ["Midi"],
+        }
+    ),
+    CA_SCHEMA,
+)
+
+
+def test_import_par_blocs():
+    csv = "\n".join(
+        [
+            "Date;Ville;Commandes;CA;Période",
+            # déjà présente dans les données
+            "2025-11-03;Amiens;10;200;Midi",
+            "2025-11-13;Amiens;12;1 234,50;Midi",
+            "2025-11-20;Amiens;8;150;Soir",
+            # doublon d'une ligne d'un bloc précédent
+            "13/11/2025;Amiens;12;1234,50;Midi",
+            # non conformes : date illisible, montant négatif, commandes décimales
+            "hier;Amiens;3;20;Midi",
+            "2025-11-21;Amiens;3;-20;Midi",
+            "2025-11-22;Amiens;2,5;20;Midi",
+            "2025-11-23;Beauvais;4;60,5;Soir",
+        ]
+    )
+    stats, ajouts = _importer(csv, EXISTANT)
+    assert stats.as_dict() == {"lues": 8, "invalides": 3, "doublons": 2, "ajoutees": 3}
+    assert ajouts["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2025-11-13", "2025-11-20", "2025-11-23"]
+    np.testing.assert_allclose(ajouts["Chiffre d’affaires (€)"].to_numpy(), [1234.5, 150, 60.5])
+
+
+
+def test_import_villes_acceptees():
+    csv = "Date;Ville;Commandes;CA;Période\n2025-11-13;Amiens;1;10;Midi\n2025-11-13;Lille;1;10;Midi\n"
+    ajouts = []
+    stats = import_file(
+        io.BytesIO(csv.encode()),
+        "export.csv",
+        SHEET_CA,
+        suggest_mapping(["Date", "Ville", "Commandes", "CA", "Période"], SHEET_CA),
+        append=ajouts.append,
+        existing=EXISTANT,
+        villes=frozenset({"Amiens"}),
+    )
+    assert (stats.invalides, stats.ajoutees) == (1, 1)
+    assert ajouts[0]["Ville"].tolist() == ["Amiens"]
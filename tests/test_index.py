@@ -0,0 +1,67 @@
+"""Index Date / Ville : tranches identiques au masque booléen qu'elles remplacent."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca import index as index_module
+from suivi_ca.index import DateVilleIndex
+
+from .donnees import tables
+
+BORNES = [("2025-01-01", "2025-03-31"), ("2025-01-10", "2025-01-20"), ("2025-02-03", "2025-02-03"), ("2026-01-01", "2026-02-01")]
+
+
+@pytest.fixture(scope="module")
+def df_ca():
+    df_ca, _ = tables(jours=60)
+    df_ca = df_ca.sample(frac=1, random_state=1)
+    df_ca.loc[df_ca.index[::17], "Date"] = pd.NaT
+    return df_ca
+
+
+def _masque(df, debut, fin, ville=None):
+    mask = (df["Date"] >= debut) & (df["Date"] <= fin)
+    if ville is not None:
+        mask &= df["Ville"] == ville
+    return df[mask]
+
+
+def _memes_lignes(obtenu, attendu):
+    # triées par date, ordre d'origine à date égale
+    attendu = attendu.sort_values("Date", kind="stable")
+    assert obtenu.index.tolist() == attendu.index.tolist()
+
+
+@pytest.mark.parametrize("debut, fin", BORNES)
+@pytest.mark.parametrize("ville", [None, "Amiens", "Lille"])
+def test_tranche_comme_masque(df_ca, debut, fin, ville):
+    index = DateVilleIndex(df_ca)
+    _memes_lignes(index.slice(debut, fin, ville), _masque(df_ca, debut, fin, ville))
+
+
+def test_ville_inconnue(df_ca):
+    index = DateVilleIndex(df_ca)
+    assert index.villes == ["Amiens", "Beauvais", "Lille"]
+    assert index.slice("2025-01-01", "2025-12-31", "Paris").empty
+
+
+def test_dates_manquantes_exclues(df_ca):
+    tranche = DateVilleIndex(df_ca).slice("1900-01-01", "2100-01-01")
+    assert len(tranche) == df_ca["Date"].notna().sum()
+    assert np.all(np.diff(tranche["Date"].to_numpy()) >= np.timedelta64(0))
+
+
+
+@pytest.mark.parametrize("seuil", [20, 1_000])
+def test_ajouts_comme_index_reconstruit(df_ca, monkeypatch, seuil):
+    # lots gardés à part (sous le seuil) ou fusionnés au tri principal
+    monkeypatch.setattr(index_module, "COMPACT_MIN_ROWS", seuil)
+    debut = len(df_ca) // 2
+    index = DateVilleIndex(df_ca.iloc[:debut])
+    for i in range(debut, len(df_ca), 7):
+        index = index.extend(df_ca.iloc[i : i + 7])
+    assert index.villes == ["Amiens", "Beauvais", "Lille"]
+    for debut_periode, fin in BORNES:
+        for ville in [None, "Lille"]:
+            _memes_lignes(index.slice(debut_periode, fin, ville), _masque(df_ca, debut_periode, fin, ville))
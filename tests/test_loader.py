@@ -0,0 +1,89 @@
+"""Cache Arrow du classeur : relu tant que le classeur ne change pas, reconstruit sinon."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from suivi_ca import loader
+from suivi_ca.export import build_excel_bytes
+from suivi_ca.loader import cache_is_fresh, clear_cache, file_sha256, load_workbook, workbook_digest
+
+from .donnees import tables
+
+
+@pytest.fixture
+def classeur(tmp_path):
+    path = tmp_path / "classeur.xlsx"
+    path.write_bytes(build_excel_bytes(*tables(jours=5)))
+    return path
+
+
+@pytest.fixture
+def lectures(monkeypatch):
+    """Nombre d'analyses du XLSX (lectures hors cache)."""
+    compteur = []
+    read_workbook = loader.read_workbook
+
+    def compte(path):
+        compteur.append(path)
+        return read_workbook(path)
+
+    monkeypatch.setattr(loader, "read_workbook", compte)
+    return compteur
+
+
+def test_cache_relu(classeur, tmp_path, lectures):
+    cache = tmp_path / "cache"
+    premier = load_workbook(classeur, cache)
+    assert cache_is_fresh(classeur, cache)
+    relu = load_workbook(classeur, cache)
+    assert len(lectures) == 1
+    for a, b in zip(premier, relu):
+        pd.testing.assert_frame_equal(a, b)
+    assert workbook_digest(classeur, cache) == file_sha256(classeur)
+
+
+def test_date_modifiee_meme_contenu(classeur, tmp_path, lectures):
+    cache = tmp_path / "cache"
+    load_workbook(classeur, cache)
+    os.utime(classeur, ns=(1, 1))
+    assert not cache_is_fresh(classeur, cache)
+    load_workbook(classeur, cache)
+    # contenu identique (SHA-256) : cache repris, manifeste mis à jour
+    assert len(lectures) == 1
+    assert cache_is_fresh(classeur, cache)
+
+
+def test_contenu_modifie(classeur, tmp_path, lectures):
+    cache = tmp_path / "cache"
+    df_ca, df_notes = load_workbook(classeur, cache)
+    classeur.write_bytes(build_excel_bytes(df_ca.iloc[:4], df_notes))
+    os.utime(classeur, ns=(1, 1))
+    nouveau_ca, _ = load_workbook(classeur, cache)
+    assert len(lectures) == 2
+    assert len(nouveau_ca) == 4
+
+
+def test_cache_corrompu_reconstruit(classeur, tmp_path, lectures):
+    cache = tmp_path / "cache"
+    df_ca, _ = load_workbook(classeur, cache)
+    for fichier in cache.rglob("*.arrow"):
+        fichier.write_bytes(b"pas un fichier arrow")
+    relu, _ = load_workbook(classeur, cache)
+    assert len(lectures) == 2
+    pd.testing.assert_frame_equal(relu, df_ca)
+
+
+def test_clear_cache(classeur, tmp_path, lectures):
+    cache = tmp_path / "cache"
+    load_workbook(classeur, cache)
+    clear_cache(classeur, cache)
+    assert not cache_is_fresh(classeur, cache)
+    load_workbook(classeur, cache)
+    assert len(lectures) == 2
+
+
+def test_classeur_absent(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_workbook(tmp_path / "absent.xlsx", tmp_path / "cache")
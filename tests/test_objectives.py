@@ -0,0 +1,69 @@
+"""Priorité des objectifs : portée la plus spécifique, dernière version en vigueur."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca.objectives import CA_CLOSE, NOTE_MIN, ObjectivesStore
+
+
+@pytest.fixture
+def objectifs(tmp_path):
+    # valeurs par défaut : Amiens 350, Beauvais 200, note minimale 4.5
+    return ObjectivesStore(tmp_path / "objectifs.db")
+
+
+def test_valeurs_par_defaut(objectifs):
+    assert objectifs.current(CA_CLOSE, ville="Amiens") == 350
+    assert objectifs.current(NOTE_MIN) == 4.5
+    # portée exacte : pas d'héritage de l'objectif de la ville
+    assert objectifs.current(CA_CLOSE, ville="Amiens", periode_close="Midi") is None
+    assert objectifs.as_dict(["Amiens", "Lille"]) == {CA_CLOSE: {"Amiens": 350}, NOTE_MIN: 4.5}
+
+
+def test_version_datee(objectifs):
+    objectifs.set_target(CA_CLOSE, 300, ville="Amiens", valid_from="2025-01-01")
+    assert objectifs.current(CA_CLOSE, ville="Amiens", date="2024-12-31") == 350
+    assert objectifs.current(CA_CLOSE, ville="Amiens", date="2025-01-01") == 300
+    objectifs.set_target(CA_CLOSE, 320, ville="Amiens", valid_from="2025-06-01")
+    assert objectifs.current(CA_CLOSE, ville="Amiens", date="2025-05-31") == 300
+    assert objectifs.current(CA_CLOSE, ville="Amiens", date="2026-01-01") == 320
+
+
+def test_sans_date_remplace_les_versions_datees(objectifs):
+    objectifs.set_target(CA_CLOSE, 300, ville="Amiens", valid_from="2025-01-01")
+    objectifs.set_target(CA_CLOSE, 420, ville="Amiens")
+    assert objectifs.current(CA_CLOSE, ville="Amiens", date="2024-01-01") == 420
+    assert objectifs.current(CA_CLOSE, ville="Amiens", date="2026-01-01") == 420
+    amiens = objectifs.targets()
+    assert (amiens["ville"] == "Amiens").sum() == 1
+
+
+def test_derniere_note_minimale_globale(objectifs):
+    targets = objectifs.targets()
+    note_min = targets.loc[targets["type"] == NOTE_MIN, "id"].iloc[0]
+    with pytest.raises(ValueError):
+        objectifs.delete_target(note_min)
+    # une autre version en vigueur : suppression possible
+    objectifs.set_target(NOTE_MIN, 4.2, valid_from="2020-01-01")
+    objectifs.delete_target(note_min)
+    assert objectifs.current(NOTE_MIN) == 4.2
+
+
+def test_evaluation_par_ligne(objectifs):
+    objectifs.set_target(CA_CLOSE, 500, ville="Amiens", periode_close="Soir")
+    objectifs.set_target(CA_CLOSE, 100, periode_close="Midi")
+    objectifs.set_target(CA_CLOSE, 50)
+    objectifs.set_target(CA_CLOSE, 380, ville="Amiens", valid_from="2025-03-01")
+    df = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(
+                ["2025-01-10", "2025-01-10", "2025-04-01", "2025-04-01", "2025-04-01", "2025-04-01"]
+            ),
+            "Ville": ["Amiens", "Amiens", "Amiens", "Amiens", "Lille", "Lille"],
+            "Période de close": ["Soir", "Midi", "Midi", "Soir", "Midi", "Soir"],
+        }
+    )
+    # ville × période > ville > période > global, chacun dans sa version à la date
+    attendu = [500, 350, 380, 500, 100, 50]
+    np.testing.assert_array_equal(objectifs.evaluate_ca(df).to_numpy(), attendu)
@@ -0,0 +1,60 @@
+"""Partitions par ville : mêmes données que le classeur unique, cache des tables réunies."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from suivi_ca.export import build_excel_bytes
+from suivi_ca.loader import load_workbook
+from suivi_ca.partitions import load_partitions, partition_paths, split_workbook
+
+from .donnees import tables
+
+
+@pytest.fixture
+def classeur(tmp_path):
+    path = tmp_path / "classeur.xlsx"
+    path.write_bytes(build_excel_bytes(*tables(jours=10)))
+    return path
+
+
+def _trie(df):
+    return df.sort_values(list(df.columns[:3])).reset_index(drop=True).astype({"Ville": object})
+
+
+def test_partitions_comme_le_classeur(classeur, tmp_path):
+    cache = tmp_path / "cache"
+    split_workbook(classeur, tmp_path / "donnees", cache)
+    paths = partition_paths(tmp_path / "donnees")
+    assert list(paths) == ["Amiens", "Beauvais", "Lille"]
+
+    df_ca, df_notes = load_workbook(classeur, cache)
+    data = load_partitions(tuple(paths.values()), cache_dir=cache)
+    pd.testing.assert_frame_equal(_trie(data.ca), _trie(df_ca), check_categorical=False)
+    pd.testing.assert_frame_equal(_trie(data.notes), _trie(df_notes), check_categorical=False)
+    assert set(data.digests) == set(paths)
+
+
+def test_cache_des_tables_reunies(classeur, tmp_path):
+    cache = tmp_path / "cache"
+    split_workbook(classeur, tmp_path / "donnees", cache)
+    paths = tuple(partition_paths(tmp_path / "donnees").values())
+    premier = load_partitions(paths, cache_dir=cache)
+    relu = load_partitions(paths, cache_dir=cache)
+    pd.testing.assert_frame_equal(relu.ca, premier.ca)
+    assert relu.digests == premier.digests
+
+    # une partition modifiée : les tables sont réunies à nouveau
+    amiens = paths[0]
+    df_ca, df_notes = load_workbook(amiens, cache)
+    amiens.write_bytes(build_excel_bytes(df_ca.iloc[:3], df_notes))
+    os.utime(amiens, ns=(1, 1))
+    apres = load_partitions(paths, cache_dir=cache)
+    assert len(apres.ca) == len(premier.ca) - (len(df_ca) - 3)
+    assert apres.digests["Amiens"] != premier.digests["Amiens"]
+
+
+def test_partition_manquante(classeur, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_partitions((tmp_path / "absente.xlsx",), cache_dir=tmp_path / "cache")
@@ -0,0 +1,92 @@
+"""Réduction des séries des graphiques : résolution, agrégation, LTTB et séries principales."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca.resample import (
+    MAX_POINTS_PER_CHART,
+    cap_points,
+    choose_resolution,
+    lttb,
+    resample,
+    top_series,
+)
+
+from .donnees import tables
+
+
+def test_resolution():
+    assert choose_resolution("2025-01-01", "2025-01-31", n_series=10) == "D"
+    assert choose_resolution("2025-01-01", "2025-12-31", n_series=6) == "W"
+    assert choose_resolution("2020-01-01", "2025-12-31", n_series=20) == "M"
+
+
+def test_resample_par_semaine():
+    df_ca, _ = tables(jours=28, villes=["Amiens"])
+    out = resample(
+        df_ca, "W", ["Ville"], ["Chiffre d’affaires (€)", "Nombre commandes"],
+        ratios={"Panier": ("Chiffre d’affaires (€)", "Nombre commandes")},
+    )
+    # 2025-01-01 est un mercredi : semaines commençant le lundi
+    assert out["Date"].dt.dayofweek.eq(0).all()
+    assert out["Nombre commandes"].sum() == df_ca["Nombre commandes"].sum()
+    np.testing.assert_allclose(out["Panier"], out["Chiffre d’affaires (€)"] / out["Nombre commandes"])
+
+
+def test_lttb_garde_extremites_et_pics():
+    x = np.arange(1_000)
+    y = np.sin(x / 50)
+    y[500] = 10
+    keep = lttb(x, y, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 500 in keep
+    np.testing.assert_array_equal(lttb(x[:50], y[:50], 100), np.arange(50))
+
+
+def test_cap_points():
+    dates = pd.date_range("2020-01-01", periods=1_000)
+    frame = pd.DataFrame(
+        {
+            "Date": np.tile(dates, 4),
+            "Série": np.repeat(list("ABCD"), 1_000),
+            "Valeur": np.random.default_rng(0).normal(size=4_000),
+        }
+    )
+    out = cap_points(frame, ["Série"], "Valeur", max_points=400)
+    assert len(out) <= 400
+    assert out.groupby("Série").size().eq(100).all()
+    assert out.index.is_monotonic_increasing
+
+
+def test_series_principales():
+    mois = pd.date_range("2023-01-01", periods=36, freq="MS")
+    series = [(v, p) for v in range(20) for p in "ABCD"]
+    frame = pd.DataFrame(
+        [(d, f"V{v:02d}", p, v * 10 + ord(p)) for d in mois for v, p in series],
+        columns=["Date", "Ville", "Période de close", "Chiffre d’affaires (€)"],
+    )
+    assert len(frame) > MAX_POINTS_PER_CHART
+    out = top_series(frame, ["Ville", "Période de close"], "Chiffre d’affaires (€)")
+    gardees = out[["Ville", "Période de close"]].drop_duplicates()
+    assert len(out) <= MAX_POINTS_PER_CHART
+    assert len(gardees) == MAX_POINTS_PER_CHART // 36
+    # les plus gros CA : villes de plus haut numéro
+    assert gardees["Ville"].min() == "V09"
+    # une seule colonne de série
+    villes = top_series(frame, ["Ville"], "Chiffre d’affaires (€)")
+    assert villes["Ville"].nunique() == MAX_POINTS_PER_CHART // (36 * 4)
+
+
+def test_une_serie_au_moins():
+    frame = pd.DataFrame({"Date": pd.date_range("2020-01-01", periods=50), "S": "A", "V": 1.0})
+    assert len(top_series(frame, ["S"], "V", max_points=10)) == 50
+
+
+@pytest.mark.parametrize("n", [0, 5])
+def test_petites_tables_inchangees(n):
+    frame = pd.DataFrame({"Date": pd.date_range("2020-01-01", periods=n), "S": "A", "V": 1.0})
+    assert top_series(frame, ["S"], "V") is frame
+    assert cap_points(frame, ["S"], "V") is frame
@@ -0,0 +1,117 @@
+"""Schéma compact : validation des saisies, conversions et retour aux types larges."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca.schema import (
+    CA_SCHEMA,
+    NOTES_SCHEMA,
+    SchemaError,
+    apply_schema,
+    concat,
+    split_valid,
+    validate,
+    widen,
+)
+
+
+def _ligne_ca(**valeurs):
+    ligne = {
+        "Date": "2025-11-03",
+        "Ville": "Amiens",
+        "Nombre commandes": 12,
+        "Chiffre d’affaires (€)": 93.1,
+        "Période de close": "11:30 - 14:30",
+    }
+    return pd.DataFrame([{**ligne, **valeurs}])
+
+
+def test_saisie_conforme():
+    rows = validate(_ligne_ca(), CA_SCHEMA)
+    assert rows["Date"].iloc[0] == pd.Timestamp("2025-11-03")
+    assert isinstance(rows["Ville"].dtype, pd.CategoricalDtype)
+    assert rows["Nombre commandes"].dtype == np.uint16
+    assert rows["Chiffre d’affaires (€)"].dtype == np.float32
+
+
+@pytest.mark.parametrize(
+    "valeurs, message",
+    [
+        ({"Ville": ""}, "« Ville » : valeur manquante"),
+        ({"Date": "hier"}, "« Date » : valeur manquante"),
+        ({"Chiffre d’affaires (€)": "beaucoup"}, "valeur non numérique"),
+        ({"Chiffre d’affaires (€)": -1}, "valeur inférieure à 0"),
+        ({"Nombre commandes": 70_000}, "valeur supérieure à 65535"),
+        ({"Nombre commandes": 2.5}, "nombre entier attendu"),
+    ],
+)
+def test_saisie_refusee(valeurs, message):
+    with pytest.raises(SchemaError, match=message):
+        validate(_ligne_ca(**valeurs), CA_SCHEMA)
+
+
+def test_colonne_manquante():
+    with pytest.raises(SchemaError, match="colonne « Marque » manquante"):
+        validate(_ligne_ca(), NOTES_SCHEMA)
+
+
+def test_note_facultative():
+    rows = pd.DataFrame(
+        [{"Date": "2025-11-03", "Ville": "Amiens", "Marque": "Out Fry", "Note Uber Eats": 4.6}]
+    )
+    valid = validate(rows, NOTES_SCHEMA)
+    assert valid["Note Uber Eats"].iloc[0] == np.float32(4.6)
+    with pytest.raises(SchemaError, match="supérieure à 5"):
+        validate(rows.assign(**{"Note Deliveroo": 5.5}), NOTES_SCHEMA)
+
+
+def test_lignes_conformes_et_ecartees():
+    rows = pd.concat(
+        [_ligne_ca(), _ligne_ca(**{"Nombre commandes": -3}), _ligne_ca(Ville=None)],
+        ignore_index=True,
+    )
+    valid, ecartees = split_valid(rows, CA_SCHEMA)
+    assert (len(valid), ecartees) == (1, 2)
+    assert split_valid(rows.iloc[1:], CA_SCHEMA)[0].empty
+
+
+def test_retour_exact_aux_valeurs_saisies():
+    rows = apply_schema(_ligne_ca(**{"Chiffre d’affaires (€)": 93.1}), CA_SCHEMA)
+    large = widen(rows, CA_SCHEMA)
+    assert large["Chiffre d’affaires (€)"].iloc[0] == 93.1
+    assert large["Nombre commandes"].dtype == np.int64
+    assert large["Ville"].iloc[0] == "Amiens"
+
+
+def test_schema_deja_applique_sans_copie():
+    rows = apply_schema(_ligne_ca(), CA_SCHEMA)
+    assert apply_schema(rows, CA_SCHEMA) is rows
+
+
+def test_concat_reunit_les_categories():
+    a = apply_schema(_ligne_ca(Ville="Lille"), CA_SCHEMA)
+    b = apply_schema(_ligne_ca(Ville="Amiens"), CA_SCHEMA)
+    both = concat([a, b])
+    assert list(both["Ville"].cat.categories) == ["Amiens", "Lille"]
+    assert both["Ville"].tolist() == ["Lille", "Amiens"]
+
+
+def test_commandes_manquantes_dans_le_classeur():
+    # cellules vides : entier nullable, pas de repli en float32
+    rows = apply_schema(pd.concat([_ligne_ca(), _ligne_ca(**{"Nombre commandes": None})]), CA_SCHEMA)
+    assert str(rows["Nombre commandes"].dtype) == "UInt16"
+    assert apply_schema(rows, CA_SCHEMA) is rows
+    large = widen(rows, CA_SCHEMA)["Nombre commandes"]
+    assert large.iloc[0] == 12 and large.isna().iloc[1]
+    # fusion avec des saisies complètes
+    both = concat([rows, apply_schema(_ligne_ca(), CA_SCHEMA)])
+    assert str(both["Nombre commandes"].dtype) == "UInt16"
+    assert both["Nombre commandes"].tolist()[::2] == [12, 12]
+
+
+@pytest.mark.parametrize("valeur", [-1, 70_000, 2.5])
+def test_commandes_hors_schema_dans_le_classeur(valeur):
+    rows = pd.concat([_ligne_ca(), _ligne_ca(**{"Nombre commandes": valeur})], ignore_index=True)
+    with pytest.raises(SchemaError, match=r"« Nombre commandes » .*\(lignes 1\)"):
+        apply_schema(rows, CA_SCHEMA)
@@ -0,0 +1,88 @@
+"""Journal des saisies : rejoué sur le même classeur, dédoublonné sur un autre, relu entre processus."""
+
+import pandas as pd
+import pytest
+
+from suivi_ca.schema import SchemaError
+from suivi_ca.shared import SharedDataStore
+
+from .donnees import tables
+
+SAISIE = {
+    "Date": pd.Timestamp("2025-03-01"),
+    "Ville": "Amiens",
+    "Période de close": "11:30 - 14:30",
+    "Nombre commandes": 12,
+    "Chiffre d’affaires (€)": 250.5,
+}
+
+
+@pytest.fixture
+def donnees():
+    return tables(jours=10)
+
+
+@pytest.fixture
+def ouvrir(tmp_path, donnees):
+    stores = []
+
+    def ouvrir(digest="sha-1", df_ca=None):
+        df_ca = donnees[0] if df_ca is None else df_ca
+        store = SharedDataStore(df_ca, donnees[1], 1, digest, tmp_path / "saisies.db")
+        stores.append(store)
+        return store
+
+    yield ouvrir
+    for store in stores:
+        store.close()
+
+
+def _saisies(store):
+    return store.ca.rows_since(store.ca._lengths[0])
+
+
+def test_rejoue_sur_le_meme_classeur(ouvrir):
+    ouvrir().append_ca([SAISIE])
+    relu = _saisies(ouvrir())
+    assert len(relu) == 1
+    assert relu.iloc[0]["Chiffre d’affaires (€)"] == pytest.approx(250.5)
+    assert relu.iloc[0]["CA horaire (€ / h)"] == pytest.approx(250.5 / 3)
+
+
+def test_autre_classeur_sans_doublon(ouvrir, donnees):
+    autre = dict(SAISIE, Date=pd.Timestamp("2025-03-02"))
+    ouvrir().append_ca([SAISIE, autre])
+    # export mis à jour : la première saisie y figure déjà, pas la seconde
+    exporte = pd.concat([donnees[0], pd.DataFrame([SAISIE])], ignore_index=True)
+    relu = _saisies(ouvrir("sha-2", exporte))
+    assert relu["Date"].tolist() == [pd.Timestamp("2025-03-02")]
+
+
+def test_partitions_par_ville(ouvrir):
+    ouvrir({"Amiens": "a", "Lille": "l"}).append_ca([SAISIE, dict(SAISIE, Ville="Lille")])
+    lille = ouvrir({"Lille": "l"})
+    assert _saisies(lille)["Ville"].astype(str).tolist() == ["Lille"]
+    with pytest.raises(SchemaError):
+        lille.append_ca([SAISIE])
+
+
+def test_saisie_invalide_non_journalisee(ouvrir):
+    with pytest.raises(SchemaError):
+        ouvrir().append_ca([dict(SAISIE, **{"Nombre commandes": -1})])
+    assert _saisies(ouvrir()).empty
+
+
+def test_sync(ouvrir, monkeypatch):
+    a, b = ouvrir(), ouvrir()
+    lectures = []
+    pull = b._pull
+    monkeypatch.setattr(b, "_pull", lambda table: lectures.append(table) or pull(table))
+    # base inchangée : aucune requête sur le journal
+    assert not b.sync() and not lectures
+    a.append_ca([SAISIE])
+    a.append_notes([{"Date": SAISIE["Date"], "Ville": "Lille", "Marque": "Pokawa", "Note Uber Eats": 4.5, "Note Deliveroo": 4.2}])
+    # ses propres saisies ne sont pas relues
+    assert not a.sync()
+    assert b.sync()
+    assert (len(b.ca), len(b.notes), b.version) == (len(a.ca), len(a.notes), 1)
+    assert not b.sync() and len(lectures) == 2
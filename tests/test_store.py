@@ -0,0 +1,88 @@
+"""Store en ajout seul : lignes ajoutées en lots, fusionnées au-delà d'un seuil."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from suivi_ca import store as store_module
+from suivi_ca.derived import add_ca_horaire
+from suivi_ca.schema import concat
+from suivi_ca.store import AppendStore
+
+from .donnees import tables
+
+
+@pytest.fixture
+def lots():
+    base, _ = tables(jours=20)
+    # nouvelle ville : catégories réunies à la fusion
+    ajouts, _ = tables(jours=10, villes=["Lille", "Paris"], seed=1)
+    return base, [ajouts.iloc[i : i + 7] for i in range(0, len(ajouts), 7)]
+
+
+def _remplir(base, ajouts):
+    store = AppendStore(base, derive=add_ca_horaire)
+    for lot in ajouts:
+        store.extend(lot)
+    return store
+
+
+def _attendu(base, ajouts):
+    return add_ca_horaire(concat([base, *ajouts]))
+
+
+def test_lots_sans_fusion(lots):
+    base, ajouts = lots
+    store = _remplir(base, ajouts)
+    attendu = _attendu(base, ajouts)
+    # sous le seuil : rien n'est fusionné, les lectures partielles suffisent
+    assert store.pending_rows == len(attendu) - len(base)
+    assert len(store) == len(attendu)
+    pd.testing.assert_frame_equal(store.rows_since(len(base) - 3), attendu.iloc[len(base) - 3 :])
+    positions = np.random.default_rng(0).permutation(len(attendu))[:50]
+    pd.testing.assert_frame_equal(store.take(positions), attendu.take(positions))
+    assert store.pending_rows > 0
+    # table entière : fusion explicite
+    pd.testing.assert_frame_equal(store.frame, attendu)
+    assert store.pending_rows == 0
+
+
+def test_fusion_au_seuil(lots, monkeypatch):
+    base, ajouts = lots
+    monkeypatch.setattr(store_module, "COMPACT_MIN_ROWS", 20)
+    store = _remplir(base, ajouts[:2])
+    assert store.pending_rows == 14
+    store.extend(ajouts[2])
+    assert store.pending_rows == 0
+    pd.testing.assert_frame_equal(store.frame, _attendu(base, ajouts[:3]))
+
+
+@pytest.mark.parametrize("seuil", [20, 1_000])
+def test_memo_incremental_comme_reconstruit(lots, monkeypatch, seuil):
+    base, ajouts = lots
+    monkeypatch.setattr(store_module, "COMPACT_MIN_ROWS", seuil)
+    store = AppendStore(base, derive=add_ca_horaire)
+
+    def lignes(frame):
+        return frame.index.tolist()
+
+    for lot in ajouts:
+        store.extend(lot)
+        # lu à chaque version : seules les lignes ajoutées sont passées à `update`
+        vues = store.memo_incremental("lignes", lignes, lambda vues, rows: vues + lignes(rows))
+        assert vues == list(range(len(store)))
+    total = store.memo_incremental(
+        "total", lambda frame: frame["Nombre commandes"].sum(), lambda t, rows: t + rows["Nombre commandes"].sum()
+    )
+    assert total == _attendu(base, ajouts)["Nombre commandes"].sum()
+
+
+def test_memo_par_version(lots):
+    base, ajouts = lots
+    store = AppendStore(base)
+    appels = []
+    calcul = lambda: appels.append(store.version) or len(appels)
+    assert store.memo("cle", calcul) == store.memo("cle", calcul) == 1
+    store.extend(ajouts[0])
+    assert store.memo("cle", calcul) == 2
+    assert appels == [0, 1]
@@ -0,0 +1,51 @@
+"""Tables paginées : chaque page comme une tranche de `sort_values` sur toute la table."""
+
+import numpy as np
+import pytest
+
+from suivi_ca.table import last_rows, page, search_mask
+
+from .donnees import tables
+
+
+@pytest.fixture(scope="module")
+def detail():
+    df_ca, _ = tables(jours=40)
+    # valeurs manquantes et égalités : placées et départagées comme `sort_values`
+    df_ca.loc[::11, "Chiffre d’affaires (€)"] = np.nan
+    df_ca.loc[::13, "Ville"] = None
+    df_ca["Commentaire"] = np.where(np.arange(len(df_ca)) % 3 == 0, "Pluie", None)
+    return df_ca.sample(frac=1, random_state=0)
+
+
+@pytest.mark.parametrize(
+    "by", ["Chiffre d’affaires (€)", "Date", "Ville", "Nombre commandes", "Commentaire", ["Ville", "Date"]]
+)
+@pytest.mark.parametrize("ascending", [True, False])
+@pytest.mark.parametrize("page_number", [0, 3])
+def test_page_comme_sort_values(detail, by, ascending, page_number):
+    attendu = detail.sort_values(by, ascending=ascending, kind="stable", na_position="last")
+    lignes, total = page(detail, by, ascending, page_number, page_size=25)
+    assert total == len(detail)
+    debut = page_number * 25
+    assert lignes.index.tolist() == attendu.index[debut : debut + 25].tolist()
+
+
+def test_recherche(detail):
+    lignes, total = page(detail, "Date", query="lille", page_size=10)
+    villes = detail["Ville"].astype(object)
+    assert total == (villes == "Lille").sum()
+    assert (lignes["Ville"] == "Lille").all()
+    assert search_mask(detail, "pluie").sum() == (detail["Commentaire"] == "Pluie").sum()
+    assert search_mask(detail, "").all()
+
+
+def test_page_au_dela_de_la_fin(detail):
+    lignes, total = page(detail, "Date", page_number=10_000, page_size=50)
+    assert lignes.empty and total == len(detail)
+
+
+@pytest.mark.parametrize("n", [1, 10, 10_000])
+def test_dernieres_lignes(detail, n):
+    attendu = detail.sort_values("Date", kind="stable").tail(n)
+    assert last_rows(detail, "Date", n).index.tolist() == attendu.index.tolist()